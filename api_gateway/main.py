@@ -3,7 +3,7 @@ import os
 import sys
 import logging
 import multiprocessing
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -59,39 +59,32 @@ def setup_env():
         logger.warning("未找到 .env 文件")  # [CN] 未找到 .env 文件 [EN] .env file not found
 
 
-def process_text(text_path: str, output_dir: str, temp_dir: str = "", provider: str = "openai"):
+def create_chapter_loader() -> ChapterLoader:
     """
-    # [CN] 处理小说文本，生成因果图谱
-    # [EN] Process novel text and generate causal graph
+    # [CN] 按config.json的text_processing配置创建章节加载器
+    # [EN] Create a chapter loader from the text_processing section of config.json
+    """
+    text_config = JsonLoader.load_json(get_config_path("config.json")).get("text_processing", {})
+    return ChapterLoader(
+        segment_size=text_config.get("segment_size", 800),
+        split_mode=text_config.get("split_mode", "greedy"),
+        overlap_size=text_config.get("overlap_size", 0)
+    )
+
+
+def process_chapter(chapter: Chapter, output_dir: str, temp_dir: str, extractor=None, refiner=None, linker=None):
+    """
+    # [CN] 对单个章节执行抽取、精修、因果分析和图谱生成
+    # [EN] Run extraction, refinement, causal analysis and graph rendering for one chapter
     
     Args:
-        text_path: # [CN] 小说文本文件路径 [EN] Path to novel text file
+        chapter: # [CN] 章节对象 [EN] Chapter object
         output_dir: # [CN] 输出目录 [EN] Output directory
         temp_dir: # [CN] 临时文件目录 [EN] Temporary file directory
-        provider: # [CN] LLM API提供商，"openai"或"deepseek" [EN] LLM API provider, "openai" or "deepseek"
+        extractor: # [CN] 事件抽取器，为None时自动创建 [EN] Event extractor, created when None
+        refiner: # [CN] 幻觉修复器，为None时自动创建 [EN] Hallucination refiner, created when None
+        linker: # [CN] 因果链接器，为None时自动创建 [EN] Causal linker, created when None
     """
-    # [CN] 设置LLM提供商环境变量
-    # [EN] Set LLM provider environment variable
-    os.environ["LLM_PROVIDER"] = provider
-    # [CN] 创建输出目录
-    # [EN] Create output directory
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    # [CN] 创建临时目录
-    # [EN] Create temporary directory
-    if temp_dir is None:
-        temp_dir = os.path.join(output_dir, "temp")
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
-    print("=== 步骤1: 加载和分割章节 ===")  # [CN] === 步骤1: 加载和分割章节 === [EN] === Step 1: Load and split chapters ===
-    # [CN] 加载章节
-    # [EN] Load chapters
-    loader = ChapterLoader(segment_size=800)
-    print(f"从 {text_path} 加载章节...")  # [CN] 从 {text_path} 加载章节... [EN] Loading chapters from {text_path} ...
-    chapter = loader.load_from_txt(text_path)
-    if not chapter:
-        print("加载章节失败")  # [CN] 加载章节失败 [EN] Failed to load chapters
-        return
     # [CN] 保存章节JSON
     # [EN] Save chapter JSON
     chapter_json_path = os.path.join(temp_dir, f"{chapter.chapter_id}.json")
@@ -100,7 +93,7 @@ def process_text(text_path: str, output_dir: str, temp_dir: str = "", provider:
     print("\n=== 步骤2: 提取事件 ===")  # [CN] === 步骤2: 提取事件 === [EN] === Step 2: Extract events ===
     # [CN] 提取事件
     # [EN] Extract events
-    extractor = provide_extractor()
+    extractor = extractor or provide_extractor()
     print(f"从章节 {chapter.chapter_id} 提取事件...")  # [CN] 从章节 {chapter.chapter_id} 提取事件... [EN] Extracting events from chapter {chapter.chapter_id} ...
     events = extractor.extract(chapter)
     print(f"成功提取 {len(events)} 个事件")  # [CN] 成功提取 {len(events)} 个事件 [EN] Successfully extracted {len(events)} events
@@ -113,9 +106,16 @@ def process_text(text_path: str, output_dir: str, temp_dir: str = "", provider:
     print("\n=== 步骤3: 修复幻觉 ===")  # [CN] === 步骤3: 修复幻觉 === [EN] === Step 3: Refine hallucinations ===
     # [CN] 修复幻觉
     # [EN] Refine hallucinations
-    refiner = provide_refiner()
+    refiner = refiner or provide_refiner()
     print(f"对 {len(events)} 个事件进行幻觉检测和修复...")  # [CN] 对 {len(events)} 个事件进行幻觉检测和修复... [EN] Detecting and refining hallucinations for {len(events)} events ...
-    refined_events = refiner.refine(events, context=chapter.content)
+    # [CN] 为每个事件只检索其来源片段及相关片段作为上下文，而不是发送整章文本
+    # [EN] Retrieve only each event's source and related segments as context instead of the whole chapter
+    refined_events = refiner.refine(
+        events,
+        context=chapter.content,
+        segments=chapter.segments,
+        event_sources=extractor.get_event_sources()
+    )
     print(f"精修完成，共 {len(refined_events)} 个事件")  # [CN] 精修完成，共 {len(refined_events)} 个事件 [EN] Refinement complete, total {len(refined_events)} events
     # [CN] 保存精修后的事件JSON
     # [EN] Save refined events JSON
@@ -123,10 +123,20 @@ def process_text(text_path: str, output_dir: str, temp_dir: str = "", provider:
     refined_events_dict = [event.to_dict() for event in refined_events]
     JsonLoader.save_json(refined_events_dict, refined_events_json_path)
     print(f"精修后的事件已保存到: {refined_events_json_path}")  # [CN] 精修后的事件已保存到: {refined_events_json_path} [EN] Refined events saved to: {refined_events_json_path}
+    # [CN] 规范实体表模式下保存本章的实体表
+    # [EN] Save the chapter's canonical entity table in entity table mode
+    entity_table = refiner.get_entity_table()
+    if entity_table is not None:
+        entity_table_path = os.path.join(temp_dir, f"{chapter.chapter_id}_entity_table.json")
+        JsonLoader.save_json(entity_table.to_dict(), entity_table_path)
+        print(f"规范实体表已保存到: {entity_table_path}")  # [CN] 规范实体表已保存到: {entity_table_path} [EN] Canonical entity table saved to: {entity_table_path}
+    # [CN] 保存本章摘要，供后续章节的幻觉修复作为前情提要
+    # [EN] Save this chapter's summary as the digest for refining later chapters
+    refiner.update_chapter_summary(chapter.chapter_id, chapter.title, chapter.content, refined_events)
     print("\n=== 步骤4: 分析因果关系 ===")  # [CN] === 步骤4: 分析因果关系 === [EN] === Step 4: Analyze causal relationships ===
     # [CN] 分析因果关系
     # [EN] Analyze causal relationships
-    linker = provide_linker()
+    linker = linker or provide_linker()
     print(f"分析 {len(refined_events)} 个事件之间的因果关系...")  # [CN] 分析 {len(refined_events)} 个事件之间的因果关系... [EN] Analyzing causal relationships among {len(refined_events)} events ...
     edges = linker.link_events(refined_events)
     print(f"发现 {len(edges)} 个因果关系")  # [CN] 发现 {len(edges)} 个因果关系 [EN] Found {len(edges)} causal relationships
@@ -160,10 +170,92 @@ def process_text(text_path: str, output_dir: str, temp_dir: str = "", provider:
     with open(mermaid_path, 'w', encoding='utf-8') as f:
         f.write(mermaid_text)
     print(f"Mermaid图谱已保存到: {mermaid_path}")  # [CN] Mermaid图谱已保存到: {mermaid_path} [EN] Mermaid graph saved to: {mermaid_path}
+
+
+def process_text(text_path: str, output_dir: str, temp_dir: str = "", provider: str = "openai"):
+    """
+    # [CN] 处理小说文本，生成因果图谱
+    # [EN] Process novel text and generate causal graph
+    
+    Args:
+        text_path: # [CN] 小说文本文件路径 [EN] Path to novel text file
+        output_dir: # [CN] 输出目录 [EN] Output directory
+        temp_dir: # [CN] 临时文件目录 [EN] Temporary file directory
+        provider: # [CN] LLM API提供商，"openai"或"deepseek" [EN] LLM API provider, "openai" or "deepseek"
+    """
+    # [CN] 设置LLM提供商环境变量
+    # [EN] Set LLM provider environment variable
+    os.environ["LLM_PROVIDER"] = provider
+    # [CN] 创建输出目录
+    # [EN] Create output directory
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    # [CN] 创建临时目录
+    # [EN] Create temporary directory
+    if temp_dir is None:
+        temp_dir = os.path.join(output_dir, "temp")
+    if not os.path.exists(temp_dir):
+        os.makedirs(temp_dir)
+    print("=== 步骤1: 加载和分割章节 ===")  # [CN] === 步骤1: 加载和分割章节 === [EN] === Step 1: Load and split chapters ===
+    # [CN] 加载章节
+    # [EN] Load chapters
+    loader = create_chapter_loader()
+    print(f"从 {text_path} 加载章节...")  # [CN] 从 {text_path} 加载章节... [EN] Loading chapters from {text_path} ...
+    chapter = loader.load_from_txt(text_path)
+    if not chapter:
+        print("加载章节失败")  # [CN] 加载章节失败 [EN] Failed to load chapters
+        return
+    process_chapter(chapter, output_dir, temp_dir)
     print("\n=== 处理完成 ===")  # [CN] === 处理完成 === [EN] === Processing complete ===
     print(f"处理结果已保存到目录: {output_dir}")  # [CN] 处理结果已保存到目录: {output_dir} [EN] Results saved to directory: {output_dir}
 
 
+def process_novel(text_path: str, output_dir: str, temp_dir: str = "", provider: str = "openai",
+                  chapter_range: Optional[Tuple[int, Optional[int]]] = None):
+    """
+    # [CN] 流式处理包含多章的整本小说文件，逐章生成因果图谱
+    # [EN] Stream a whole multi-chapter novel file and build a causal graph per chapter
+    
+    Args:
+        text_path: # [CN] 小说文本文件路径 [EN] Path to novel text file
+        output_dir: # [CN] 输出目录 [EN] Output directory
+        temp_dir: # [CN] 临时文件目录 [EN] Temporary file directory
+        provider: # [CN] LLM API提供商，"openai"或"deepseek" [EN] LLM API provider, "openai" or "deepseek"
+        chapter_range: # [CN] 只处理的章节序号范围 (起始, 结束)，包含两端，借助字节偏移索引直接定位 [EN] Inclusive chapter ordinal range (first, last) to process, located via the byte-offset index
+    """
+    os.environ["LLM_PROVIDER"] = provider
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    if not temp_dir:
+        temp_dir = os.path.join(output_dir, "temp")
+    if not os.path.exists(temp_dir):
+        os.makedirs(temp_dir)
+    
+    loader = create_chapter_loader()
+    # [CN] 各组件只创建一次，在所有章节间复用
+    # [EN] Components are created once and reused across chapters
+    extractor = provide_extractor()
+    refiner = provide_refiner()
+    linker = provide_linker()
+    
+    if chapter_range:
+        chapters = loader.iter_chapter_range(text_path, chapter_range[0], chapter_range[1])
+    else:
+        chapters = loader.iter_chapters(text_path)
+    
+    chapter_count = 0
+    for chapter in chapters:
+        chapter_count += 1
+        print(f"\n##### 第 {chapter_count} 个章节: {chapter.chapter_id} {chapter.title} #####")  # [CN] 第 N 个章节 [EN] Chapter N
+        process_chapter(chapter, output_dir, temp_dir, extractor, refiner, linker)
+    
+    if chapter_count == 0:
+        print("加载章节失败")  # [CN] 加载章节失败 [EN] Failed to load chapters
+        return
+    print(f"\n=== 整本处理完成，共 {chapter_count} 个章节 ===")  # [CN] 整本处理完成 [EN] Whole novel processed
+    print(f"处理结果已保存到目录: {output_dir}")  # [CN] 处理结果已保存到目录: {output_dir} [EN] Results saved to directory: {output_dir}
+
+
 def process_directory(input_dir: str, output_dir: str, provider: str = "openai", parallel: bool = True):
     """
     # [CN] 处理目录中的所有文本文件
@@ -243,6 +335,29 @@ def process_directory(input_dir: str, output_dir: str, provider: str = "openai",
                     print(f"- {file_name}: {error}")
 
 
+def parse_chapter_range(text: str) -> Tuple[int, Optional[int]]:
+    """
+    # [CN] 解析章节范围参数，如"100-200"、"100-"或"100"
+    # [EN] Parse a chapter range argument such as "100-200", "100-" or "100"
+    
+    Args:
+        text: # [CN] 章节范围字符串（章节序号从1开始） [EN] Chapter range string (1-based ordinals)
+        
+    Returns:
+        # [CN] (起始序号, 结束序号)，结束序号为None表示到最后一章
+        # [EN] (first ordinal, last ordinal), a last ordinal of None means through the end
+    """
+    first, sep, last = text.partition("-")
+    try:
+        start = int(first)
+        end = (int(last) if last else None) if sep else start
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的章节范围: {text}")
+    if start < 1 or (end is not None and end < start):
+        raise argparse.ArgumentTypeError(f"无效的章节范围: {text}")
+    return start, end
+
+
 def main():
     """
     # [CN] 主入口函数
@@ -254,6 +369,9 @@ def main():
     parser.add_argument("--batch", "-b", action="store_true", help="批处理模式（处理目录中的所有文件）")  # [CN] 批处理模式（处理目录中的所有文件） [EN] Batch mode (process all files in directory)
     parser.add_argument("--provider", "-p", choices=["openai", "deepseek"], default="deepseek",
                         help="LLM API提供商 (默认: deepseek)")  # [CN] LLM API提供商 (默认: deepseek) [EN] LLM API provider (default: deepseek)
+    parser.add_argument("--novel", "-n", action="store_true", help="整本模式（单个文件包含多章，按章节标题流式切分）")  # [CN] 整本模式 [EN] Whole-novel mode (one file with many chapters, streamed and split at headings)
+    parser.add_argument("--chapters", "-c", type=parse_chapter_range, default=None,
+                        help="整本模式下只处理指定章节范围，如 100-200")  # [CN] 只处理指定章节范围 [EN] Only process the given chapter range in whole-novel mode, e.g. 100-200
     parser.add_argument("--no-parallel", action="store_true", help="禁用并行处理")  # [CN] 禁用并行处理 [EN] Disable parallel processing
     args = parser.parse_args()
     # [CN] 设置环境变量
@@ -276,7 +394,10 @@ def main():
         if not os.path.isfile(args.input):
             logger.error(f"错误: 输入路径 {args.input} 不是一个文件")  # [CN] 错误: 输入路径 {args.input} 不是一个文件 [EN] Error: input path {args.input} is not a file
             return
-        process_text(args.input, args.output, provider=args.provider)
+        if args.novel:
+            process_novel(args.input, args.output, provider=args.provider, chapter_range=args.chapters)
+        else:
+            process_text(args.input, args.output, provider=args.provider)
 
 
 if __name__ == "__main__":
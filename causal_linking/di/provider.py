@@ -12,7 +12,7 @@ from common.interfaces.linker import AbstractLinker
 # [CN] 导入统一版链接器以及兼容类
 # [EN] Import unified linker and compatible classes
 from causal_linking.service.unified_linker_service import UnifiedCausalLinker, CausalLinker, OptimizedCausalLinker
-from common.utils.path_utils import get_config_path
+from common.utils.path_utils import get_config_path, get_output_path
 from common.utils.parallel_config import ParallelConfig
 from common.utils.thread_monitor import log_thread_usage
 from dotenv import load_dotenv
@@ -87,6 +87,40 @@ def provide_linker(use_optimized: bool = True) -> AbstractLinker:
     
     use_entity_weights = os.environ.get("USE_ENTITY_WEIGHTS", "1").lower() in ["1", "true", "yes"]
     
+    # [CN] 多对批量分析：每次请求判断的事件对数（默认1，逐对请求；设为大于1的值时启用，如10）
+    # [EN] Multi-pair batched analysis: event pairs judged per request (defaults to 1, one pair per request; set above 1, e.g. 10, to opt in)
+    pairs_per_prompt = int(os.environ.get("CAUSAL_PAIRS_PER_PROMPT", "1"))
+    
+    # [CN] 锚点模式：按锚点事件分组，一次请求判断锚点与其k个候选事件（0表示不启用，启用时优先于多对批量分析）
+    # [EN] Anchor mode: group pairs by anchor event and judge an anchor against k candidates per request (0 disables; takes precedence over multi-pair batching)
+    anchor_candidates = int(os.environ.get("CAUSAL_ANCHOR_CANDIDATES", "0"))
+    
+    # [CN] 模型级联：首轮用上面的模型判断，判定存在因果关系或置信度不足的事件对升级到强模型（如 gpt-4o），为空时不启用
+    # [EN] Model cascade: first-pass verdicts use the model above; positive or low-confidence pairs escalate to a stronger model (e.g. gpt-4o), disabled when empty
+    escalation_model = os.environ.get("CAUSAL_ESCALATION_MODEL", "")
+    escalation_provider = os.environ.get("CAUSAL_ESCALATION_PROVIDER", "openai")
+    escalation_api_key = os.environ.get("OPENAI_API_KEY" if escalation_provider == "openai" else "DEEPSEEK_API_KEY", "")
+    escalation_confidence = float(os.environ.get("CAUSAL_ESCALATION_CONFIDENCE", "0.8"))
+    if escalation_model and not escalation_api_key:
+        print(f"# [CN] 未找到 {escalation_provider} API 密钥，不启用模型级联")
+        print(f"# [EN] No {escalation_provider} API key found, model cascade disabled")
+        escalation_model = ""
+    
+    # [CN] 因果判断持久化缓存：按两个事件内容哈希缓存判断（包括无因果关系），重复运行和重叠章节窗口不再重复请求
+    # [EN] Persistent causal verdict cache keyed by both events' content hashes (negatives included), so reruns and overlapping windows skip judged pairs
+    use_cache = os.environ.get("CAUSAL_CACHE", "true").lower() in ["1", "true", "yes"]
+    cache_path = os.environ.get("CAUSAL_CACHE_PATH", os.path.join(get_output_path("cache"), "causal_cache.json")) if use_cache else ""
+    cache_max_entries = int(os.environ.get("CAUSAL_CACHE_MAX_ENTRIES", "50000"))
+    
+    analyzer_kwargs = {
+        "escalation_model": escalation_model,
+        "escalation_provider": escalation_provider,
+        "escalation_api_key": escalation_api_key,
+        "confidence_threshold": escalation_confidence,
+        "cache_path": cache_path,
+        "cache_max_entries": cache_max_entries
+    }
+    
     # [CN] 根据参数选择使用优化模式还是原始模式
     # [EN] Choose to use optimized mode or original mode based on parameters
     if use_optimized:
@@ -103,7 +137,10 @@ def provide_linker(use_optimized: bool = True) -> AbstractLinker:
             min_entity_support=min_entity_support,
             max_chapter_span=max_chapter_span,
             max_candidate_pairs=max_candidate_pairs,
-            use_entity_weights=use_entity_weights
+            use_entity_weights=use_entity_weights,
+            pairs_per_prompt=pairs_per_prompt,
+            anchor_candidates=anchor_candidates,
+            **analyzer_kwargs
         )
     else:
         # [CN] 使用原始版链接器
@@ -114,5 +151,6 @@ def provide_linker(use_optimized: bool = True) -> AbstractLinker:
             api_key=api_key,
             max_workers=3,
             strength_mapping=strength_mapping,
-            provider=provider
+            provider=provider,
+            **analyzer_kwargs
         )
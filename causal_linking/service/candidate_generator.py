@@ -13,12 +13,15 @@
 # [EN] 3. Merge strategy results
 """
 
+import heapq
 import math
+import random
 import itertools
-from typing import List, Dict, Tuple, DefaultDict, Set
+from typing import Iterator, List, Dict, Tuple, DefaultDict, Set, Optional
 from collections import defaultdict
 
 from common.models.event import EventItem
+from common.utils.chapter_ordinal import ChapterOrdinalTable
 
 
 class CandidateGenerator:
@@ -37,7 +40,8 @@ class CandidateGenerator:
         max_candidate_pairs: int = 150,  # [CN] 适当增加最大候选对上限 # [EN] Appropriately increase maximum candidate pairs limit
         use_entity_weights: bool = True,
         max_pairs_per_entity: int = 15,  # [CN] 增加每个实体最多生成的事件对数量 # [EN] Increase maximum event pairs generated per entity
-        connection_density: float = 0.2  # [CN] 新参数：控制连接密度的系数(0-1之间) # [EN] New parameter: coefficient to control connection density (0-1)
+        connection_density: float = 0.2,  # [CN] 新参数：控制连接密度的系数(0-1之间) # [EN] New parameter: coefficient to control connection density (0-1)
+        ordinal_table: Optional[ChapterOrdinalTable] = None
     ):
         """
         # [CN] 初始化事件对生成器
@@ -58,6 +62,8 @@ class CandidateGenerator:
             # [EN] max_pairs_per_entity: Maximum number of event pairs generated per entity
             # [CN] connection_density: 连接密度系数，控制生成事件对的稠密度
             # [EN] connection_density: Connection density coefficient, controls the density of generated event pairs
+            # [CN] ordinal_table: 章节序号表，默认使用本次运行共享的序号表
+            # [EN] ordinal_table: Chapter ordinal table, defaults to the table shared within this run
         """
         self.max_events_per_chapter = max_events_per_chapter
         self.min_entity_support = min_entity_support
@@ -66,6 +72,7 @@ class CandidateGenerator:
         self.use_entity_weights = use_entity_weights
         self.max_pairs_per_entity = max_pairs_per_entity
         self.connection_density = min(1.0, max(0.1, connection_density))  # [CN] 确保在0.1-1之间 # [EN] Ensure between 0.1-1
+        self.ordinal_table = ordinal_table or ChapterOrdinalTable.shared()
     
     def generate_candidates(self, events: List[EventItem]) -> List[Tuple[str, str]]:
         """
@@ -89,6 +96,10 @@ class CandidateGenerator:
               f"max chapter span={self.max_chapter_span}, max candidate pairs={self.max_candidate_pairs}, "
               f"max pairs per entity={self.max_pairs_per_entity}")
         
+        # [CN] 预先解析所有章节ID的序号
+        # [EN] Pre-parse the ordinals of all chapter IDs
+        self.ordinal_table.build(event.chapter_id for event in events if event.chapter_id)
+        
         # [CN] 1. 同章节事件配对
         # [EN] 1. Same chapter event pairing
         print("# [CN] 正在执行策略1: 同章节事件配对...")
@@ -113,6 +124,50 @@ class CandidateGenerator:
         
         return candidate_pairs
     
+    def generate_incremental_candidates(
+        self,
+        existing_events: List[EventItem],
+        new_events: List[EventItem]
+    ) -> List[Tuple[str, str]]:
+        """
+        # [CN] 增量生成候选事件对：只保留至少包含一个新事件的事件对
+        # [EN] Generate candidate event pairs incrementally: keep only pairs involving at least one new event
+        
+        Args:
+            # [CN] existing_events: 已完成因果分析的事件列表
+            # [EN] existing_events: Events whose causal relations were already analyzed
+            # [CN] new_events: 新增的事件列表
+            # [EN] new_events: Newly added events
+            
+        Returns:
+            # [CN] 事件ID对列表 [(event_id1, event_id2), ...]
+            # [EN] List of event ID pairs [(event_id1, event_id2), ...]
+        """
+        new_ids = {event.event_id for event in new_events}
+        events = [event for event in existing_events if event.event_id not in new_ids] + list(new_events)
+        self.ordinal_table.build(event.chapter_id for event in events if event.chapter_id)
+        
+        # [CN] 1. 同章节配对只需处理包含新事件的章节
+        # [EN] 1. Same chapter pairing only needs the chapters that contain new events
+        new_chapters = {event.chapter_id for event in new_events if event.chapter_id}
+        chapter_events = [event for event in events if event.chapter_id in new_chapters]
+        chapter_pairs = [
+            pair for pair in self._generate_same_chapter_pairs(chapter_events)
+            if pair[0] in new_ids or pair[1] in new_ids
+        ]
+        
+        # [CN] 2. 实体共现配对：实体频率和权重仍按全部事件计算
+        # [EN] 2. Entity co-occurrence pairing: entity frequencies and weights are still computed over all events
+        entity_pairs = self._generate_entity_co_occurrence_pairs(events, anchor_ids=new_ids)
+        
+        # [CN] 3. 合并候选事件对，去重
+        # [EN] 3. Merge candidate event pairs, deduplicate
+        candidate_pairs = self._merge_candidate_pairs(chapter_pairs, entity_pairs)
+        print(f"# [CN] 增量候选事件对: {len(candidate_pairs)} 对（新事件 {len(new_ids)} 个）")
+        print(f"# [EN] Incremental candidate event pairs: {len(candidate_pairs)} pairs ({len(new_ids)} new events)")
+        
+        return candidate_pairs
+    
     def _generate_same_chapter_pairs(self, events: List[EventItem]) -> List[Tuple[str, str]]:
         """
         # [CN] 生成同章节事件配对
@@ -177,14 +232,14 @@ class CandidateGenerator:
             # 如果仍未达到目标数量，添加随机事件对
             if len(chapter_pairs) < target_pairs_count:
                 # 组合所有可能的事件对
+                adjacent_pairs = set(chapter_pairs)
                 all_pairs = []
                 for event1, event2 in itertools.combinations(chapter_event_list, 2):
                     pair = (event1.event_id, event2.event_id) if event1.event_id < event2.event_id else (event2.event_id, event1.event_id)
-                    if pair not in chapter_pairs:  # 避免重复已添加的相邻事件对
+                    if pair not in adjacent_pairs:  # 避免重复已添加的相邻事件对
                         all_pairs.append(pair)
                 
                 # 随机选择剩余的事件对
-                import random
                 remaining_needed = min(target_pairs_count - len(chapter_pairs), len(all_pairs))
                 if remaining_needed > 0 and all_pairs:
                     random_pairs = random.sample(all_pairs, remaining_needed)
@@ -204,32 +259,21 @@ class CandidateGenerator:
             event: 事件对象
             
         Returns:
-            章节编号，如果无法解析则返回0
+            章节编号（支持"第一百零三章"等中文数字、"第103章"和"E103-2"格式），如果无法解析则返回0
         """
-        if not event.chapter_id:
-            return 0
-            
-        try:
-            # 处理不同格式的章节ID
-            chapter_id = event.chapter_id
-            # 处理"第X章"格式
-            if "第" in chapter_id and "章" in chapter_id:
-                chapter_id = chapter_id.replace("第", "").replace("章", "")
-            # 处理"EXX-Y"格式（如E01-2）
-            elif chapter_id.startswith("E") and "-" in chapter_id:
-                chapter_id = chapter_id.split("-")[0][1:]
-            
-            # 尝试转换为整数
-            return int(chapter_id)
-        except (ValueError, TypeError):
-            return 0
+        return self.ordinal_table.ordinal(event.chapter_id) or 0
     
-    def _generate_entity_co_occurrence_pairs(self, events: List[EventItem]) -> List[Tuple[str, str]]:
+    def _generate_entity_co_occurrence_pairs(
+        self,
+        events: List[EventItem],
+        anchor_ids: Optional[Set[str]] = None
+    ) -> List[Tuple[str, str]]:
         """
         生成基于实体共现的跨章节事件配对
         
         Args:
             events: 事件列表
+            anchor_ids: 增量模式下的新事件ID，指定时只保留至少包含其中一个事件的事件对
             
         Returns:
             事件ID对列表 [(event_id1, event_id2), ...]
@@ -265,14 +309,15 @@ class CandidateGenerator:
                 # 根据事件的chapter_id排序以便应用章节跨度限制
                 entity_events.sort(key=lambda e: e.chapter_id if e.chapter_id else "")
                 
-                for event1, event2 in itertools.combinations(entity_events, 2):
-                    # 检查章节跨度
-                    if self._check_chapter_span(event1, event2):
-                        # 确保事件对按ID排序，避免重复
-                        if event1.event_id < event2.event_id:
-                            pairs.append((event1.event_id, event2.event_id))
-                        else:
-                            pairs.append((event2.event_id, event1.event_id))
+                # 只遍历章节跨度合法的事件对
+                for event1, event2 in self._pairs_within_span(entity_events):
+                    if anchor_ids is not None and event1.event_id not in anchor_ids and event2.event_id not in anchor_ids:
+                        continue
+                    # 确保事件对按ID排序，避免重复
+                    if event1.event_id < event2.event_id:
+                        pairs.append((event1.event_id, event2.event_id))
+                    else:
+                        pairs.append((event2.event_id, event1.event_id))
             
             return list(set(pairs))  # 去重后返回
         else:
@@ -295,7 +340,10 @@ class CandidateGenerator:
             )
             
             # 计算总共可生成的实体对配额
-            total_quota = min(self.max_candidate_pairs * 2, sum(1 for e in candidate_entities.values() for _ in itertools.combinations(e, 2)))
+            total_quota = min(
+                self.max_candidate_pairs * 2,
+                sum(len(e) * (len(e) - 1) // 2 for e in candidate_entities.values())
+            )
             remaining_quota = total_quota
             
             for entity, entity_events in sorted_entities:
@@ -343,21 +391,13 @@ class CandidateGenerator:
                 
                 # 限制每个实体生成的事件对数量，但要确保有足够的样本
                 entity_pairs_count = 0
-                valid_combinations = []
-                
-                # 预先收集所有有效的事件对
-                for event1, event2 in itertools.combinations(entity_events, 2):
-                    if self._check_chapter_span(event1, event2):
-                        # 确定事件对顺序
-                        pair = (event1, event2) if event1.event_id < event2.event_id else (event2, event1)
-                        valid_combinations.append(pair)
                 
-                # 优先考虑章节接近的事件对（可能性更高）
-                valid_combinations.sort(key=lambda pair: abs(self._get_chapter_num(pair[0]) - self._get_chapter_num(pair[1])))
+                # 优先考虑章节接近的事件对（可能性更高），只取配额内的前几对
+                closest_pairs = self._closest_pairs(entity_events, entity_quota, anchor_ids)
                 
                 # 根据配额选择事件对
-                quota_to_use = min(entity_quota, len(valid_combinations))
-                for event1, event2 in valid_combinations[:quota_to_use]:
+                quota_to_use = len(closest_pairs)
+                for event1, event2 in closest_pairs:
                     # 确保事件对按ID排序
                     if event1.event_id < event2.event_id:
                         weighted_pairs.append((event1.event_id, event2.event_id, entity_weight))
@@ -392,6 +432,87 @@ class CandidateGenerator:
             
             return sorted_pairs
     
+    def _order_by_chapter(self, entity_events: List[EventItem]) -> Tuple[List[Optional[int]], List[int], List[int]]:
+        """
+        预先计算事件的章节序号，并按序号排列事件下标
+        
+        Args:
+            entity_events: 实体的事件列表
+            
+        Returns:
+            (章节序号列表（无法解析时为None）, 计算章节距离用的序号列表（无法解析时为0）,
+             按序号排序的事件下标（序号相同时保持原始顺序）)
+        """
+        ordinals = [self.ordinal_table.ordinal(event.chapter_id) for event in entity_events]
+        chapter_nums = [ordinal or 0 for ordinal in ordinals]
+        order = sorted(range(len(entity_events)), key=lambda index: (chapter_nums[index], index))
+        return ordinals, chapter_nums, order
+    
+    def _pairs_within_span(self, entity_events: List[EventItem]) -> Iterator[Tuple[EventItem, EventItem]]:
+        """
+        用滑动窗口列出章节跨度合法的全部事件对，不遍历跨度之外的组合
+        
+        Args:
+            entity_events: 实体的事件列表
+            
+        Yields:
+            章节跨度合法的事件对
+        """
+        ordinals, chapter_nums, order = self._order_by_chapter(entity_events)
+        for a, first in enumerate(order):
+            for second in order[a + 1:]:
+                # 按序号排序后越往后章节越远；无法解析的章节序号记为0，总排在最前面
+                if (ordinals[first] is not None and ordinals[second] is not None
+                        and chapter_nums[second] - chapter_nums[first] > self.max_chapter_span):
+                    break
+                yield entity_events[first], entity_events[second]
+    
+    def _closest_pairs(
+        self,
+        entity_events: List[EventItem],
+        limit: int,
+        anchor_ids: Optional[Set[str]] = None
+    ) -> List[Tuple[EventItem, EventItem]]:
+        """
+        按章节距离从近到远选出前 limit 个章节跨度合法的事件对
+        
+        结果与"把全部组合按章节距离稳定排序后取前 limit 个"相同，但不展开全部组合：
+        事件按序号排序后，每个事件和排在它后面的事件构成一条距离递增的链，
+        用堆对所有链做多路归并；链上出现超出最大跨度的事件对时整条链停止。
+        
+        Args:
+            entity_events: 实体的事件列表
+            limit: 最多选出的事件对数量
+            anchor_ids: 增量模式下的新事件ID，指定时只选择至少包含其中一个事件的事件对
+            
+        Returns:
+            事件对列表，每对按事件ID排序
+        """
+        ordinals, chapter_nums, order = self._order_by_chapter(entity_events)
+        
+        def chain_entry(a: int, b: int) -> Tuple[int, int, int, int, int]:
+            # 距离相同时按组合在原列表中的先后排序，与稳定排序的结果一致
+            first, second = order[a], order[b]
+            return (chapter_nums[second] - chapter_nums[first], min(first, second), max(first, second), a, b)
+        
+        heap = [chain_entry(a, a + 1) for a in range(len(order) - 1)]
+        heapq.heapify(heap)
+        
+        selected = []
+        while heap and len(selected) < limit:
+            distance, first, second, a, b = heapq.heappop(heap)
+            if ordinals[first] is not None and ordinals[second] is not None and distance > self.max_chapter_span:
+                continue
+            if b + 1 < len(order):
+                heapq.heappush(heap, chain_entry(a, b + 1))
+            
+            event1, event2 = entity_events[first], entity_events[second]
+            if anchor_ids is not None and event1.event_id not in anchor_ids and event2.event_id not in anchor_ids:
+                continue
+            selected.append((event1, event2) if event1.event_id < event2.event_id else (event2, event1))
+        
+        return selected
+    
     def _check_chapter_span(self, event1: EventItem, event2: EventItem) -> bool:
         """
         检查两个事件的章节跨度是否在允许范围内
@@ -403,15 +524,10 @@ class CandidateGenerator:
         Returns:
             如果章节跨度合法则返回True，否则返回False
         """
-        if event1.chapter_id and event2.chapter_id:
-            try:
-                ch1 = int(event1.chapter_id.replace("第", "").replace("章", ""))
-                ch2 = int(event2.chapter_id.replace("第", "").replace("章", ""))
-                if abs(ch1 - ch2) > self.max_chapter_span:
-                    return False
-            except (ValueError, AttributeError):
-                # 如果章节ID不是数字格式，跳过跨度检查
-                pass
+        span = self.ordinal_table.span(event1.chapter_id, event2.chapter_id)
+        # 任一章节ID无法解析时跳过跨度检查
+        if span is not None and span > self.max_chapter_span:
+            return False
         return True
     
     def _merge_candidate_pairs(
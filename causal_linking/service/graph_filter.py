@@ -121,6 +121,49 @@ class GraphFilter:
         
         return dag_edges
     
+    def extend_dag(
+        self,
+        events: List[EventItem],
+        dag_edges: List[CausalEdge],
+        new_edges: List[CausalEdge]
+    ) -> List[CausalEdge]:
+        """
+        把新发现的边并入已有的DAG
+        
+        已有的边优先保留（其本身已经是DAG），新边按强度从高到低逐条加入，
+        跳过重复的边和会形成环的边。
+        
+        Args:
+            events: 全部事件列表（已有事件和新事件）
+            dag_edges: 已有DAG的边
+            new_edges: 新发现的因果边
+            
+        Returns:
+            合并后的因果边列表（DAG）
+        """
+        event_map = {event.event_id: i for i, event in enumerate(events)}
+        graph = [[] for _ in range(len(events))]
+        merged_edges = []
+        added_edges = set()
+        
+        candidates = list(dag_edges) + self._sort_edges_by_priority(new_edges, event_map)
+        for edge in candidates:
+            if edge.from_id not in event_map or edge.to_id not in event_map:
+                continue
+            
+            from_idx = event_map[edge.from_id]
+            to_idx = event_map[edge.to_id]
+            edge_key = (from_idx, to_idx)
+            if edge_key in added_edges:
+                continue
+            
+            if not self._will_form_cycle(graph, from_idx, to_idx):
+                graph[from_idx].append(to_idx)
+                added_edges.add(edge_key)
+                merged_edges.append(edge)
+        
+        return merged_edges
+    
     def _sort_edges_by_priority(self, edges: List[CausalEdge], event_map: Optional[Dict[str, int]] = None) -> List[CausalEdge]:
         """
         按优先级排序边
@@ -6,15 +6,24 @@
 1. 生成问题提示
 2. 调用LLM分析因果关系
 3. 解析LLM响应
+4. 多对批量模式：相邻章节窗口内的若干事件对共用一份事件卡片，在一次请求中逐对判断
+5. 锚点模式：按锚点事件分组，一次请求判断锚点与其k个候选事件之间的因果关系
+6. 持久化判断缓存：按两个事件内容哈希的规范顺序缓存判断（包括无因果关系），重复运行不再重复请求
 """
 
+import heapq
+import json
 import os
-from typing import Dict, Any, Optional, List, Tuple
+from collections import defaultdict
+from typing import Callable, Dict, Any, Optional, List, Tuple
 from concurrent.futures import ThreadPoolExecutor
 
 from common.models.event import EventItem
 from common.models.causal_edge import CausalEdge
 from event_extraction.repository.llm_client import LLMClient
+from common.utils.model_cascade import ModelCascade
+from common.utils.chapter_ordinal import ChapterOrdinalTable
+from common.utils.result_cache import ResultCache
 
 
 class PairAnalyzer:
@@ -23,6 +32,9 @@ class PairAnalyzer:
     负责分析事件对之间的因果关系
     """
     
+    # 计算事件内容哈希的字段（不含事件ID，内容变化后旧判断自然失效）
+    CONTENT_FIELDS = ("description", "characters", "treasures", "result", "location", "time", "chapter_id")
+    
     def __init__(
         self,
         model: str = "gpt-4o", 
@@ -30,7 +42,16 @@ class PairAnalyzer:
         api_key: str = "",
         base_url: str = "",
         max_workers: int = 3,
-        provider: str = "openai"
+        provider: str = "openai",
+        escalation_model: str = "",
+        escalation_provider: str = "openai",
+        escalation_api_key: str = "",
+        escalation_base_url: str = "",
+        confidence_threshold: float = 0.8,
+        pairs_per_prompt: int = 1,
+        anchor_candidates: int = 0,
+        cache_path: str = "",
+        cache_max_entries: int = 50000
     ):
         """
         初始化事件对分析器
@@ -42,6 +63,16 @@ class PairAnalyzer:
             base_url: 自定义API基础URL
             max_workers: 并行处理的最大工作线程数
             provider: API提供商，如"openai"或"deepseek"
+            escalation_model: 升级使用的强模型，为空时所有事件对都使用 model；
+                              设置后 model 只做首轮判断，判定存在因果关系或置信度低于阈值时改用该模型重新判断
+            escalation_provider: 强模型的API提供商
+            escalation_api_key: 强模型的API密钥，为空时从对应提供商的环境变量获取
+            escalation_base_url: 强模型的自定义API基础URL
+            confidence_threshold: 首轮判断无因果关系且置信度达到该值时不再升级
+            pairs_per_prompt: 每次请求判断的事件对数，1表示逐对请求
+            anchor_candidates: 锚点模式下每次请求的候选事件数k，0表示不使用锚点模式
+            cache_path: 因果判断缓存文件路径，为空时不使用缓存
+            cache_max_entries: 缓存的最大条目数，超出时淘汰最久未使用的条目
         """
         # 如果未提供API密钥，尝试从环境变量获取
         if not api_key:
@@ -63,6 +94,10 @@ class PairAnalyzer:
         self.max_workers = max_workers
         self.provider = provider
         self.prompt_path = prompt_path
+        self.escalation_model = escalation_model
+        self.confidence_threshold = confidence_threshold
+        self.pairs_per_prompt = max(1, pairs_per_prompt)
+        self.anchor_candidates = max(0, anchor_candidates)
         
         # 加载提示模板
         self.prompt_template = self._load_prompt_template(prompt_path)
@@ -74,6 +109,19 @@ class PairAnalyzer:
             base_url=self.base_url,
             provider=self.provider
         )
+        # 首轮使用 model，阳性或不确定的判断升级到强模型
+        self.escalation_client = LLMClient(
+            api_key=escalation_api_key or None,
+            model=escalation_model,
+            base_url=escalation_base_url or None,
+            provider=escalation_provider
+        ) if escalation_model else None
+        self.cascade = ModelCascade(self.llm_client, self.escalation_client)
+        
+        # 判断只取决于两个事件的内容、模型和提示词
+        self.cache = ResultCache(cache_path, cache_max_entries, namespace="causal_verdicts") if cache_path else None
+        self._prompt_hash = ResultCache.make_key(self.prompt_template)
+        self.last_cache_stats: Dict[str, Any] = {}
     
     def _load_prompt_template(self, prompt_path: str) -> Dict[str, str]:
         """
@@ -85,8 +133,6 @@ class PairAnalyzer:
         Returns:
             提示模板字典
         """
-        import json
-        
         try:
             with open(prompt_path, "r", encoding="utf-8") as f:
                 return json.load(f)
@@ -107,14 +153,44 @@ class PairAnalyzer:
         Returns:
             因果边列表
         """
+        self.cascade.reset_stats()
+        try:
+            # 已判断过的事件对直接使用缓存的判断
+            edges, event_pairs = self.split_cached(event_pairs)
+            edges.extend(self._analyze_uncached(event_pairs))
+        finally:
+            self._print_cascade_stats()
+            self.report_cache_stats()
+        return edges
+    
+    def _analyze_uncached(self, event_pairs: List[Tuple[EventItem, EventItem]]) -> List[CausalEdge]:
+        """按配置的提示模式分析未命中缓存的事件对"""
         edges = []
         
+        if self.anchor_candidates > 0 and "anchor_instruction" in self.prompt_template and len(event_pairs) > 1:
+            groups = self.group_by_anchor(event_pairs)
+            print(f"锚点分析: {len(event_pairs)} 对事件合并为 {len(groups)} 次请求")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self.analyze_anchor_group, anchor, pairs) for anchor, pairs in groups]
+                for future in futures:
+                    edges.extend(future.result())
+            return edges
+        
+        if self.pairs_per_prompt > 1 and "batch_instruction" in self.prompt_template and len(event_pairs) > 1:
+            groups = self.group_pairs(event_pairs)
+            print(f"多对批量分析: {len(event_pairs)} 对事件合并为 {len(groups)} 次请求")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self.analyze_pair_group, group) for group in groups]
+                for future in futures:
+                    edges.extend(future.result())
+            return edges
+        
         # 使用线程池并行处理事件对
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             futures = []
             
             for event1, event2 in event_pairs:
-                future = executor.submit(self.analyze_pair, event1, event2)
+                future = executor.submit(self.analyze_pair, event1, event2, False)
                 futures.append(future)
             
             # 收集所有结果
@@ -125,28 +201,326 @@ class PairAnalyzer:
         
         return edges
     
-    def analyze_pair(self, event1: EventItem, event2: EventItem) -> Optional[CausalEdge]:
+    def split_cached(
+        self,
+        event_pairs: List[Tuple[EventItem, EventItem]]
+    ) -> Tuple[List[CausalEdge], List[Tuple[EventItem, EventItem]]]:
+        """
+        查询缓存，把事件对分为已有判断的和需要请求的
+        
+        Args:
+            event_pairs: 事件对列表
+            
+        Returns:
+            (缓存判断得到的因果边, 未命中缓存的事件对)；未启用缓存时全部需要请求
+        """
+        if self.cache is None:
+            return [], list(event_pairs)
+        self.cache.reset_stats()
+        edges, pending = [], []
+        for event1, event2 in event_pairs:
+            verdict = self.get_cached_verdict(event1, event2)
+            if verdict is None:
+                pending.append((event1, event2))
+                continue
+            edge = self.parse_response(verdict, event1.event_id, event2.event_id)
+            if edge:
+                edges.append(edge)
+        return edges, pending
+    
+    def _print_cascade_stats(self) -> None:
+        """打印本次分析的模型级联统计"""
+        if self.cascade.enabled:
+            stats = self.cascade.stats()
+            print(f"模型级联: 首轮 {self.model} 请求 {stats['primary_calls']} 次，升级到 {self.escalation_model} {stats['escalations']} 次")
+    
+    def report_cache_stats(self) -> None:
+        """打印本次分析的缓存命中率，并把新判断写回缓存文件"""
+        if self.cache is None:
+            return
+        stats = self.last_cache_stats = self.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        if lookups:
+            print(f"因果判断缓存: 命中 {stats['hits']}/{lookups} ({stats['hit_rate']:.1%})，共 {stats['size']} 条")
+        self.cache.save()
+    
+    @classmethod
+    def content_hash(cls, event: EventItem) -> str:
+        """
+        计算事件内容哈希（不含事件ID）
+        
+        Args:
+            event: 事件
+            
+        Returns:
+            内容哈希
+        """
+        return ResultCache.make_key({field: getattr(event, field, None) for field in cls.CONTENT_FIELDS})
+    
+    def verdict_key(self, event1: EventItem, event2: EventItem) -> Tuple[str, bool]:
+        """
+        计算事件对的缓存键：两个事件内容哈希按规范顺序排列，与事件对的先后顺序无关
+        
+        Args:
+            event1: 第一个事件
+            event2: 第二个事件
+            
+        Returns:
+            (缓存键, 事件对顺序是否与规范顺序相反)
+        """
+        hash1, hash2 = self.content_hash(event1), self.content_hash(event2)
+        swapped = hash1 > hash2
+        first, second = (hash2, hash1) if swapped else (hash1, hash2)
+        model = f"{self.model}>{self.escalation_model}" if self.escalation_model else self.model
+        return ResultCache.make_key(first, second, model, self._prompt_hash), swapped
+    
+    @staticmethod
+    def _flip_direction(direction: str) -> str:
+        """交换方向中的两个事件"""
+        return {"event1->event2": "event2->event1", "event2->event1": "event1->event2"}.get(direction, direction)
+    
+    def get_cached_verdict(self, event1: EventItem, event2: EventItem) -> Optional[Dict[str, Any]]:
+        """
+        查询事件对的缓存判断
+        
+        Args:
+            event1: 第一个事件
+            event2: 第二个事件
+            
+        Returns:
+            方向相对于 (event1, event2) 的判断，未命中或未启用缓存时返回None
+        """
+        if self.cache is None:
+            return None
+        key, swapped = self.verdict_key(event1, event2)
+        data = self.cache.get(key)
+        if not isinstance(data, dict):
+            return None
+        verdict = dict(data)
+        if swapped:
+            verdict["direction"] = self._flip_direction(verdict.get("direction", ""))
+        return verdict
+    
+    def store_verdict(self, event1: EventItem, event2: EventItem, verdict: Dict[str, Any]) -> None:
+        """
+        缓存事件对的判断（包括无因果关系），方向按规范顺序保存
+        
+        Args:
+            event1: 第一个事件
+            event2: 第二个事件
+            verdict: 方向相对于 (event1, event2) 的判断
+        """
+        if self.cache is None:
+            return
+        has_causal = bool(verdict.get("has_causal_relation", False))
+        direction = verdict.get("direction", "") if has_causal else ""
+        if has_causal and direction not in ("event1->event2", "event2->event1"):
+            return
+        key, swapped = self.verdict_key(event1, event2)
+        self.cache.put(key, {
+            "has_causal_relation": has_causal,
+            "direction": self._flip_direction(direction) if swapped else direction,
+            "strength": verdict.get("strength", "中") if has_causal else "",
+            "reason": verdict.get("reason", "")
+        })
+    
+    def group_pairs(self, event_pairs: List[Tuple[EventItem, EventItem]]) -> List[List[Tuple[EventItem, EventItem]]]:
+        """
+        按章节窗口将事件对分组，相邻章节的事件对放在同一组，使组内事件卡片尽量共用
+        
+        Args:
+            event_pairs: 事件对列表
+            
+        Returns:
+            事件对分组，每组最多 pairs_per_prompt 对
+        """
+        ordinals = ChapterOrdinalTable.shared()
+        
+        def window(pair: Tuple[EventItem, EventItem]) -> Tuple[int, int, str, str]:
+            chapters = sorted(
+                ordinal if ordinal is not None else -1
+                for ordinal in (ordinals.ordinal(pair[0].chapter_id), ordinals.ordinal(pair[1].chapter_id))
+            )
+            first, second = sorted((pair[0].event_id, pair[1].event_id))
+            return chapters[0], chapters[1], first, second
+        
+        ordered = sorted(event_pairs, key=window)
+        return [ordered[i:i + self.pairs_per_prompt] for i in range(0, len(ordered), self.pairs_per_prompt)]
+    
+    def analyze_pair_group(self, event_pairs: List[Tuple[EventItem, EventItem]]) -> List[CausalEdge]:
+        """
+        在一次请求中分析一组事件对，缺失或无效的判断回退为逐对请求
+        
+        Args:
+            event_pairs: 事件对列表
+            
+        Returns:
+            因果边列表
+        """
+        if len(event_pairs) == 1:
+            # 调用方已查询过缓存，不再重复查询
+            edge = self.analyze_pair(*event_pairs[0], use_cache=False)
+            return [edge] if edge else []
+        
+        return self._analyze_group(
+            event_pairs,
+            self.format_batch_prompt,
+            lambda content, pairs: self.parse_batch_response(content, len(pairs))
+        )
+    
+    def group_by_anchor(
+        self,
+        event_pairs: List[Tuple[EventItem, EventItem]]
+    ) -> List[Tuple[EventItem, List[Tuple[EventItem, EventItem]]]]:
+        """
+        按锚点事件分组：反复选取尚未分配的事件对最多的事件作为锚点，
+        把它参与的事件对分给它，每组最多 anchor_candidates 个候选事件
+        
+        Args:
+            event_pairs: 事件对列表
+            
+        Returns:
+            (锚点事件, 包含锚点的事件对列表) 的列表，每个事件对只出现在一组中
+        """
+        events: Dict[str, EventItem] = {}
+        incident: Dict[str, List[int]] = defaultdict(list)
+        for index, (event1, event2) in enumerate(event_pairs):
+            for event in (event1, event2):
+                events.setdefault(event.event_id, event)
+                incident[event.event_id].append(index)
+        
+        order = {event_id: position for position, event_id in enumerate(events)}
+        heap = [(-len(indices), order[event_id], event_id) for event_id, indices in incident.items()]
+        heapq.heapify(heap)
+        assigned = set()
+        groups = []
+        while heap:
+            degree, position, event_id = heapq.heappop(heap)
+            remaining = [index for index in incident[event_id] if index not in assigned]
+            if not remaining:
+                continue
+            if len(remaining) < -degree:
+                # 度数已过期，按当前度数重新入堆
+                heapq.heappush(heap, (-len(remaining), position, event_id))
+                continue
+            assigned.update(remaining)
+            for i in range(0, len(remaining), self.anchor_candidates):
+                groups.append((events[event_id], [event_pairs[index] for index in remaining[i:i + self.anchor_candidates]]))
+        return groups
+    
+    def analyze_anchor_group(
+        self,
+        anchor: EventItem,
+        event_pairs: List[Tuple[EventItem, EventItem]]
+    ) -> List[CausalEdge]:
+        """
+        在一次请求中判断锚点事件与其候选事件之间的因果关系，缺失或无效的判断回退为逐对请求
+        
+        Args:
+            anchor: 锚点事件
+            event_pairs: 包含锚点的事件对列表
+            
+        Returns:
+            因果边列表
+        """
+        if len(event_pairs) == 1:
+            # 调用方已查询过缓存，不再重复查询
+            edge = self.analyze_pair(*event_pairs[0], use_cache=False)
+            return [edge] if edge else []
+        
+        return self._analyze_group(
+            event_pairs,
+            lambda pairs: self.format_anchor_prompt(anchor, pairs),
+            lambda content, pairs: self.parse_anchor_response(content, anchor, pairs)
+        )
+    
+    def _analyze_group(
+        self,
+        event_pairs: List[Tuple[EventItem, EventItem]],
+        format_prompt: Callable[[List[Tuple[EventItem, EventItem]]], Dict[str, str]],
+        parse_verdicts: Callable[[Dict[str, Any], List[Tuple[EventItem, EventItem]]], Dict[int, Dict[str, Any]]]
+    ) -> List[CausalEdge]:
+        """
+        发送一组事件对的合并请求，复核阳性或不确定的判断，并逐对补充缺失的判断
+        
+        Args:
+            event_pairs: 事件对列表
+            format_prompt: 由事件对列表生成提示词
+            parse_verdicts: 从响应中解析判断，返回事件对序号到判断（方向相对于事件对的顺序）的映射
+            
+        Returns:
+            因果边列表
+        """
+        prompt = format_prompt(event_pairs)
+        response = self.cascade.call_with_json_response(prompt['system'], prompt['instruction'])
+        if not response["success"] or "json_content" not in response:
+            print(f"合并分析请求失败: {response.get('error', '未知错误')}，回退为逐对分析")
+            verdicts = {}
+        else:
+            verdicts = parse_verdicts(response["json_content"], event_pairs)
+        
+        # 阳性或不确定的判断合并为一次强模型请求复核
+        unreviewed = set()
+        if self.cascade.enabled:
+            uncertain = [index for index, verdict in verdicts.items() if self.needs_escalation(verdict)]
+            if uncertain:
+                uncertain_pairs = [event_pairs[index] for index in uncertain]
+                prompt = format_prompt(uncertain_pairs)
+                response = self.cascade.escalate(prompt['system'], prompt['instruction'])
+                reviewed = {}
+                if response["success"] and "json_content" in response:
+                    reviewed = parse_verdicts(response["json_content"], uncertain_pairs)
+                    verdicts.update({uncertain[index]: verdict for index, verdict in reviewed.items()})
+                unreviewed = {index for position, index in enumerate(uncertain) if position not in reviewed}
+        
+        edges = []
+        missing = 0
+        for index, (event1, event2) in enumerate(event_pairs):
+            verdict = verdicts.get(index)
+            if verdict is None:
+                missing += 1
+                edge = self.analyze_pair(event1, event2, False)
+            else:
+                if index not in unreviewed:
+                    self.store_verdict(event1, event2, verdict)
+                edge = self.parse_response(verdict, event1.event_id, event2.event_id)
+                if edge:
+                    print(f"发现因果关系: {edge.from_id} -> {edge.to_id}, 强度: {edge.strength}")
+            if edge:
+                edges.append(edge)
+        if missing:
+            print(f"合并分析缺少 {missing} 对事件的有效判断，已逐对补充分析")
+        return edges
+    
+    def analyze_pair(self, event1: EventItem, event2: EventItem, use_cache: bool = True) -> Optional[CausalEdge]:
         """
         分析一对事件的因果关系
         
         Args:
             event1: 第一个事件
             event2: 第二个事件
+            use_cache: 是否先查询缓存（调用方已查询过时为False），判断会写入缓存（复核失败时除外）
             
         Returns:
             因果边对象，如果不存在因果关系则返回None
         """
+        cached = self.get_cached_verdict(event1, event2) if use_cache else None
+        if cached is not None:
+            return self.parse_response(cached, event1.event_id, event2.event_id)
+        
         # 格式化提示
         prompt = self.format_prompt(event1, event2)
         
-        # 调用LLM
-        response = self.llm_client.call_with_json_response(prompt['system'], prompt['instruction'])
+        # 调用LLM（配置了升级模型时，阳性或不确定的判断由强模型复核）
+        response = self.cascade.call_with_json_response(prompt['system'], prompt['instruction'], self.needs_escalation)
         
         if not response["success"] or "json_content" not in response:
             print(f"事件 {event1.event_id} 和 {event2.event_id} 的因果分析失败: {response.get('error', '未知错误')}")
             return None
             
-        # 解析响应
+        # 解析响应；复核失败时保留的首轮判断不写入缓存，避免被当作复核后的判断复用
+        if not response.get("escalation_failed"):
+            self.store_verdict(event1, event2, response["json_content"])
         edge = self.parse_response(response["json_content"], event1.event_id, event2.event_id)
         
         if edge:
@@ -154,6 +528,24 @@ class PairAnalyzer:
             
         return edge
     
+    def needs_escalation(self, response: Dict[str, Any]) -> bool:
+        """
+        判断首轮判断是否需要强模型复核：判定存在因果关系，或置信度缺失、低于阈值
+        
+        Args:
+            response: LLM响应
+            
+        Returns:
+            需要升级时返回True
+        """
+        if response.get("has_causal_relation", False):
+            return True
+        try:
+            confidence = float(response.get("confidence"))
+        except (TypeError, ValueError):
+            return True
+        return confidence < self.confidence_threshold
+    
     def format_prompt(self, event1: EventItem, event2: EventItem) -> Dict[str, str]:
         """
         格式化提示词
@@ -165,33 +557,64 @@ class PairAnalyzer:
         Returns:
             格式化后的提示词字典，包含system和instruction
         """
-        # 格式化事件1描述
-        event1_desc = f"""
-事件ID: {event1.event_id}
-描述: {event1.description}
-相关角色: {', '.join(event1.characters) if event1.characters else '无'}
-相关宝物: {', '.join(event1.treasures) if event1.treasures else '无'}
-发生地点: {event1.location or '未知'}
-章节: {event1.chapter_id or '未知'}
-结果: {event1.result or '未知'}
-        """.strip()
+        # 从模板中获取系统提示和指令
+        system_prompt = self.prompt_template.get("system", "")
+        instruction = self.prompt_template.get("instruction", "").format(
+            event1=self.format_event_card(event1),
+            event2=self.format_event_card(event2)
+        )
         
-        # 格式化事件2描述
-        event2_desc = f"""
-事件ID: {event2.event_id}
-描述: {event2.description}
-相关角色: {', '.join(event2.characters) if event2.characters else '无'}
-相关宝物: {', '.join(event2.treasures) if event2.treasures else '无'}
-发生地点: {event2.location or '未知'}
-章节: {event2.chapter_id or '未知'}
-结果: {event2.result or '未知'}
+        return {
+            "system": system_prompt,
+            "instruction": instruction
+        }
+    
+    @staticmethod
+    def format_event_card(event: EventItem) -> str:
+        """
+        格式化事件描述卡片
+        
+        Args:
+            event: 事件
+            
+        Returns:
+            事件描述文本
+        """
+        return f"""
+事件ID: {event.event_id}
+描述: {event.description}
+相关角色: {', '.join(event.characters) if event.characters else '无'}
+相关宝物: {', '.join(event.treasures) if event.treasures else '无'}
+发生地点: {event.location or '未知'}
+章节: {event.chapter_id or '未知'}
+结果: {event.result or '未知'}
         """.strip()
+    
+    def format_batch_prompt(self, event_pairs: List[Tuple[EventItem, EventItem]]) -> Dict[str, str]:
+        """
+        格式化多对批量分析的提示词，每个事件的卡片只出现一次
+        
+        Args:
+            event_pairs: 事件对列表
+            
+        Returns:
+            格式化后的提示词字典，事件对编号为 P1、P2……
+        """
+        cards = {}
+        for pair in event_pairs:
+            for event in pair:
+                if event.event_id not in cards:
+                    cards[event.event_id] = self.format_event_card(event)
+        pairs = "\n".join(
+            f"P{index}: event1={event1.event_id}, event2={event2.event_id}"
+            for index, (event1, event2) in enumerate(event_pairs, 1)
+        )
         
-        # 从模板中获取系统提示和指令
         system_prompt = self.prompt_template.get("system", "")
-        instruction = self.prompt_template.get("instruction", "").format(
-            event1=event1_desc,
-            event2=event2_desc
+        instruction = self.prompt_template.get("batch_instruction", "").format(
+            events="\n\n".join(cards.values()),
+            pairs=pairs,
+            output_format=json.dumps(self.prompt_template.get("batch_output_format", {}), ensure_ascii=False, indent=2)
         )
         
         return {
@@ -199,6 +622,104 @@ class PairAnalyzer:
             "instruction": instruction
         }
     
+    def format_anchor_prompt(self, anchor: EventItem, event_pairs: List[Tuple[EventItem, EventItem]]) -> Dict[str, str]:
+        """
+        格式化锚点模式的提示词：锚点事件卡片只发送一次，候选事件编号为 C1、C2……
+        
+        Args:
+            anchor: 锚点事件
+            event_pairs: 包含锚点的事件对列表
+            
+        Returns:
+            格式化后的提示词字典
+        """
+        candidates = "\n\n".join(
+            f"C{index}:\n{self.format_event_card(self.anchor_candidate(anchor, pair))}"
+            for index, pair in enumerate(event_pairs, 1)
+        )
+        
+        system_prompt = self.prompt_template.get("system", "")
+        instruction = self.prompt_template.get("anchor_instruction", "").format(
+            anchor=self.format_event_card(anchor),
+            candidates=candidates,
+            output_format=json.dumps(self.prompt_template.get("anchor_output_format", {}), ensure_ascii=False, indent=2)
+        )
+        
+        return {
+            "system": system_prompt,
+            "instruction": instruction
+        }
+    
+    @staticmethod
+    def anchor_candidate(anchor: EventItem, pair: Tuple[EventItem, EventItem]) -> EventItem:
+        """返回事件对中锚点之外的事件"""
+        return pair[1] if pair[0].event_id == anchor.event_id else pair[0]
+    
+    @classmethod
+    def parse_anchor_response(
+        cls,
+        response: Dict[str, Any],
+        anchor: EventItem,
+        event_pairs: List[Tuple[EventItem, EventItem]]
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        解析锚点模式的LLM响应，并把相对于锚点的方向换算为相对于事件对顺序的方向
+        
+        Args:
+            response: LLM响应，形如 {"results": [{"candidate_id": "C1", "has_causal_relation": ...,
+                      "direction": "anchor->candidate", ...}]}
+            anchor: 锚点事件
+            event_pairs: 包含锚点的事件对列表
+            
+        Returns:
+            事件对序号（从0开始）到判断的映射，判断中的 direction 为 "event1->event2" 或 "event2->event1"；
+            编号越界、缺少判断或阳性判断缺少有效方向的条目被忽略
+        """
+        results = response.get("results") if isinstance(response, dict) else None
+        verdicts = {}
+        for item in results if isinstance(results, list) else []:
+            if not isinstance(item, dict) or not isinstance(item.get("has_causal_relation"), bool):
+                continue
+            candidate_id = str(item.get("candidate_id", "")).strip().upper().lstrip("C")
+            if not candidate_id.isdigit() or not 1 <= int(candidate_id) <= len(event_pairs):
+                continue
+            index = int(candidate_id) - 1
+            verdict = dict(item)
+            if item["has_causal_relation"]:
+                if item.get("direction") not in ("anchor->candidate", "candidate->anchor"):
+                    continue
+                anchor_first = event_pairs[index][0].event_id == anchor.event_id
+                verdict["direction"] = (
+                    "event1->event2" if (item["direction"] == "anchor->candidate") == anchor_first else "event2->event1"
+                )
+            verdicts[index] = verdict
+        return verdicts
+    
+    @staticmethod
+    def parse_batch_response(response: Dict[str, Any], pair_count: int) -> Dict[int, Dict[str, Any]]:
+        """
+        解析多对批量分析的LLM响应
+        
+        Args:
+            response: LLM响应，形如 {"results": [{"pair_id": "P1", "has_causal_relation": ..., ...}]}
+            pair_count: 本次请求的事件对数
+            
+        Returns:
+            事件对序号（从0开始）到判断的映射；编号越界、缺少判断或阳性判断缺少有效方向的条目被忽略
+        """
+        results = response.get("results") if isinstance(response, dict) else None
+        verdicts = {}
+        for item in results if isinstance(results, list) else []:
+            if not isinstance(item, dict) or not isinstance(item.get("has_causal_relation"), bool):
+                continue
+            pair_id = str(item.get("pair_id", "")).strip().upper().lstrip("P")
+            if not pair_id.isdigit() or not 1 <= int(pair_id) <= pair_count:
+                continue
+            if item["has_causal_relation"] and item.get("direction") not in ("event1->event2", "event2->event1"):
+                continue
+            verdicts[int(pair_id) - 1] = item
+        return verdicts
+    
     def parse_response(self, response: Dict[str, Any], event1_id: str, event2_id: str) -> Optional[CausalEdge]:
         """
         解析LLM响应，提取因果关系
@@ -63,7 +63,18 @@ class UnifiedCausalLinker(BaseLinker):
         min_entity_support: int = 3,  # 保持中等实体支持度要求
         max_chapter_span: int = 10, 
         max_candidate_pairs: int = 150,  # 适当增加候选对数量上限
-        use_entity_weights: bool = True
+        use_entity_weights: bool = True,
+        # [CN] 模型级联参数，未设置升级模型时不启用
+        # [EN] Model cascade parameters, disabled when no escalation model is set
+        escalation_model: str = "",
+        escalation_provider: str = "openai",
+        escalation_api_key: str = "",
+        escalation_base_url: str = "",
+        confidence_threshold: float = 0.8,
+        pairs_per_prompt: int = 1,
+        anchor_candidates: int = 0,
+        cache_path: str = "",
+        cache_max_entries: int = 50000
     ):
         """
         # [CN] 初始化统一因果链接器
@@ -96,6 +107,24 @@ class UnifiedCausalLinker(BaseLinker):
             # [EN] max_candidate_pairs: Maximum number of candidate event pairs
             # [CN] use_entity_weights: 是否使用实体频率反向权重（频率越高权重越低）
             # [EN] use_entity_weights: Whether to use inverse entity frequency weights (higher frequency gets lower weight)
+            # [CN] escalation_model: 升级使用的强模型，设置后 model 只做首轮判断，阳性或不确定的事件对交由该模型复核
+            # [EN] escalation_model: Stronger model for escalation; when set, model only makes first-pass verdicts and positive or uncertain pairs are re-judged by it
+            # [CN] escalation_provider: 强模型的API提供商
+            # [EN] escalation_provider: API provider of the escalation model
+            # [CN] escalation_api_key: 强模型的API密钥，为空时从对应提供商的环境变量获取
+            # [EN] escalation_api_key: API key of the escalation model, read from the provider's environment variable if empty
+            # [CN] escalation_base_url: 强模型的自定义API基础URL
+            # [EN] escalation_base_url: Custom API base URL of the escalation model
+            # [CN] confidence_threshold: 首轮判断无因果关系且置信度达到该值时不再升级
+            # [EN] confidence_threshold: First-pass negative verdicts at or above this confidence are not escalated
+            # [CN] pairs_per_prompt: 每次请求判断的事件对数，大于1时同一章节窗口内的多对事件在一次请求中判断
+            # [EN] pairs_per_prompt: Event pairs judged per request; above 1, pairs from the same chapter window share one request
+            # [CN] anchor_candidates: 锚点模式下每次请求的候选事件数k，大于0时按锚点事件分组，一次请求判断锚点与其候选事件
+            # [EN] anchor_candidates: Candidates per request in anchor mode; above 0, pairs are grouped by anchor event and judged together
+            # [CN] cache_path: 因果判断缓存文件路径（包括无因果关系的判断），为空时不使用缓存
+            # [EN] cache_path: Path of the causal verdict cache (including negative verdicts), disabled when empty
+            # [CN] cache_max_entries: 缓存的最大条目数
+            # [EN] cache_max_entries: Maximum number of cache entries
         """
         if not prompt_path:
             # [CN] 导入path_utils获取配置文件路径
@@ -160,7 +189,16 @@ class UnifiedCausalLinker(BaseLinker):
             api_key=api_key,
             base_url=base_url,
             max_workers=max_workers,
-            provider=provider
+            provider=provider,
+            escalation_model=escalation_model,
+            escalation_provider=escalation_provider,
+            escalation_api_key=escalation_api_key,
+            escalation_base_url=escalation_base_url,
+            confidence_threshold=confidence_threshold,
+            pairs_per_prompt=pairs_per_prompt,
+            anchor_candidates=anchor_candidates,
+            cache_path=cache_path,
+            cache_max_entries=cache_max_entries
         )
         
         # [CN] 初始化图过滤器
@@ -662,6 +700,84 @@ class UnifiedCausalLinker(BaseLinker):
         # [CN] 2. 构建有向无环图
         # [EN] 2. Build directed acyclic graph
         return self.build_dag(events, edges)
+    
+    def link_incremental(
+        self,
+        existing_events: List[EventItem],
+        existing_edges: List[CausalEdge],
+        new_events: List[EventItem]
+    ) -> Tuple[List[EventItem], List[CausalEdge]]:
+        """
+        # [CN] 增量链接：只分析至少包含一个新事件的事件对，并把新边并入已有DAG
+        # [EN] Incremental linking: analyze only pairs involving at least one new event and merge the new edges into the existing DAG
+        
+        Args:
+            # [CN] existing_events: 已有DAG中的事件列表
+            # [EN] existing_events: Events of the existing DAG
+            # [CN] existing_edges: 已有DAG的因果边列表
+            # [EN] existing_edges: Causal edges of the existing DAG
+            # [CN] new_events: 新增的事件列表，ID已存在的事件会被忽略
+            # [EN] new_events: Newly added events, events whose IDs already exist are ignored
+            
+        Returns:
+            # [CN] 合并后的事件列表和因果边列表(DAG)
+            # [EN] Merged event list and causal edge list (DAG)
+        """
+        start_time = time.time()
+        
+        existing_ids = {event.event_id for event in existing_events}
+        new_events = [event for event in new_events if event.event_id not in existing_ids]
+        events = list(existing_events) + new_events
+        if not new_events:
+            print("# [CN] 没有新事件，保留已有DAG")
+            print("# [EN] No new events, keeping the existing DAG")
+            return events, list(existing_edges)
+        
+        if self.use_optimization:
+            # [CN] 通过CandidateGenerator生成包含新事件的候选事件对
+            # [EN] Generate candidate pairs involving new events through CandidateGenerator
+            candidate_pairs = self.candidate_generator.generate_incremental_candidates(existing_events, new_events)
+            event_map = {event.event_id: event for event in events}
+            event_pairs = [
+                (event_map[id1], event_map[id2]) for id1, id2 in candidate_pairs
+                if id1 in event_map and id2 in event_map
+            ]
+        else:
+            # [CN] 新事件与其之前的全部事件配对，跳过超出最大章节跨度的事件对
+            # [EN] Pair each new event with every event before it, skipping pairs beyond the maximum chapter span
+            ordinal_table = self.candidate_generator.ordinal_table
+            max_span = self.candidate_generator.max_chapter_span
+            event_pairs = []
+            for position in range(len(existing_events), len(events)):
+                new_event = events[position]
+                for other in events[:position]:
+                    span = ordinal_table.span(other.chapter_id, new_event.chapter_id)
+                    if span is None or span <= max_span:
+                        event_pairs.append((other, new_event))
+        
+        # [CN] 增量分析 {len(event_pairs)} 对包含新事件的事件对
+        # [EN] Incrementally analyzing {len(event_pairs)} event pairs involving new events
+        print(f"# [CN] 增量分析 {len(event_pairs)} 对包含新事件的事件对（新事件 {len(new_events)} 个）...")
+        print(f"# [EN] Incrementally analyzing {len(event_pairs)} event pairs involving new events ({len(new_events)} new events)...")
+        new_edges = self.pair_analyzer.analyze_batch(event_pairs)
+        
+        # [CN] 已有的边与新边合并后只做一次ID唯一化；先去掉引用不存在节点的已有边，合并列表中前面的部分即为已有的边
+        # [EN] Make IDs unique once over existing and new edges combined; existing edges referencing missing nodes are dropped first, so the leading part of the combined list is the existing edges
+        event_ids = {event.event_id for event in events}
+        kept_edges = [edge for edge in existing_edges if edge.from_id in event_ids and edge.to_id in event_ids]
+        unique_events, unique_edges = self._ensure_unique_node_ids(events, kept_edges + new_edges)
+        
+        # [CN] 已有的边优先保留，新边按强度加入并跳过会形成环的边
+        # [EN] Existing edges are kept first, new edges are added by strength, skipping those that would form cycles
+        dag_edges = self.graph_filter.extend_dag(
+            unique_events, unique_edges[:len(kept_edges)], unique_edges[len(kept_edges):]
+        )
+        
+        elapsed = time.time() - start_time
+        print(f"# [CN] 新发现 {len(new_edges)} 个因果关系，合并后共 {len(dag_edges)} 条边，耗时 {elapsed:.2f} 秒")
+        print(f"# [EN] Discovered {len(new_edges)} new causal relationships, {len(dag_edges)} edges after merging, took {elapsed:.2f} seconds")
+        
+        return unique_events, dag_edges
 
 
 # [CN] 为向后兼容性提供原始版和优化版链接器的别名类
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Dict, List
 
 from common.models.chapter import Chapter
 from common.models.event import EventItem
@@ -20,3 +20,12 @@ class AbstractExtractor(ABC):
             抽取的事件列表
         """
         pass
+    
+    def get_event_sources(self) -> Dict[str, List[str]]:
+        """
+        获取最近一次抽取中每个事件的来源片段
+        
+        Returns:
+            事件ID到来源片段ID列表的映射，不记录来源的抽取器返回空字典
+        """
+        return {}
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from common.models.event import EventItem
 
@@ -8,15 +8,53 @@ class AbstractRefiner(ABC):
     """精修器接口，定义对抽取事件进行精修（修复幻觉）的方法"""
     
     @abstractmethod
-    def refine(self, events: List[EventItem], context: str = "") -> List[EventItem]:
+    def refine(
+        self,
+        events: List[EventItem],
+        context: str = "",
+        segments: Optional[List[Dict]] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None
+    ) -> List[EventItem]:
         """
         对抽取的事件进行幻觉检测和修复
         
         Args:
             events: 待精修的事件列表
             context: 支持精修的上下文信息
+            segments: 章节片段列表，提供时可为每个事件检索相关片段作为上下文
+            event_sources: 事件ID到来源片段ID列表的映射
             
         Returns:
             精修后的事件列表
         """
         pass
+    
+    def get_entity_table(self) -> Optional[Any]:
+        """
+        获取最近一次精修生成的规范实体表
+        
+        Returns:
+            规范实体表（提供 to_dict 方法），未使用实体表时返回None
+        """
+        return None
+    
+    def update_chapter_summary(
+        self,
+        chapter_id: str,
+        title: str,
+        content: str,
+        events: Optional[List[EventItem]] = None
+    ) -> str:
+        """
+        生成并保存章节摘要，供后续章节精修时作为前情提要
+        
+        Args:
+            chapter_id: 章节ID
+            title: 章节标题
+            content: 章节原文
+            events: 本章精修后的事件
+            
+        Returns:
+            章节摘要，不使用章节摘要的精修器返回空字符串
+        """
+        return ""
@@ -1,6 +1,43 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
 
+from common.utils.text_splitter import TextSplitter
+
+
+class Segment(dict):
+    """
+    章节分段：只保存分段ID以及在章节内容中的起止偏移 "start"/"end"，
+    "text" 在访问时从章节内容按需生成，不额外复制一份文本。
+    序列化（dict(segment) 或 json）时只包含偏移，不含文本。
+    """
+    
+    __slots__ = ("content",)
+    
+    def __init__(self, content: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.content = content  # 所属章节的完整内容（共享引用）
+    
+    @property
+    def text(self) -> str:
+        """按偏移从章节内容还原的分段文本"""
+        return TextSplitter.segment_text(self.content, self["start"], self["end"])
+    
+    def __missing__(self, key):
+        if key == "text":
+            return self.text
+        raise KeyError(key)
+    
+    def __contains__(self, key) -> bool:
+        return key == "text" or super().__contains__(key)
+    
+    def get(self, key, default=None):
+        if key == "text" and not super().__contains__("text"):
+            return self.text
+        return super().get(key, default)
+    
+    def __reduce__(self):
+        return (self.__class__, (self.content, dict(self)))
+
 
 @dataclass
 class Chapter:
@@ -11,21 +48,44 @@ class Chapter:
     content: str  # 章节完整内容
     segments: List[dict] = field(default_factory=list)  # 章节分段，按段落/事件切分
     
+    def compact_segments(self) -> None:
+        """
+        将带有文本副本的分段替换为指向章节内容的偏移分段（Segment）
+        
+        只有按偏移还原的文本与原分段文本完全一致时才替换，否则保留原分段。
+        """
+        ranges = TextSplitter.locate_segments(self.content, self.segments)
+        compacted = []
+        for seg, (start, end) in zip(self.segments, ranges):
+            if isinstance(seg, Segment) or "text" not in seg:
+                compacted.append(seg)
+                continue
+            offsets = {k: v for k, v in seg.items() if k != "text"}
+            offsets.update(start=start, end=end)
+            segment = Segment(self.content, offsets)
+            compacted.append(segment if segment.text == seg["text"] else seg)
+        self.segments = compacted
+    
     def to_dict(self):
-        """转换为字典表示"""
+        """转换为字典表示（偏移分段只输出偏移，不输出文本）"""
         return {
             "chapter_id": self.chapter_id,
             "title": self.title,
             "content": self.content,
-            "segments": self.segments
+            "segments": [dict(seg) for seg in self.segments]
         }
     
     @classmethod
     def from_dict(cls, data: dict):
-        """从字典创建实例"""
+        """从字典创建实例，没有文本只有偏移的分段还原为 Segment"""
+        content = data.get("content", "")
+        segments = [
+            Segment(content, seg) if "text" not in seg and "start" in seg and "end" in seg else seg
+            for seg in data.get("segments", [])
+        ]
         return cls(
             chapter_id=data.get("chapter_id", ""),
             title=data.get("title", ""),
-            content=data.get("content", ""),
-            segments=data.get("segments", [])
+            content=content,
+            segments=segments
         )
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Aho-Corasick 多模式匹配工具模块
+
+一次扫描文本即可找出所有出现的模式串，用于在章节原文中批量核对
+人物、宝物、地点等实体名称，复杂度与文本长度加匹配数成正比，
+与模式串数量无关。
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class AhoCorasick:
+    """Aho-Corasick 自动机，按字符构建"""
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        """
+        初始化自动机
+
+        Args:
+            patterns: 初始模式串，空串会被忽略
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: Dict[int, str] = {}  # 节点 -> 以该节点结尾的模式串
+        self._output: List[List[str]] = [[]]
+        self._built = False
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: str) -> None:
+        """
+        添加模式串，添加后需重新构建失败指针
+
+        Args:
+            pattern: 模式串
+        """
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+            node = nxt
+        self._terminal[node] = pattern
+        self._built = False
+
+    def build(self) -> "AhoCorasick":
+        """
+        按广度优先构建失败指针，并合并后缀节点的输出
+
+        Returns:
+            自动机本身，便于链式调用
+        """
+        self._output = [[] for _ in self._goto]
+        for node, pattern in self._terminal.items():
+            self._output[node].append(pattern)
+
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                # 失败指针指向更浅的节点，已在本节点之前处理完毕
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        扫描文本，逐个产出匹配
+
+        Args:
+            text: 待扫描文本
+
+        Yields:
+            (匹配结束位置（不含）, 模式串)
+        """
+        if not self._built:
+            self.build()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern in self._output[node]:
+                yield i + 1, pattern
+
+    def find_all(self, text: str) -> Set[str]:
+        """
+        找出文本中出现过的全部模式串
+
+        Args:
+            text: 待扫描文本
+
+        Returns:
+            出现过的模式串集合
+        """
+        return {pattern for _, pattern in self.iter_matches(text)}
+
+    def __len__(self) -> int:
+        return len(self._terminal)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+章节序号工具模块
+
+章节ID有多种写法（"第一百零三章"、"第103章"、"第两千章"、事件ID中的"E103-2"），
+各组件需要一致地把它们换算为整数序号。本模块提供：
+1. 完整的中文数字解析（零〇一二两…十百千万亿，支持与阿拉伯数字混写）
+2. 章节ID到序号的查询表，解析结果缓存，一次运行内各组件共享
+
+分卷重新编号的小说中，重复出现的章节ID带有加载时添加的 "_N" 后缀（第N次出现），
+序号按 (N-1) × VOLUME_BASE + 章节号 编码，保证各卷章节的序号互不重叠且按加载顺序递增。
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, Optional
+
+
+# 中文数字
+CHINESE_DIGITS = {
+    '零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+    '五': 5, '六': 6, '七': 7, '八': 8, '九': 9,
+}
+# 节内单位
+CHINESE_UNITS = {'十': 10, '百': 100, '千': 1000}
+# 节单位
+CHINESE_SECTION_UNITS = {'万': 10 ** 4, '亿': 10 ** 8}
+
+# 全角数字转半角
+_FULLWIDTH_DIGITS = str.maketrans('０１２３４５６７８９', '0123456789')
+
+
+def parse_chinese_number(text: str) -> Optional[int]:
+    """
+    将中文数字（可与阿拉伯数字混写）解析为整数
+
+    支持 "十五"、"一百零三"、"两千"、"一万二千三百"、"3千2百"、
+    逐位写法 "一〇三" 以及纯数字 "103"。
+
+    Args:
+        text: 数字文本
+
+    Returns:
+        解析得到的整数，无法解析时返回None
+    """
+    if not text:
+        return None
+    text = text.strip().translate(_FULLWIDTH_DIGITS)
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+
+    # 没有任何单位时按逐位写法解析，如 "一〇三"
+    if not any(ch in CHINESE_UNITS or ch in CHINESE_SECTION_UNITS for ch in text):
+        digits = []
+        for ch in text:
+            if ch.isdigit():
+                digits.append(ch)
+            elif ch in CHINESE_DIGITS:
+                digits.append(str(CHINESE_DIGITS[ch]))
+            else:
+                return None
+        return int(''.join(digits))
+
+    total = 0      # 已完成的万/亿节
+    section = 0    # 当前节内的值
+    number = None  # 尚未乘以单位的数字
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch.isdigit():
+            # 连续的阿拉伯数字作为一个整体，如 "12万"
+            j = i
+            while j < len(text) and text[j].isdigit():
+                j += 1
+            number = int(text[i:j])
+            i = j
+            continue
+        if ch in CHINESE_DIGITS:
+            number = CHINESE_DIGITS[ch]
+        elif ch in CHINESE_UNITS:
+            # "十五" 中省略的 "一"
+            section += (1 if number is None else number) * CHINESE_UNITS[ch]
+            number = None
+        elif ch in CHINESE_SECTION_UNITS:
+            section += number or 0
+            total += (section or 1) * CHINESE_SECTION_UNITS[ch]
+            section = 0
+            number = None
+        else:
+            return None
+        i += 1
+
+    return total + section + (number or 0)
+
+
+class ChapterOrdinalTable:
+    """
+    章节序号表
+
+    把章节ID换算为整数序号并缓存结果。支持的写法：
+    "第一百零三章"、"【第103章】"、"第一章_2"（分卷重复章节的后缀，编码为 VOLUME_BASE + 1）、
+    "一百零三"/"103"，以及事件ID "E103-2"（取章节部分）。
+    """
+
+    # 每一卷占用的序号区间大小，须大于单卷的最大章节号
+    VOLUME_BASE = 100000
+
+    _CHAPTER_PATTERN = re.compile(r'第\s*([零〇一二两三四五六七八九十百千万亿\d０-９]+)\s*[章回节]')
+    _EVENT_ID_PATTERN = re.compile(r'^E(\d+)-')
+    _DUPLICATE_SUFFIX = re.compile(r'_(\d+)$')
+
+    _shared: Optional["ChapterOrdinalTable"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, chapter_ids: Iterable[str] = ()):
+        """
+        初始化序号表
+
+        Args:
+            chapter_ids: 需要预先解析的章节ID
+        """
+        self._ordinals: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
+        self.build(chapter_ids)
+
+    @classmethod
+    def shared(cls) -> "ChapterOrdinalTable":
+        """
+        获取本次运行内各组件共享的序号表
+
+        Returns:
+            共享的序号表实例
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def parse(cls, chapter_id: str) -> Optional[int]:
+        """
+        解析单个章节ID（不使用缓存）
+
+        Args:
+            chapter_id: 章节ID或事件ID
+
+        Returns:
+            章节序号，无法解析时返回None
+        """
+        if not chapter_id:
+            return None
+        text = chapter_id.strip()
+        volume = 0
+        suffix = cls._DUPLICATE_SUFFIX.search(text)
+        if suffix:
+            text = text[:suffix.start()]
+            volume = max(int(suffix.group(1)) - 1, 0)
+
+        match = cls._EVENT_ID_PATTERN.match(text)
+        if match:
+            # 事件ID的 "_N" 后缀是去重后缀，不表示分卷
+            return int(match.group(1))
+        match = cls._CHAPTER_PATTERN.search(text)
+        number = parse_chinese_number(match.group(1)) if match else parse_chinese_number(text)
+        if number is None:
+            return None
+        return volume * cls.VOLUME_BASE + number
+
+    def build(self, chapter_ids: Iterable[str]) -> "ChapterOrdinalTable":
+        """
+        预先解析一批章节ID
+
+        Args:
+            chapter_ids: 章节ID列表
+
+        Returns:
+            序号表本身，便于链式调用
+        """
+        for chapter_id in chapter_ids:
+            self.ordinal(chapter_id)
+        return self
+
+    def ordinal(self, chapter_id: Optional[str]) -> Optional[int]:
+        """
+        查询章节ID对应的序号
+
+        Args:
+            chapter_id: 章节ID或事件ID
+
+        Returns:
+            章节序号，无法解析时返回None
+        """
+        if not chapter_id:
+            return None
+        try:
+            return self._ordinals[chapter_id]
+        except KeyError:
+            value = self.parse(chapter_id)
+            with self._lock:
+                self._ordinals[chapter_id] = value
+            return value
+
+    def span(self, chapter_id1: Optional[str], chapter_id2: Optional[str]) -> Optional[int]:
+        """
+        计算两个章节的序号差
+
+        Args:
+            chapter_id1: 第一个章节ID
+            chapter_id2: 第二个章节ID
+
+        Returns:
+            序号差的绝对值，任一章节无法解析时返回None
+        """
+        ord1, ord2 = self.ordinal(chapter_id1), self.ordinal(chapter_id2)
+        if ord1 is None or ord2 is None:
+            return None
+        return abs(ord1 - ord2)
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步调试记录模块
+
+提供后台线程写入的调试记录器，用于在生产环境中保留调试信息：
+1. 调用线程只负责入队，不在请求线程中进行磁盘IO
+2. 以紧凑JSON行格式追加到单个JSONL文件，超过大小后轮转
+3. 轮转后的历史文件可选gzip压缩
+4. 支持按键采样，同一键的所有记录要么全部保留要么全部丢弃
+"""
+
+import os
+import gzip
+import json
+import time
+import queue
+import shutil
+import atexit
+import zlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+class DebugSink:
+    """异步、批量的调试记录器，将记录追加到可轮转的JSONL文件"""
+
+    def __init__(
+        self,
+        file_path: Union[str, Path],
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 5,
+        compress: bool = False,
+        sample_rate: float = 1.0,
+        max_queue_size: int = 10000,
+        batch_size: int = 200
+    ):
+        """
+        初始化调试记录器并启动后台写入线程
+
+        Args:
+            file_path: JSONL文件路径
+            max_bytes: 单个文件的最大字节数，超过后轮转，0表示不轮转
+            backup_count: 保留的历史文件数量
+            compress: 是否对轮转后的历史文件进行gzip压缩
+            sample_rate: 采样率（0-1），按记录键决定是否保留
+            max_queue_size: 队列最大长度，队列满时丢弃新记录而不阻塞调用线程
+            batch_size: 后台线程每次最多合并写入的记录数
+        """
+        self.file_path = Path(file_path)
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.batch_size = batch_size
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {
+            "submitted": 0,
+            "sampled_out": 0,
+            "dropped": 0,
+            "written": 0,
+            "rotations": 0,
+            "write_errors": 0
+        }
+
+        self._thread = threading.Thread(target=self._run, name="debug-sink-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def should_sample(self, key: str) -> bool:
+        """
+        判断某个键的记录是否被采样保留
+
+        Args:
+            key: 记录键，如段落ID
+
+        Returns:
+            是否保留
+        """
+        if self.sample_rate >= 1.0:
+            return True
+        if self.sample_rate <= 0.0:
+            return False
+        bucket = zlib.crc32(key.encode('utf-8')) % 10000
+        return bucket < self.sample_rate * 10000
+
+    def submit(self, kind: str, key: str, data: Any) -> bool:
+        """
+        提交一条调试记录（非阻塞）
+
+        Args:
+            kind: 记录类型，如 "prompt"、"response"、"events"
+            key: 记录键，用于采样和检索
+            data: 记录内容，需可被JSON序列化
+
+        Returns:
+            记录是否成功入队
+        """
+        if self._closed:
+            return False
+
+        with self._lock:
+            self.stats["submitted"] += 1
+
+        if not self.should_sample(key):
+            with self._lock:
+                self.stats["sampled_out"] += 1
+            return False
+
+        record = {"ts": round(time.time(), 3), "kind": kind, "key": key, "data": data}
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            return False
+
+    def flush(self) -> None:
+        """等待队列中已提交的记录全部写入磁盘"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """写完剩余记录并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        """后台写入线程主循环"""
+        while True:
+            record = self._queue.get()
+            batch = [record]
+            # 合并队列中已有的记录，一次写入
+            while record is not None and len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(record)
+
+            records = [r for r in batch if r is not None]
+            if records:
+                self._write_batch(records)
+            for _ in batch:
+                self._queue.task_done()
+
+            if batch[-1] is None:
+                return
+
+    def _write_batch(self, records) -> None:
+        """
+        将一批记录追加写入文件，必要时轮转
+
+        Args:
+            records: 记录列表
+        """
+        lines = []
+        for record in records:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str))
+            except (TypeError, ValueError):
+                with self._lock:
+                    self.stats["write_errors"] += 1
+        if not lines:
+            return
+        payload = ('\n'.join(lines) + '\n').encode('utf-8')
+
+        try:
+            if self.max_bytes > 0 and self.file_path.exists():
+                if self.file_path.stat().st_size + len(payload) > self.max_bytes:
+                    self._rotate()
+            with open(self.file_path, 'ab') as f:
+                f.write(payload)
+            with self._lock:
+                self.stats["written"] += len(lines)
+        except OSError:
+            with self._lock:
+                self.stats["write_errors"] += len(lines)
+
+    def _backup_path(self, index: int) -> Path:
+        """获取第index个历史文件的路径"""
+        suffix = f".{index}.gz" if self.compress else f".{index}"
+        return self.file_path.with_name(self.file_path.name + suffix)
+
+    def _rotate(self) -> None:
+        """轮转当前文件：file -> file.1(.gz) -> file.2(.gz) ..."""
+        if self.backup_count <= 0:
+            self.file_path.unlink()
+            return
+
+        oldest = self._backup_path(self.backup_count)
+        if oldest.exists():
+            oldest.unlink()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self._backup_path(i)
+            if src.exists():
+                os.replace(src, self._backup_path(i + 1))
+
+        target = self._backup_path(1)
+        if self.compress:
+            with open(self.file_path, 'rb') as src_f, gzip.open(target, 'wb') as dst_f:
+                shutil.copyfileobj(src_f, dst_f)
+            self.file_path.unlink()
+        else:
+            os.replace(self.file_path, target)
+
+        with self._lock:
+            self.stats["rotations"] += 1
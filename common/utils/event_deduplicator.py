@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复事件合并工具模块
+
+同一情节可能因批处理回退、段落重叠或整章回退被抽取多次，
+这些事件的ID不同但描述几乎相同。本模块提供：
+1. 基于字符shingle的MinHash签名
+2. LSH分桶索引，只对落入同一桶的事件计算相似度
+3. 按章节（可选相邻章节）聚类并合并近似重复事件
+"""
+
+import re
+import random
+import zlib
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from common.models.event import EventItem
+from common.utils.chapter_ordinal import ChapterOrdinalTable
+
+
+class MinHashLSH:
+    """MinHash签名与LSH分桶索引"""
+
+    _PRIME = (1 << 61) - 1
+    _MAX_HASH = (1 << 32) - 1
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, seed: int = 42):
+        """
+        初始化MinHash LSH索引
+
+        Args:
+            num_perm: MinHash签名长度（哈希函数个数）
+            bands: LSH分带数，num_perm必须能被bands整除
+            shingle_size: 字符shingle长度
+            seed: 哈希函数随机种子，保证签名可复现
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self._coeffs = [
+            (rng.randint(1, self._PRIME - 1), rng.randint(0, self._PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self.signatures: List[List[int]] = []
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """去除空白和标点，只保留文字内容"""
+        return re.sub(r'[\s\W_]+', '', text or '')
+
+    def shingles(self, text: str) -> Set[int]:
+        """
+        将文本转换为字符shingle的哈希集合
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            shingle哈希集合
+        """
+        text = self.normalize(text)
+        if len(text) <= self.shingle_size:
+            return {zlib.crc32(text.encode('utf-8'))}
+        return {
+            zlib.crc32(text[i:i + self.shingle_size].encode('utf-8'))
+            for i in range(len(text) - self.shingle_size + 1)
+        }
+
+    def signature(self, text: str) -> List[int]:
+        """
+        计算文本的MinHash签名
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            长度为num_perm的签名
+        """
+        shingles = self.shingles(text)
+        return [
+            min(((a * s + b) % self._PRIME) & self._MAX_HASH for s in shingles)
+            for a, b in self._coeffs
+        ]
+
+    def add(self, text: str) -> int:
+        """
+        将文本加入索引
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            文本在索引中的序号
+        """
+        sig = self.signature(text)
+        idx = len(self.signatures)
+        self.signatures.append(sig)
+        for band in range(self.bands):
+            key = tuple(sig[band * self.rows:(band + 1) * self.rows])
+            self._buckets[band][key].append(idx)
+        return idx
+
+    def candidate_pairs(self) -> Set[Tuple[int, int]]:
+        """
+        获取至少在一个分带中落入同一桶的序号对
+
+        Returns:
+            (i, j) 序号对集合，i < j
+        """
+        pairs = set()
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                for i in range(len(members)):
+                    for j in range(i + 1, len(members)):
+                        pairs.add((members[i], members[j]))
+        return pairs
+
+    def similarity(self, i: int, j: int) -> float:
+        """
+        根据签名估计两个文本的Jaccard相似度
+
+        Args:
+            i: 第一个文本的序号
+            j: 第二个文本的序号
+
+        Returns:
+            估计的Jaccard相似度
+        """
+        sig_i, sig_j = self.signatures[i], self.signatures[j]
+        return sum(1 for a, b in zip(sig_i, sig_j) if a == b) / self.num_perm
+
+
+class EventDeduplicator:
+    """近似重复事件合并器"""
+
+    # 抽取阶段为缺失字段填充的默认值，合并时视为空
+    PLACEHOLDER_VALUES = {"", "未知", "未指定", "未明确"}
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        boundary_threshold: float = 0.5,
+        overlap_coverage: float = 0.5,
+        cross_chapter: bool = False,
+        chapter_window: int = 1,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3
+    ):
+        """
+        初始化事件合并器
+
+        Args:
+            threshold: 判定为重复事件的最低估计Jaccard相似度
+            boundary_threshold: 相邻重叠片段间判定为重复事件的最低相似度
+            overlap_coverage: 判定事件落在重叠区域内所需的最低描述覆盖率
+            cross_chapter: 是否合并相邻章节间的重复事件
+            chapter_window: 跨章节合并时允许的最大章节序号差
+            num_perm: MinHash签名长度
+            bands: LSH分带数
+            shingle_size: 字符shingle长度
+        """
+        self.threshold = threshold
+        self.boundary_threshold = boundary_threshold
+        self.overlap_coverage = overlap_coverage
+        self.cross_chapter = cross_chapter
+        self.chapter_window = chapter_window
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+
+    def find_clusters(
+        self,
+        events: List[EventItem],
+        threshold: Optional[float] = None,
+        pair_filter: Optional[Callable[[int, int], bool]] = None
+    ) -> List[List[int]]:
+        """
+        查找近似重复事件的簇
+
+        Args:
+            events: 事件列表
+            threshold: 相似度阈值，默认使用self.threshold
+            pair_filter: 额外的候选对过滤条件，返回False的序号对不参与合并
+
+        Returns:
+            簇列表，每个簇为事件序号列表（按原顺序），只包含大小大于1的簇
+        """
+        if threshold is None:
+            threshold = self.threshold
+
+        index = MinHashLSH(self.num_perm, self.bands, self.shingle_size)
+        for event in events:
+            index.add(event.description)
+
+        ordinals = ChapterOrdinalTable.shared()
+        duplicates = []
+        for i, j in index.candidate_pairs():
+            ch_i, ch_j = events[i].chapter_id, events[j].chapter_id
+            if ch_i != ch_j:
+                if not self.cross_chapter:
+                    continue
+                # 章节序号无法解析时无法判断是否相邻，不跨章节合并
+                span = ordinals.span(ch_i, ch_j)
+                if span is None or span > self.chapter_window:
+                    continue
+            if pair_filter is not None and not pair_filter(i, j):
+                continue
+            if index.similarity(i, j) >= threshold:
+                duplicates.append((i, j))
+        return self._union_clusters(len(events), duplicates)
+
+    @staticmethod
+    def _union_clusters(count: int, pairs: List[Tuple[int, int]]) -> List[List[int]]:
+        """
+        将判定为重复的序号对连通成簇
+
+        Args:
+            count: 事件总数
+            pairs: 重复的序号对
+
+        Returns:
+            簇列表，每个簇为事件序号列表（按原顺序），只包含大小大于1的簇
+        """
+        parent = list(range(count))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i, j in pairs:
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        clusters: Dict[int, List[int]] = defaultdict(list)
+        for i in range(count):
+            clusters[find(i)].append(i)
+        return [members for members in clusters.values() if len(members) > 1]
+
+    def merge_cluster(self, cluster: List[EventItem]) -> EventItem:
+        """
+        将一个簇中的事件合并为一个事件
+
+        保留第一个事件的ID和章节，描述取最长的一条，
+        人物和宝物取并集，其余字段取第一个非默认值。
+
+        Args:
+            cluster: 同一簇中的事件（按原顺序）
+
+        Returns:
+            合并后的事件
+        """
+        first = cluster[0]
+
+        def union(field: str) -> List[str]:
+            merged: List[str] = []
+            for event in cluster:
+                for item in getattr(event, field) or []:
+                    if item not in merged:
+                        merged.append(item)
+            return merged
+
+        def first_value(field: str) -> Optional[str]:
+            for event in cluster:
+                value = getattr(event, field)
+                if value and value not in self.PLACEHOLDER_VALUES:
+                    return value
+            return getattr(first, field)
+
+        return EventItem(
+            event_id=first.event_id,
+            description=max((e.description for e in cluster), key=len),
+            characters=union("characters"),
+            treasures=union("treasures"),
+            result=first_value("result"),
+            location=first_value("location"),
+            time=first_value("time"),
+            chapter_id=first.chapter_id
+        )
+
+    def merge(self, events: List[EventItem]) -> Tuple[List[EventItem], List[int]]:
+        """
+        合并近似重复事件
+
+        Args:
+            events: 事件列表
+
+        Returns:
+            (合并后的事件列表, 保留下来的事件在输入列表中的序号)，保持各簇首个事件的原有位置
+        """
+        clusters = self.find_clusters(events) if len(events) > 1 else []
+        return self._apply_clusters(events, clusters)
+
+    def merge_boundary_duplicates(
+        self,
+        events: List[EventItem],
+        spans: List[Optional[Tuple[int, int]]],
+        segments: List[Dict]
+    ) -> Tuple[List[EventItem], List[int]]:
+        """
+        合并相邻重叠片段间的重复事件
+
+        片段重叠时，落在重叠区域内的情节会被前后两个片段各抽取一次，
+        且两次描述的措辞可能差别较大。此方法只比较同一章节内来自相邻片段、
+        且都落在两片段重叠区域内的事件，因此可以使用比merge更低的相似度阈值，保留较早片段中的事件。
+        事件的描述与重叠区域的字符二元组覆盖率不低于overlap_coverage、
+        且不低于与片段其余部分的覆盖率时，认为事件落在重叠区域内。
+        这样的事件对很少，直接比较MinHash签名估计相似度，不经过LSH分桶
+        （LSH的分带参数按merge的阈值选取，低于该阈值的相似事件很少落入同一桶）。
+
+        Args:
+            events: 事件列表
+            spans: 与events对应的来源片段范围 (起始序号, 结束序号)，未知时为None
+            segments: 章节的片段列表，片段的 "overlap" 字段为开头重复上一片段结尾的字符数
+
+        Returns:
+            (合并后的事件列表, 保留下来的事件在输入列表中的序号)
+        """
+        by_start: Dict[Tuple[Optional[str], int], List[int]] = defaultdict(list)
+        for i, span in enumerate(spans):
+            if span is not None:
+                by_start[(events[i].chapter_id, span[0])].append(i)
+
+        hasher = MinHashLSH(self.num_perm, self.bands, self.shingle_size)
+        signatures: Dict[int, List[int]] = {}
+
+        def signature_of(i: int) -> List[int]:
+            if i not in signatures:
+                signatures[i] = hasher.signature(events[i].description)
+            return signatures[i]
+
+        def in_overlap(i: int, region: str, rest: str) -> bool:
+            coverage = self._coverage(events[i].description, region)
+            return coverage >= self.overlap_coverage and coverage >= self._coverage(events[i].description, rest)
+
+        duplicates = []
+        for i, span in enumerate(spans):
+            if span is None or span[1] + 1 >= len(segments):
+                continue
+            # 紧接在当前片段之后开始的片段中的事件
+            later = by_start.get((events[i].chapter_id, span[1] + 1), [])
+            overlap = segments[span[1] + 1].get("overlap", 0)
+            if not later or not overlap:
+                continue
+
+            region = segments[span[1] + 1]["text"][:overlap]
+            earlier_text = "".join(seg["text"] for seg in segments[span[0]:span[1] + 1]).rstrip()
+            if not in_overlap(i, region, earlier_text[:max(0, len(earlier_text) - len(region.strip()))]):
+                continue
+            for j in later:
+                later_text = "".join(seg["text"] for seg in segments[spans[j][0]:spans[j][1] + 1])
+                if not in_overlap(j, region, later_text[overlap:]):
+                    continue
+                matches = sum(1 for a, b in zip(signature_of(i), signature_of(j)) if a == b)
+                if matches / self.num_perm >= self.boundary_threshold:
+                    duplicates.append((min(i, j), max(i, j)))
+
+        return self._apply_clusters(events, self._union_clusters(len(events), duplicates))
+
+    @staticmethod
+    def _coverage(description: str, text: str) -> float:
+        """
+        计算描述的字符二元组出现在文本中的比例
+
+        Args:
+            description: 事件描述
+            text: 原文片段
+
+        Returns:
+            覆盖率，描述为空时为0
+        """
+        normalized = MinHashLSH.normalize(description)
+        grams = {normalized[k:k + 2] for k in range(len(normalized) - 1)}
+        if not grams:
+            return 0.0
+        body = MinHashLSH.normalize(text)
+        return sum(1 for gram in grams if gram in body) / len(grams)
+
+    def _apply_clusters(
+        self,
+        events: List[EventItem],
+        clusters: List[List[int]]
+    ) -> Tuple[List[EventItem], List[int]]:
+        """
+        按簇合并事件
+
+        Args:
+            events: 事件列表
+            clusters: find_clusters返回的簇列表
+
+        Returns:
+            (合并后的事件列表, 保留下来的事件在输入列表中的序号)，便于调用方同步与事件对应的其他列表
+        """
+        replacement: Dict[int, EventItem] = {}
+        removed: Set[int] = set()
+        for members in clusters:
+            replacement[members[0]] = self.merge_cluster([events[i] for i in members])
+            removed.update(members[1:])
+
+        kept = [i for i in range(len(events)) if i not in removed]
+        return [replacement.get(i, events[i]) for i in kept], kept
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型级联调用模块
+
+先用低成本、低延迟的模型（如 deepseek-chat）做首轮判断，只有首轮请求失败、
+或调用方判定结果需要复核（阳性或置信度不足）时，才用同一提示词升级到强模型（如 gpt-4o）：
+1. 未配置升级模型时等同于直接调用首轮模型
+2. 升级请求失败时保留首轮结果，并标记为未经复核，调用方不应把它当作强模型的结果缓存
+3. 统计首轮调用和升级次数
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class ModelCascade:
+    """首轮模型 + 按需升级的强模型"""
+
+    def __init__(self, primary: Any, escalation: Optional[Any] = None):
+        """
+        初始化级联调用
+
+        Args:
+            primary: 首轮使用的LLM客户端
+            escalation: 升级使用的LLM客户端，为None时不升级
+        """
+        self.primary = primary
+        self.escalation = escalation
+        self._lock = threading.Lock()
+        self.primary_calls = 0
+        self.escalations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了升级模型"""
+        return self.escalation is not None
+
+    def call_with_json_response(
+        self,
+        system: str,
+        user: str,
+        should_escalate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        先调用首轮模型，必要时用强模型重新判断
+
+        Args:
+            system: 系统提示
+            user: 用户提示
+            should_escalate: 根据首轮解析出的JSON判断是否需要升级，为None时从不升级
+
+        Returns:
+            LLM响应；发生升级时带有 "escalated": True，
+            升级失败而保留首轮结果时另带有 "escalation_failed": True
+        """
+        response = self.primary.call_with_json_response(system, user)
+        with self._lock:
+            self.primary_calls += 1
+        if not self.enabled or should_escalate is None:
+            return response
+
+        succeeded = response.get("success") and "json_content" in response
+        if succeeded and not should_escalate(response["json_content"]):
+            return response
+
+        escalated = self.escalate(system, user)
+        if escalated.get("success") and "json_content" in escalated:
+            return escalated
+        # 升级失败时保留首轮结果，标记为未经复核
+        return dict(response, escalated=True, escalation_failed=True) if succeeded else escalated
+
+    def escalate(self, system: str, user: str) -> Dict[str, Any]:
+        """
+        直接调用强模型
+
+        Args:
+            system: 系统提示
+            user: 用户提示
+
+        Returns:
+            强模型的响应，带有 "escalated": True；未配置升级模型时返回失败响应
+        """
+        if not self.enabled:
+            return {"success": False, "error": "未配置升级模型", "escalated": False}
+        with self._lock:
+            self.escalations += 1
+        return dict(self.escalation.call_with_json_response(system, user), escalated=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取级联统计
+
+        Returns:
+            首轮调用数、升级次数和升级比例
+        """
+        return {
+            "primary_calls": self.primary_calls,
+            "escalations": self.escalations,
+            "escalation_rate": (self.escalations / self.primary_calls) if self.primary_calls else 0.0
+        }
+
+    def reset_stats(self) -> None:
+        """重置统计"""
+        with self._lock:
+            self.primary_calls = self.escalations = 0
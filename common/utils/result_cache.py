@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化结果缓存模块
+
+以内容哈希为键缓存LLM调用的结果，重复运行或再次遇到相同输入时直接复用：
+1. 键由调用方把参与决定结果的内容（事件字段、上下文、模型、提示词等）规范化后哈希得到
+2. 超出容量时按最近最少使用（LRU）淘汰
+3. 保存为JSON文件，写入时先写临时文件再替换，避免中断导致文件损坏
+4. 统计命中、未命中和淘汰次数
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """基于内容哈希的持久化LRU缓存"""
+
+    # 缓存文件格式版本，格式变化时旧文件被忽略
+    CACHE_VERSION = 1
+
+    def __init__(self, path: str = "", max_entries: int = 20000, namespace: str = ""):
+        """
+        初始化缓存，指定路径时从文件加载已有条目
+
+        Args:
+            path: 缓存文件路径，为空时只在内存中缓存
+            max_entries: 最大条目数，超出时淘汰最久未使用的条目；0表示不限制
+            namespace: 缓存用途标识，不同用途的文件互不复用
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self.load()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        把若干内容规范化后计算哈希键
+
+        Args:
+            parts: 可JSON序列化的内容
+
+        Returns:
+            SHA-256 十六进制摘要
+        """
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        查询缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的值，未命中时返回None
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键
+            value: 可JSON序列化的值
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self._evict()
+
+    def _evict(self) -> None:
+        """淘汰超出容量的条目（调用方持有锁）"""
+        if self.max_entries <= 0:
+            return
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def load(self) -> None:
+        """从缓存文件加载条目，文件不存在、损坏或版本不符时从空缓存开始"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"缓存文件读取失败，将重新建立: {self.path} ({str(e)})")
+            return
+        if (not isinstance(data, dict) or data.get("version") != self.CACHE_VERSION
+                or data.get("namespace") != self.namespace or not isinstance(data.get("entries"), dict)):
+            return
+        with self._lock:
+            self._entries = OrderedDict(data["entries"])
+            self._evict()
+
+    def save(self) -> None:
+        """把条目写回缓存文件（没有新条目时跳过）"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": self.CACHE_VERSION,
+                "namespace": self.namespace,
+                "entries": dict(self._entries)
+            }
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            条目数、命中、未命中、淘汰次数和命中率
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0
+        }
+
+    def reset_stats(self) -> None:
+        """重置命中统计"""
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
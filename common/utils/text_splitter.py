@@ -1,10 +1,18 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import hashlib
 import re
 
 
 class TextSplitter:
     """文本分段工具，将章节文本切分为多个段落"""
     
+    # 支持的分段模式：greedy 为按长度贪心累积，content_defined 为基于内容的分段
+    SPLIT_MODES = ("greedy", "content_defined")
+    
+    # 滚动哈希参数（Rabin-Karp 多项式哈希）
+    _HASH_BASE = 257
+    _HASH_MOD = 2 ** 31 - 1
+    
     @staticmethod
     def split_by_paragraphs(text: str) -> List[str]:
         """
@@ -19,6 +27,67 @@ class TextSplitter:
         paragraphs = [p.strip() for p in text.split('\n\n')]
         return [p for p in paragraphs if p]  # 过滤空段落
     
+    @staticmethod
+    def segment_text(content: str, start: int, end: int) -> str:
+        """
+        根据起止偏移从章节内容还原片段文本
+        
+        片段文本由去除首尾空白的段落以空行拼接而成，此处按同样的方式规整原文切片。
+        
+        Args:
+            content: 章节完整内容
+            start: 片段在章节内容中的起始偏移
+            end: 片段在章节内容中的结束偏移（不含）
+            
+        Returns:
+            片段文本
+        """
+        return '\n\n'.join(TextSplitter.split_by_paragraphs(content[start:end]))
+    
+    @staticmethod
+    def locate_segments(content: str, segments: List[Dict]) -> List[Tuple[int, int]]:
+        """
+        定位每个片段在章节内容中的字符范围
+        
+        片段主体按首尾段落从上一片段结尾之后查找；带重叠的片段，
+        其开头的重叠部分恰好结束于上一片段结尾，因此从上一片段结尾向前反向查找。
+        
+        Args:
+            content: 章节完整内容
+            segments: 含 "text" 的片段列表（按顺序）
+            
+        Returns:
+            与 segments 对应的 (起始偏移, 结束偏移) 列表
+        """
+        ranges = []
+        prev_end = 0
+        for seg in segments:
+            text = seg["text"]
+            overlap = seg.get("overlap", 0) or 0
+            parts = [p for p in text.split('\n\n') if p]
+            core_parts = [p for p in text[overlap:].split('\n\n') if p]
+            tail_parts = parts[:len(parts) - len(core_parts)]
+            if not core_parts:
+                ranges.append((prev_end, prev_end))
+                continue
+            
+            start = content.find(core_parts[0], prev_end)
+            if start < 0:
+                start = prev_end
+            end = content.find(core_parts[-1], start)
+            end = end + len(core_parts[-1]) if end >= 0 else start + len(text)
+            
+            bound = prev_end
+            for part in reversed(tail_parts):
+                pos = content.rfind(part, 0, bound)
+                if pos < 0:
+                    break
+                start = bound = pos
+            
+            ranges.append((start, end))
+            prev_end = end
+        return ranges
+    
     @staticmethod
     def split_by_sentences(text: str) -> List[str]:
         """
@@ -41,17 +110,42 @@ class TextSplitter:
         return [s.strip() for s in sentences if s.strip()]
     
     @staticmethod
-    def split_chapter(chapter_text: str, seg_size: int = 500) -> List[Dict]:
+    def split_chapter(chapter_text: str, seg_size: int = 500, mode: str = "greedy", overlap_size: int = 0) -> List[Dict]:
         """
         将章节内容分割为适合LLM处理的片段
         
         Args:
             chapter_text: 章节文本
             seg_size: 目标片段长度
+            mode: 分段模式，"greedy"（按长度贪心累积）或 "content_defined"（基于内容的分段）
+            overlap_size: 相邻片段的重叠长度，大于0时每个片段开头会重复上一片段的结尾
             
         Returns:
             分段后的章节片段列表，每个片段为字典 {"seg_id": "xx-1", "text": "..."}
         """
+        if mode == "content_defined":
+            segments = TextSplitter.split_chapter_content_defined(chapter_text, seg_size)
+        elif mode == "greedy":
+            segments = TextSplitter._split_chapter_greedy(chapter_text, seg_size)
+        else:
+            raise ValueError(f"不支持的分段模式: {mode}")
+        
+        if overlap_size > 0:
+            segments = TextSplitter.apply_overlap(segments, overlap_size)
+        return segments
+    
+    @staticmethod
+    def _split_chapter_greedy(chapter_text: str, seg_size: int) -> List[Dict]:
+        """
+        按长度贪心累积段落进行分段
+        
+        Args:
+            chapter_text: 章节文本
+            seg_size: 目标片段长度
+            
+        Returns:
+            分段后的章节片段列表
+        """
         paragraphs = TextSplitter.split_by_paragraphs(chapter_text)
         
         segments = []
@@ -85,3 +179,161 @@ class TextSplitter:
             })
         
         return segments
+    
+    @staticmethod
+    def boundary_hash(text: str, window: int = 16) -> int:
+        """
+        计算段落边界处的滚动哈希值
+        
+        只取边界前 window 个字符参与计算，因此某个边界是否成为切分点
+        只取决于其附近的局部内容，与该边界在章节中的位置无关。
+        
+        Args:
+            text: 边界之前的段落文本
+            window: 哈希窗口长度（字符数）
+            
+        Returns:
+            非负整数哈希值
+        """
+        h = 0
+        for ch in text[-window:]:
+            h = (h * TextSplitter._HASH_BASE + ord(ch)) % TextSplitter._HASH_MOD
+        return h
+    
+    @staticmethod
+    def segment_hash(text: str) -> str:
+        """
+        计算片段内容的稳定标识
+        
+        Args:
+            text: 片段文本
+            
+        Returns:
+            16位十六进制内容哈希
+        """
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+    
+    @staticmethod
+    def split_chapter_content_defined(
+        chapter_text: str,
+        seg_size: int = 500,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        window: int = 16
+    ) -> List[Dict]:
+        """
+        基于内容的分段（content-defined chunking）
+        
+        在段落边界上计算滚动哈希，累积长度达到 min_size 后，哈希值命中
+        除数的边界即作为切分点；累积长度将超过 max_size 时强制切分。
+        在章节中插入或删除段落只会影响附近的一两个片段，其余片段的
+        边界和内容哈希保持不变，可作为逐片段缓存的稳定键。
+        
+        Args:
+            chapter_text: 章节文本
+            seg_size: 目标片段长度
+            min_size: 片段最小长度，默认为 seg_size 的一半
+            max_size: 片段最大长度，默认为 seg_size 的两倍
+            window: 边界哈希的窗口长度（字符数）
+            
+        Returns:
+            分段后的章节片段列表，每个片段为字典
+            {"seg_id": "1", "text": "...", "hash": "..."}
+        """
+        if min_size is None:
+            min_size = seg_size // 2
+        if max_size is None:
+            max_size = seg_size * 2
+        # 达到最小长度后平均再累积约 (seg_size - min_size) 个字符触发切分，
+        # 按每段约 100 字符估算除数，保证与章节内容本身无关
+        divisor = max(2, (seg_size - min_size) // 100)
+        
+        paragraphs = TextSplitter.split_by_paragraphs(chapter_text)
+        
+        segments = []
+        current_segment = []
+        current_length = 0
+        
+        def flush():
+            segment_text = '\n\n'.join(current_segment)
+            segments.append({
+                "seg_id": f"{len(segments) + 1}",
+                "text": segment_text,
+                "hash": TextSplitter.segment_hash(segment_text)
+            })
+        
+        for para in paragraphs:
+            para_length = len(para)
+            
+            # 加入当前段落会超出最大长度时强制切分
+            if current_segment and current_length + para_length > max_size:
+                flush()
+                current_segment = []
+                current_length = 0
+            
+            current_segment.append(para)
+            current_length += para_length
+            
+            # 达到最小长度且边界哈希命中时切分
+            if current_length >= min_size and TextSplitter.boundary_hash(para, window) % divisor == 0:
+                flush()
+                current_segment = []
+                current_length = 0
+        
+        # 处理剩余内容
+        if current_segment:
+            flush()
+        
+        return segments
+    
+    @staticmethod
+    def overlap_tail(text: str, overlap_size: int) -> str:
+        """
+        取片段结尾的重叠部分，尽量从句首开始
+        
+        Args:
+            text: 上一片段文本
+            overlap_size: 重叠长度上限
+            
+        Returns:
+            重叠文本
+        """
+        if len(text) <= overlap_size:
+            return text
+        tail = text[-overlap_size:]
+        # 从重叠窗口内第一个句子边界之后开始，避免半句话
+        match = re.search(r'[。！？\n]', tail)
+        if match and match.end() < len(tail):
+            tail = tail[match.end():]
+        return tail.strip()
+    
+    @staticmethod
+    def apply_overlap(segments: List[Dict], overlap_size: int) -> List[Dict]:
+        """
+        为片段添加重叠：每个片段开头重复上一片段的结尾
+        
+        片段的 "overlap" 字段记录开头重复部分的字符数（含分隔符），
+        下游可据此判断事件是否落在重叠区域内。"hash" 字段保持为片段自身内容（不含重叠部分）的哈希，
+        上一片段的修改不会影响本片段的哈希。
+        
+        Args:
+            segments: 不含重叠的片段列表
+            overlap_size: 重叠长度上限
+            
+        Returns:
+            添加重叠后的片段列表
+        """
+        result = []
+        previous_text = ""
+        for segment in segments:
+            segment = dict(segment)
+            core_text = segment["text"]
+            tail = TextSplitter.overlap_tail(previous_text, overlap_size) if previous_text else ""
+            if tail:
+                segment["text"] = f"{tail}\n\n{core_text}"
+                segment["overlap"] = len(tail) + 2
+            else:
+                segment["overlap"] = 0
+            result.append(segment)
+            previous_text = core_text
+        return result
@@ -13,6 +13,7 @@ import re
 from typing import Dict, List, Tuple, Any, Set, Optional
 from common.models.event import EventItem
 from common.models.causal_edge import CausalEdge
+from common.utils.chapter_ordinal import ChapterOrdinalTable
 
 
 class UnifiedIdProcessor:
@@ -131,37 +132,24 @@ class UnifiedIdProcessor:
         """
         # 如果没有事件ID，则基于章节ID和索引生成
         if not event_id:
-            normalized_chapter_id = re.sub(r'[章节]', '', chapter_id)
-            try:
-                chapter_num = int(normalized_chapter_id)
+            chapter_num = ChapterOrdinalTable.shared().ordinal(chapter_id)
+            if chapter_num is not None:
                 return f"E{chapter_num:02d}-{index}"
-            except ValueError:
-                # 如果无法转换为整数，直接使用原值
-                return f"E{normalized_chapter_id}-{index}"
+            # 如果无法解析为章节序号，直接使用原值
+            normalized_chapter_id = re.sub(r'[章节]', '', chapter_id)
+            return f"E{normalized_chapter_id}-{index}"
         
         # 如果已有事件ID，检查格式
         if re.match(r'E\d+-\d+', event_id):
             return event_id
         
         # 尝试从现有ID中提取章节和索引信息
-        match = re.search(r'第([一二三四五六七八九十百千万零]+|\d+)章-(\d+)', event_id)
+        match = re.search(r'(第[零〇一二两三四五六七八九十百千万\d]+章)-(\d+)', event_id)
         if match:
-            chapter_number = match.group(1)
+            chapter_number = ChapterOrdinalTable.shared().ordinal(match.group(1))
             event_number = match.group(2)
-            
-            # 处理中文数字
-            chinese_numbers = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, 
-                              '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
-            try:
-                if chapter_number in chinese_numbers:
-                    chapter_number = chinese_numbers[chapter_number]
-                else:
-                    chapter_number = int(chapter_number)
-            except ValueError:
-                # 处理复合中文数字，此处简化处理
-                chapter_number = 1  # 默认值
-                
-            return f"E{chapter_number:02d}-{event_number}"
+            if chapter_number is not None:
+                return f"E{chapter_number:02d}-{event_number}"
         
         # 默认情况，使用原始ID
         return event_id
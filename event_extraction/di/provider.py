@@ -9,6 +9,7 @@ if current_dir not in sys.path:
 
 from common.interfaces.extractor import AbstractExtractor
 from event_extraction.service.enhanced_extractor_service import EnhancedEventExtractor
+from event_extraction.service.segment_filter import SegmentFilter
 from common.utils.path_utils import get_config_path
 from common.utils.parallel_config import ParallelConfig
 from common.utils.thread_monitor import log_thread_usage
@@ -49,11 +50,28 @@ def provide_extractor() -> AbstractExtractor:
     # 记录线程使用情况
     log_thread_usage("event_extraction", optimal_workers, "io_bound")
     
+    # 调试记录由后台线程异步写入JSONL文件，可在生产环境保持开启
+    debug_mode = os.environ.get("EXTRACTION_DEBUG", "1").lower() in ["1", "true", "yes"]
+    debug_sample_rate = float(os.environ.get("EXTRACTION_DEBUG_SAMPLE_RATE", "1.0"))
+    debug_compress = os.environ.get("EXTRACTION_DEBUG_COMPRESS", "0").lower() in ["1", "true", "yes"]
+    
+    # 段落预过滤：off 不过滤（默认），skip 跳过低分段落，pack 将低分段落合并为一次请求
+    # 已知人物名从实体词表加载，更换小说时只需替换词表
+    filter_mode = os.environ.get("SEGMENT_FILTER_MODE", "off").lower()
+    segment_filter = SegmentFilter(
+        mode=filter_mode,
+        threshold=int(os.environ.get("SEGMENT_FILTER_THRESHOLD", "2")),
+        known_names=SegmentFilter.load_names(get_config_path("entity_lexicon.json"))
+    )
+    
     return EnhancedEventExtractor(
         model=model,
         prompt_path=prompt_path,
         api_key=api_key,
         max_workers=optimal_workers,  # 根据系统资源和配置动态设置并发数
         provider=provider,
-        debug_mode=True  # 启用调试模式以记录详细日志
+        debug_mode=debug_mode,
+        debug_sample_rate=debug_sample_rate,
+        debug_compress=debug_compress,
+        segment_filter=segment_filter
     )
@@ -19,8 +19,11 @@ from common.models.chapter import Chapter
 from common.models.event import EventItem
 from common.utils.enhanced_logger import EnhancedLogger
 from common.utils.unified_id_processor import UnifiedIdProcessor
+from common.utils.debug_sink import DebugSink
+from common.utils.event_deduplicator import EventDeduplicator
 from event_extraction.domain.base_extractor import BaseExtractor
 from event_extraction.repository.llm_client import LLMClient
+from event_extraction.service.segment_filter import SegmentFilter
 
 
 class EnhancedEventExtractor(BaseExtractor):
@@ -34,7 +37,11 @@ class EnhancedEventExtractor(BaseExtractor):
         base_url: str = "",
         max_workers: int = 20, # 这个参数控制并行处理的最大工作线程数
         provider: str = "openai",
-        debug_mode: bool = False
+        debug_mode: bool = False,
+        debug_sample_rate: float = 1.0,
+        debug_compress: bool = False,
+        segment_filter: Optional[SegmentFilter] = None,
+        deduplicator: Optional[EventDeduplicator] = None
     ):
         """
         初始化增强型事件抽取器
@@ -47,6 +54,10 @@ class EnhancedEventExtractor(BaseExtractor):
             max_workers: 并行处理的最大工作线程数
             provider: API提供商，"openai"或"deepseek"
             debug_mode: 是否启用调试模式
+            debug_sample_rate: 调试记录的采样率（按段落采样，0-1）
+            debug_compress: 是否压缩轮转后的调试记录文件
+            segment_filter: 段落预过滤器，为None时不过滤
+            deduplicator: 近似重复事件合并器，为None时使用默认配置
         """
         # 创建专用的日志记录器
         self.logger = EnhancedLogger("event_extractor", log_level="DEBUG" if debug_mode else "INFO")
@@ -87,6 +98,10 @@ class EnhancedEventExtractor(BaseExtractor):
             
         self.base_url = base_url
         self.max_workers = max_workers
+        self.segment_filter = segment_filter or SegmentFilter(mode="off")
+        self.deduplicator = deduplicator or EventDeduplicator()
+        # 最近一次抽取中事件ID到来源片段ID列表的映射
+        self.last_event_sources: Dict[str, List[str]] = {}
         
         # 初始化LLM客户端
         self.llm_client = LLMClient(
@@ -96,14 +111,19 @@ class EnhancedEventExtractor(BaseExtractor):
             provider=self.provider
         )
         
-        # 创建调试目录
+        # 创建调试记录器，由后台线程异步写入，不阻塞抽取线程
+        self.debug_sink = None
         if debug_mode:
             from pathlib import Path
             from common.utils.path_utils import get_project_root
             
             self.debug_dir = Path(get_project_root()) / "debug" / "event_extraction"
-            self.debug_dir.mkdir(parents=True, exist_ok=True)
-            self.logger.info(f"调试信息将保存到: {self.debug_dir}")
+            self.debug_sink = DebugSink(
+                self.debug_dir / "extraction_debug.jsonl",
+                compress=debug_compress,
+                sample_rate=debug_sample_rate
+            )
+            self.logger.info(f"调试信息将保存到: {self.debug_sink.file_path}", sample_rate=debug_sample_rate)
         
     def extract(self, chapter: Chapter) -> List[EventItem]:
         """
@@ -116,6 +136,7 @@ class EnhancedEventExtractor(BaseExtractor):
             抽取的事件列表
         """
         self.logger.info(f"开始从章节中抽取事件", chapter_id=chapter.chapter_id, title=chapter.title)
+        self.last_event_sources = {}
         
         if not chapter.segments:
             # 如果章节没有预定义的分段，创建分段
@@ -124,14 +145,29 @@ class EnhancedEventExtractor(BaseExtractor):
             chapter.segments = TextSplitter.split_chapter(chapter.content)
             self.logger.info(f"创建了 {len(chapter.segments)} 个文本分段")
         
+        # 本地预过滤：不太可能包含事件的段落被跳过或合并为一次低优先级请求
+        segments, low_priority_segments, filter_records = self.segment_filter.partition(chapter.segments)
+        if low_priority_segments:
+            self.logger.info(
+                f"预过滤标记了 {len(low_priority_segments)}/{len(chapter.segments)} 个低优先级段落",
+                mode=self.segment_filter.mode,
+                seg_ids=[seg["seg_id"] for seg in low_priority_segments]
+            )
+            if self.debug_sink:
+                for record in filter_records:
+                    self.debug_sink.submit("filtered", record["seg_id"], record)
+        
         # 根据系统资源和设置调整实际使用的工作线程数
         import multiprocessing
         cpu_count = multiprocessing.cpu_count()
         # 确保线程数适合CPU超线程能力, 最低6个线程
-        effective_workers = max(6, min(self.max_workers, len(chapter.segments), cpu_count * 5))
-        self.logger.info(f"使用 {effective_workers} 个并行线程处理 {len(chapter.segments)} 个段落 (CPU核心数: {cpu_count})")
+        effective_workers = max(6, min(self.max_workers, len(segments), cpu_count * 5))
+        self.logger.info(f"使用 {effective_workers} 个并行线程处理 {len(segments)} 个段落 (CPU核心数: {cpu_count})")
             
         all_events = []
+        # 与all_events一一对应的来源片段范围，用于合并重叠区域内的重复事件
+        event_spans = []
+        seg_position = {segment["seg_id"]: idx for idx, segment in enumerate(chapter.segments)}
         failed_segments = []
         processed_count = 0
         api_failures = 0
@@ -145,7 +181,7 @@ class EnhancedEventExtractor(BaseExtractor):
                 has_tqdm = False
                 
             # 考虑是否使用批处理
-            should_batch = self._should_batch_segments(segments=chapter.segments)
+            should_batch = self._should_batch_segments(segments=segments)
             if should_batch:
                 self.logger.info("启用批处理模式，将多个短段落合并处理")
                 # 实现批处理逻辑 - 每2-3个段落为一组
@@ -156,11 +192,11 @@ class EnhancedEventExtractor(BaseExtractor):
                 # 使用线程池并行处理批次
                 with ThreadPoolExecutor(max_workers=effective_workers) as executor:
                     # 按批次提交任务
-                    for i, segment in enumerate(chapter.segments):
+                    for i, segment in enumerate(segments):
                         batch_segments.append(segment)
                         
                         # 当达到批次大小或是最后一个段落时提交任务
-                        if len(batch_segments) >= batch_size or i == len(chapter.segments) - 1:
+                        if len(batch_segments) >= batch_size or i == len(segments) - 1:
                             # 生成批次ID
                             first_id = batch_segments[0]["seg_id"]
                             last_id = batch_segments[-1]["seg_id"]
@@ -183,23 +219,25 @@ class EnhancedEventExtractor(BaseExtractor):
                     # 实时处理已完成的批次
                     import concurrent.futures
                     for future in concurrent.futures.as_completed(batched_futures):
-                        batch_id, segments = batched_futures[future]
-                        processed_count += len(segments)
+                        batch_id, batch_segs = batched_futures[future]
+                        processed_count += len(batch_segs)
                         
                         try:
                             events = future.result()
                             if events:
                                 self.logger.info(f"从批次 {batch_id} 提取到 {len(events)} 个事件")
                                 all_events.extend(events)
+                                span = (seg_position[batch_segs[0]["seg_id"]], seg_position[batch_segs[-1]["seg_id"]])
+                                event_spans.extend([span] * len(events))
                             else:
                                 self.logger.warning(f"从批次 {batch_id} 未提取到任何事件")
                                 api_failures += 1
-                                for segment in segments:
+                                for segment in batch_segs:
                                     failed_segments.append(segment["seg_id"])
                         except Exception as e:
                             self.logger.error(f"处理批次 {batch_id} 时出错: {str(e)}")
                             api_failures += 1
-                            for segment in segments:
+                            for segment in batch_segs:
                                 failed_segments.append(segment["seg_id"])
                         
                         # 更新进度
@@ -223,7 +261,7 @@ class EnhancedEventExtractor(BaseExtractor):
                             chapter.chapter_id,
                             segment["seg_id"]
                         ): (segment["seg_id"], i)
-                        for i, segment in enumerate(chapter.segments)
+                        for i, segment in enumerate(segments)
                     }
                     
                     # 设置进度条
@@ -244,6 +282,8 @@ class EnhancedEventExtractor(BaseExtractor):
                             if events:
                                 self.logger.info(f"从段落 {seg_id} 提取到 {len(events)} 个事件")
                                 all_events.extend(events)
+                                span = (seg_position[seg_id], seg_position[seg_id])
+                                event_spans.extend([span] * len(events))
                             else:
                                 self.logger.warning(f"从段落 {seg_id} 未提取到任何事件")
                                 failed_segments.append(seg_id)
@@ -271,6 +311,13 @@ class EnhancedEventExtractor(BaseExtractor):
                     # 关闭进度条
                     if has_tqdm:
                         pbar.close()
+            
+            # 低优先级段落合并为一次请求处理，未抽取到事件不计为失败
+            if low_priority_segments and self.segment_filter.mode == "pack":
+                events = self._process_segments_in_batch(low_priority_segments, chapter.chapter_id)
+                self.logger.info(f"从 {len(low_priority_segments)} 个低优先级段落中提取到 {len(events)} 个事件")
+                all_events.extend(events)
+                event_spans.extend([None] * len(events))
         
         except Exception as e:
             self.logger.error(f"事件抽取过程中发生错误: {str(e)}")
@@ -292,10 +339,32 @@ class EnhancedEventExtractor(BaseExtractor):
                     if events:
                         self.logger.info(f"从整个章节中提取到 {len(events)} 个事件")
                         all_events.extend(events)
+                        event_spans.extend([None] * len(events))
             except Exception as e:
                 self.logger.error(f"备用处理方法失败: {str(e)}")
                  # 在抽取服务中进行唯一ID处理（这是上游最早处理点，确保所有后续处理均使用唯一ID）
         if all_events:
+            # 分段重叠时，先合并相邻片段在重叠区域内重复抽取的事件
+            if any(segment.get("overlap") for segment in chapter.segments):
+                all_events, kept = self.deduplicator.merge_boundary_duplicates(all_events, event_spans, chapter.segments)
+                if len(kept) < len(event_spans):
+                    self.logger.info(
+                        f"合并了 {len(event_spans) - len(kept)} 个重叠区域内的重复事件",
+                        input=len(event_spans),
+                        output=len(kept)
+                    )
+                event_spans = [event_spans[i] for i in kept]
+            
+            # 合并同一情节被重复抽取的近似重复事件（批处理回退、整章回退等）
+            all_events, kept = self.deduplicator.merge(all_events)
+            if len(kept) < len(event_spans):
+                self.logger.info(
+                    f"合并了 {len(event_spans) - len(kept)} 个近似重复事件",
+                    input=len(event_spans),
+                    output=len(kept)
+                )
+            event_spans = [event_spans[i] for i in kept]
+            
             # 进行强制ID唯一性处理
             original_count = len(all_events)
             event_ids = [e.event_id for e in all_events]
@@ -317,10 +386,20 @@ class EnhancedEventExtractor(BaseExtractor):
             all_events = UnifiedIdProcessor.ensure_unique_event_ids(all_events)
             final_count = len(all_events)
             
+            # 记录事件的来源片段，供幻觉修复阶段检索上下文
+            self.last_event_sources = {
+                event.event_id: [chapter.segments[pos]["seg_id"] for pos in range(span[0], span[1] + 1)]
+                for event, span in zip(all_events, event_spans)
+                if span is not None
+            }
+            
             if final_count != original_count:
                 self.logger.warning(f"ID处理后合并了一些重复事件: {original_count} -> {final_count}")
             
             self.logger.info(f"ID唯一性处理完成，最终事件数: {final_count}，所有下游处理将使用唯一ID")
+            
+            # 已抽取事件中的人物加入预过滤器的已知人物词典
+            self.segment_filter.add_names(name for event in all_events for name in event.characters)
         
         # 汇报处理结果
         failure_rate = len(failed_segments) / len(chapter.segments) if chapter.segments else 0
@@ -330,11 +409,32 @@ class EnhancedEventExtractor(BaseExtractor):
             total_events=len(all_events),
             successful_segments=len(chapter.segments) - len(failed_segments),
             failed_segments=len(failed_segments),
+            filtered_segments=len(low_priority_segments),
             failure_rate=f"{failure_rate:.2%}"
         )
+        if self.debug_sink:
+            self.logger.debug("调试记录统计", **self.debug_sink.stats)
                     
         return all_events
     
+    def get_event_sources(self) -> Dict[str, List[str]]:
+        """
+        获取最近一次抽取中每个事件的来源片段，供幻觉修复阶段检索上下文
+        
+        Returns:
+            事件ID到来源片段ID列表的映射
+        """
+        return self.last_event_sources
+    
+    def get_filter_report(self) -> Dict[str, Any]:
+        """
+        获取段落预过滤的统计报告，包括过滤率和被过滤段落的审计记录
+        
+        Returns:
+            过滤统计报告
+        """
+        return self.segment_filter.get_report()
+    
     def extract_from_segment(self, text: str, chapter_id: str, segment_id: str) -> List[EventItem]:
         """
         从单个文本段落中提取事件
@@ -370,10 +470,8 @@ class EnhancedEventExtractor(BaseExtractor):
                 prompt["instruction"] += format_guidance
             
             # 保存调试信息
-            if self.debug_mode:
-                debug_file = self.debug_dir / f"{segment_id}_prompt.json"
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(prompt, f, ensure_ascii=False, indent=2)
+            if self.debug_sink:
+                self.debug_sink.submit("prompt", segment_id, prompt)
             
             # 调用LLM API (添加重试机制)
             max_retries = 3
@@ -397,10 +495,8 @@ class EnhancedEventExtractor(BaseExtractor):
                 time.sleep(delay)
             
             # 保存API响应
-            if self.debug_mode and "json_content" in response:
-                debug_file = self.debug_dir / f"{segment_id}_response.json"
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+            if self.debug_sink and "json_content" in response:
+                self.debug_sink.submit("response", segment_id, response)
             
             if response["success"] and "json_content" in response:
                 # 解析响应
@@ -408,10 +504,8 @@ class EnhancedEventExtractor(BaseExtractor):
                 self.logger.debug(f"段落 {segment_id} 抽取到 {len(events)} 个事件")
                 
                 # 保存解析后的事件
-                if self.debug_mode:
-                    debug_file = self.debug_dir / f"{segment_id}_events.json"
-                    with open(debug_file, 'w', encoding='utf-8') as f:
-                        json.dump([event.to_dict() for event in events], f, ensure_ascii=False, indent=2)
+                if self.debug_sink:
+                    self.debug_sink.submit("events", segment_id, [event.to_dict() for event in events])
                 
                 return events
             else:
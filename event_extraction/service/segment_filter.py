@@ -0,0 +1,212 @@
+"""
+段落预过滤服务
+
+在调用LLM抽取事件之前，使用本地特征快速评估段落是否可能包含情节事件：
+1. 去除书名、作者、章节标题等样板行
+2. 统计长度、对话标记、已知人物名（来自实体词表）、动作动词等特征
+3. 得分低于阈值的段落被跳过或合并为一次低优先级请求
+
+被过滤的段落会记录在审计日志中，便于事后检查；日志只保留最近的若干条，长篇小说处理时不会无限增长。
+"""
+
+import os
+import re
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from common.utils.json_loader import JsonLoader
+
+
+class SegmentFilter:
+    """段落预过滤器，基于本地特征为段落打分"""
+
+    # 过滤模式：off 不过滤，skip 直接跳过低分段落，pack 将低分段落合并为一次请求
+    MODES = ("off", "skip", "pack")
+
+    # 样板行：书名/作者、章节标题、求票等与情节无关的内容
+    BOILERPLATE_PATTERNS = [
+        r'^《[^》]+》\s*(作者[:：].*)?$',
+        r'^作者[:：].*$',
+        r'^[【]?第[^章\s]{1,10}章[^\n]{0,30}[】]?$',
+        r'^(本章完|未完待续|求(月票|推荐票|收藏).*)$',
+    ]
+
+    # 对话标记
+    DIALOGUE_MARKERS = ("“", "”", "「", "」", "说道", "问道", "喝道", "笑道", "答道")
+
+    # 常见的情节动作动词
+    ACTION_VERBS = (
+        "杀", "斩", "打", "逃", "救", "追", "战", "击", "拜", "收",
+        "服下", "炼制", "修炼", "突破", "获得", "得到", "交给", "夺",
+        "离开", "来到", "出手", "决定", "发现", "答应", "拒绝", "死",
+        "进入", "考核", "带走", "送", "学", "偷",
+    )
+
+    def __init__(
+        self,
+        mode: str = "pack",
+        min_length: int = 30,
+        threshold: int = 2,
+        known_names: Optional[Iterable[str]] = None,
+        max_audit_entries: int = 1000
+    ):
+        """
+        初始化段落预过滤器
+
+        Args:
+            mode: 过滤模式，"off"、"skip" 或 "pack"
+            min_length: 去除样板行后的最小有效长度，低于此长度直接判为无事件
+            threshold: 保留段落所需的最低得分
+            known_names: 已知人物名，通常由 load_names 从实体词表加载
+            max_audit_entries: 审计日志保留的最大条数，超出时丢弃最早的记录
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的过滤模式: {mode}")
+        self.mode = mode
+        self.min_length = min_length
+        self.threshold = threshold
+        self.max_audit_entries = max_audit_entries
+        self.known_names = set(n for n in (known_names or []) if n)
+
+        self._boilerplate = [re.compile(p) for p in self.BOILERPLATE_PATTERNS]
+        self._lock = threading.Lock()
+        self.total_count = 0
+        self.filtered_count = 0
+        self.audit_log: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def load_names(path: str) -> List[str]:
+        """
+        从实体词表加载人物名（规范名及其别名），文件不存在时返回空列表
+
+        Args:
+            path: 词表JSON路径
+
+        Returns:
+            人物名列表
+        """
+        if not path or not os.path.exists(path):
+            return []
+        characters = JsonLoader.load_json(path).get("characters", {})
+        names = []
+        for name, aliases in characters.items():
+            names.append(name)
+            names.extend(aliases or [])
+        return names
+
+    def add_names(self, names: Iterable[str]) -> None:
+        """
+        添加已知人物名（如已抽取事件中的人物）
+
+        Args:
+            names: 人物名列表
+        """
+        with self._lock:
+            self.known_names.update(n for n in names if n and len(n) >= 2)
+
+    def strip_boilerplate(self, text: str) -> str:
+        """
+        去除文本中的样板行
+
+        Args:
+            text: 段落文本
+
+        Returns:
+            去除样板行后的文本
+        """
+        lines = []
+        for line in text.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if any(p.match(stripped) for p in self._boilerplate):
+                continue
+            lines.append(stripped)
+        return "\n".join(lines)
+
+    def score(self, text: str) -> Tuple[int, Dict[str, Any]]:
+        """
+        为段落打分
+
+        Args:
+            text: 段落文本
+
+        Returns:
+            (得分, 特征详情)
+        """
+        body = self.strip_boilerplate(text)
+        features: Dict[str, Any] = {"length": len(body)}
+
+        if len(body) < self.min_length:
+            features["reason"] = "有效内容过短"
+            return 0, features
+
+        names = sorted(n for n in self.known_names if n in body)
+        dialogue = sum(body.count(m) for m in self.DIALOGUE_MARKERS)
+        verbs = sorted(v for v in self.ACTION_VERBS if v in body)
+
+        features.update({"names": names, "dialogue": dialogue, "verbs": verbs})
+
+        score = 2 * min(len(names), 2) + min(dialogue, 2) + min(len(verbs), 3)
+        if score < self.threshold:
+            features["reason"] = "无人物、对话或动作"
+        return score, features
+
+    def partition(
+        self, segments: List[Dict]
+    ) -> Tuple[List[Dict], List[Dict], List[Dict[str, Any]]]:
+        """
+        将段落分为需要抽取的段落和低优先级段落
+
+        Args:
+            segments: 段落列表
+
+        Returns:
+            (需要抽取的段落, 低优先级段落, 本次调用产生的审计记录)
+        """
+        if self.mode == "off":
+            return list(segments), [], []
+
+        keep, low_priority, records = [], [], []
+        for segment in segments:
+            score, features = self.score(segment.get("text", ""))
+            if score >= self.threshold:
+                keep.append(segment)
+                continue
+            low_priority.append(segment)
+            records.append({
+                "seg_id": segment.get("seg_id"),
+                "score": score,
+                "action": self.mode,
+                "preview": segment.get("text", "")[:50],
+                **features
+            })
+
+        with self._lock:
+            self.audit_log.extend(records)
+            self.total_count += len(segments)
+            self.filtered_count += len(low_priority)
+            if len(self.audit_log) > self.max_audit_entries:
+                del self.audit_log[:len(self.audit_log) - self.max_audit_entries]
+        return keep, low_priority, records
+
+    @property
+    def skip_rate(self) -> float:
+        """被过滤段落占全部段落的比例"""
+        return self.filtered_count / self.total_count if self.total_count else 0.0
+
+    def get_report(self) -> Dict[str, Any]:
+        """
+        获取过滤统计报告
+
+        Returns:
+            包含总数、过滤数、过滤率和审计记录的字典
+        """
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "total_segments": self.total_count,
+                "filtered_segments": self.filtered_count,
+                "skip_rate": self.skip_rate,
+                "audit": list(self.audit_log)
+            }
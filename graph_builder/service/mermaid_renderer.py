@@ -10,6 +10,7 @@ from common.models.event import EventItem
 from graph_builder.domain.base_renderer import BaseRenderer
 from graph_builder.utils.color_map import ColorMap
 from common.utils.parallel_config import ParallelConfig
+from common.utils.chapter_ordinal import ChapterOrdinalTable
 
 
 class MermaidRenderer(BaseRenderer):
@@ -221,24 +222,28 @@ class MermaidRenderer(BaseRenderer):
             # 获取所有孤立事件
             isolated_events = [e for e in events if e.event_id in isolated_nodes]
             
-            # 根据事件ID排序，假设格式为"E章节-序号"
             # 首先按章节号排序，然后按序号排序
-            def extract_chapter_and_sequence(event_id):
+            # 章节号优先取事件的chapter_id（支持中文数字），否则从"E章节-序号"格式的事件ID中解析
+            ordinal_table = ChapterOrdinalTable.shared()
+            
+            def extract_chapter_and_sequence(event):
+                chapter = ordinal_table.ordinal(event.chapter_id)
+                if chapter is None:
+                    chapter = ordinal_table.ordinal(event.event_id) or 0
                 # 假设格式为 E章节号-序号 或 E章节号-序号_子序号
-                parts = event_id.strip('E').split('-')
+                parts = event.event_id.strip('E').split('-')
+                sequence = 0
                 if len(parts) >= 2:
-                    chapter = int(parts[0]) if parts[0].isdigit() else 0
                     # 处理可能包含下划线的序号部分
                     seq_parts = parts[1].split('_')
                     sequence = int(seq_parts[0]) if seq_parts[0].isdigit() else 0
-                    return (chapter, sequence)
-                return (0, 0)  # 默认值
+                return (chapter, sequence)
                 
             # 按提取的章节和序号排序
-            isolated_events.sort(key=lambda e: extract_chapter_and_sequence(e.event_id))
+            isolated_events.sort(key=extract_chapter_and_sequence)
             
             # 对所有事件也进行相同的排序
-            all_events_sorted = sorted(events, key=lambda e: extract_chapter_and_sequence(e.event_id))
+            all_events_sorted = sorted(events, key=extract_chapter_and_sequence)
             
             # 连接孤立节点
             new_edges = []
@@ -10,7 +10,8 @@ if current_dir not in sys.path:
 
 from common.interfaces.refiner import AbstractRefiner
 from hallucination_refine.service.har_service import HallucinationRefiner
-from common.utils.path_utils import get_config_path
+from common.utils.path_utils import get_config_path, get_output_path
+from common.utils.json_loader import JsonLoader
 from common.utils.parallel_config import ParallelConfig
 from common.utils.thread_monitor import log_thread_usage
 from dotenv import load_dotenv
@@ -60,11 +61,86 @@ def provide_refiner() -> AbstractRefiner:
     # [EN] Record thread usage
     log_thread_usage("hallucination_refine", max_workers, "io_bound")
     
+    config = JsonLoader.load_json(get_config_path("config.json"))
+    
+    # [CN] 检索上下文的token预算（0表示发送完整章节）和相邻片段数；
+    # [CN] 默认取分段大小加重叠长度，保证完整的来源片段放得下（每个字符至多计1个token）
+    # [EN] Token budget of retrieved context (0 sends the whole chapter) and number of neighbor segments;
+    # [EN] defaults to segment size plus overlap so a whole source segment fits (each character counts as at most 1 token)
+    text_config = config.get("text_processing", {})
+    default_context_budget = text_config.get("segment_size", 800) + text_config.get("overlap_size", 0)
+    context_token_budget = int(os.environ.get("HAR_CONTEXT_TOKEN_BUDGET", default_context_budget))
+    context_neighbors = int(os.environ.get("HAR_CONTEXT_NEIGHBORS", "1"))
+    
+    # [CN] 批量精修：同一章节的多个事件共用一份上下文在一次请求中精修（默认1，逐个事件请求）
+    # [EN] Batched refinement: events of the same chapter share one context in a single request (default 1 disables batching)
+    batch_size = int(os.environ.get("HAR_BATCH_SIZE", "1"))
+    batch_context_token_budget = int(os.environ.get("HAR_BATCH_CONTEXT_TOKEN_BUDGET", "1200"))
+    
+    # [CN] 先在原文中核验事件实体，实体全部出现的事件跳过LLM精修（默认关闭，跳过的事件不再检查描述、结果和时间）
+    # [EN] Verify event entities against the source text first; events whose entities are all attested skip LLM refinement
+    # [EN] (off by default, skipped events no longer get their description, result and time checked)
+    verify_entities = os.environ.get("HAR_VERIFY_ENTITIES", "false").lower() in ["1", "true", "yes"]
+    
+    # [CN] 规范实体表模式：每章一次请求整理实体及别名，在本地改写全部事件，代替逐个事件精修
+    # [EN] Entity table mode: one request per chapter builds canonical entities and aliases, applied to all events locally
+    entity_table_mode = os.environ.get("HAR_ENTITY_TABLE", "false").lower() in ["1", "true", "yes"]
+    
+    # [CN] 修正置信度达到该阈值时不再发起下一轮精修
+    # [EN] Skip the next refinement round once a correction's confidence reaches this threshold
+    confidence_threshold = float(os.environ.get("HAR_CONFIDENCE_THRESHOLD", "0.9"))
+    
+    # [CN] 精修结果持久化缓存，按事件内容和上下文哈希复用已验证的结果
+    # [EN] Persistent refinement cache reusing verified results by event content and context hash
+    use_cache = os.environ.get("HAR_CACHE", "true").lower() in ["1", "true", "yes"]
+    cache_path = os.environ.get("HAR_CACHE_PATH", os.path.join(get_output_path("cache"), "har_cache.json")) if use_cache else ""
+    cache_max_entries = int(os.environ.get("HAR_CACHE_MAX_ENTRIES", "20000"))
+    
+    # [CN] 章节摘要：此前最近K章的摘要作为前情提要（默认0不使用，开启后每章多一次摘要调用），摘要持久化保存、每章只生成一次
+    # [EN] Chapter summaries: the last K chapter summaries as a digest (default 0 disables; enabling costs one extra call per chapter), persisted and generated once per chapter
+    summary_window = int(os.environ.get("HAR_SUMMARY_WINDOW", "0"))
+    summary_path = os.environ.get("HAR_SUMMARY_PATH", os.path.join(get_output_path("cache"), "chapter_summaries.json"))
+    summary_token_budget = int(os.environ.get("HAR_SUMMARY_TOKEN_BUDGET", "300"))
+    
+    # [CN] 选择性精修：按幻觉风险排序，每章只精修符合调用预算（0表示不限制）和比例上限的事件
+    # [EN] Selective refinement: rank events by hallucination risk and refine only those within the per-chapter call budget (0 = unlimited) and fraction
+    har_config = config.get("hallucination_refine", {})
+    max_calls_per_chapter = int(os.environ.get("HAR_MAX_CALLS_PER_CHAPTER", har_config.get("max_calls_per_chapter", 0)))
+    refine_fraction = float(os.environ.get("HAR_REFINE_FRACTION", har_config.get("refine_fraction", 1.0)))
+    
+    # [CN] 模型级联：首轮用上面的模型精修，检测到幻觉或置信度不足时升级到强模型（如 gpt-4o），为空时不启用
+    # [EN] Model cascade: first-pass checks use the model above; hallucinated or low-confidence verdicts escalate to a stronger model (e.g. gpt-4o), disabled when empty
+    escalation_model = os.environ.get("HAR_ESCALATION_MODEL", "")
+    escalation_provider = os.environ.get("HAR_ESCALATION_PROVIDER", "openai")
+    escalation_api_key = os.environ.get("OPENAI_API_KEY" if escalation_provider == "openai" else "DEEPSEEK_API_KEY", "")
+    if escalation_model and not escalation_api_key:
+        print(f"# [CN] 未找到 {escalation_provider} API 密钥，不启用模型级联")
+        print(f"# [EN] No {escalation_provider} API key found, model cascade disabled")
+        escalation_model = ""
+    
     return HallucinationRefiner(
         model=model,
         prompt_path=prompt_path,
         api_key=api_key,
         max_workers=max_workers,
         max_iterations=2,
-        provider=provider
+        provider=provider,
+        context_token_budget=context_token_budget,
+        context_neighbors=context_neighbors,
+        batch_size=batch_size,
+        batch_context_token_budget=batch_context_token_budget,
+        verify_entities=verify_entities,
+        lexicon_path=get_config_path("entity_lexicon.json"),
+        entity_table_mode=entity_table_mode,
+        confidence_threshold=confidence_threshold,
+        cache_path=cache_path,
+        cache_max_entries=cache_max_entries,
+        summary_path=summary_path,
+        summary_window=summary_window,
+        summary_token_budget=summary_token_budget,
+        max_calls_per_chapter=max_calls_per_chapter,
+        refine_fraction=refine_fraction,
+        escalation_model=escalation_model,
+        escalation_provider=escalation_provider,
+        escalation_api_key=escalation_api_key
     )
@@ -35,6 +35,82 @@ class BaseRefiner(AbstractRefiner, ABC):
             event=json.dumps(event.to_dict(), ensure_ascii=False),
             context=context
         )
+        if 'output_format' in self.prompt_template:
+            # 明确要求的输出字段（包括用于提前终止迭代的 confidence）
+            instruction += "\n\n输出格式：\n" + json.dumps(
+                self.prompt_template['output_format'], ensure_ascii=False, indent=2
+            )
+        
+        return {
+            'system': system_prompt,
+            'instruction': instruction
+        }
+    
+    def format_batch_prompt(self, events: List[EventItem], context: str) -> Dict[str, Any]:
+        """
+        格式化批量精修的提示模板，多个事件共用一份上下文
+        
+        Args:
+            events: 待精修的事件列表
+            context: 批次共享的上下文信息
+        
+        Returns:
+            格式化后的提示词字典
+        """
+        system_prompt = self.prompt_template.get('system', '')
+        instruction = self.prompt_template.get('batch_instruction', '').format(
+            events=json.dumps([event.to_dict() for event in events], ensure_ascii=False, indent=2),
+            context=context,
+            output_format=json.dumps(self.prompt_template.get('batch_output_format', {}), ensure_ascii=False, indent=2)
+        )
+        
+        return {
+            'system': system_prompt,
+            'instruction': instruction
+        }
+    
+    def format_entity_table_prompt(self, entities: Dict[str, List[str]], context: str) -> Dict[str, Any]:
+        """
+        格式化章节规范实体表的提示模板
+        
+        Args:
+            entities: 本章事件中出现的实体，按字段分组
+            context: 章节原文
+        
+        Returns:
+            格式化后的提示词字典
+        """
+        system_prompt = self.prompt_template.get('system', '')
+        instruction = self.prompt_template.get('entity_table_instruction', '').format(
+            entities=json.dumps(entities, ensure_ascii=False, indent=2),
+            context=context,
+            output_format=json.dumps(self.prompt_template.get('entity_table_output_format', {}), ensure_ascii=False, indent=2)
+        )
+        
+        return {
+            'system': system_prompt,
+            'instruction': instruction
+        }
+    
+    def format_summary_prompt(self, title: str, content: str, max_chars: int) -> Dict[str, Any]:
+        """
+        格式化章节摘要的提示模板
+        
+        Args:
+            title: 章节标题
+            content: 章节原文
+            max_chars: 摘要的最大字数
+            
+        Returns:
+            格式化后的提示词字典
+        """
+        system_prompt = self.prompt_template.get('system', '')
+        instruction = self.prompt_template.get('summary_instruction', '').format(
+            title=title,
+            content=content,
+            max_chars=max_chars,
+            output_format=json.dumps(self.prompt_template.get('summary_output_format', {}), ensure_ascii=False, indent=2)
+        )
         
         return {
             'system': system_prompt,
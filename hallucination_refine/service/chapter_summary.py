@@ -0,0 +1,124 @@
+"""
+章节摘要存储服务
+
+为每章保存一份简短摘要（按章节内容哈希判断是否需要重新生成），并持久化到文件。
+精修某章事件时，取此前最近K章的摘要拼成前情提要，作为跨章节事实的紧凑上下文，
+代替发送前文原文。
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+from common.utils.chapter_ordinal import ChapterOrdinalTable
+from common.utils.json_loader import JsonLoader
+from hallucination_refine.service.context_retriever import ContextRetriever
+
+
+class ChapterSummaryStore:
+    """按章节保存摘要，并生成最近K章的前情提要"""
+
+    # 前情提要的标题
+    DIGEST_HEADER = "前情提要："
+
+    def __init__(self, path: str = "", window: int = 3, token_budget: int = 300):
+        """
+        初始化摘要存储，指定路径时从文件加载已有摘要
+
+        Args:
+            path: 摘要文件路径，为空时只在内存中保存
+            window: 前情提要包含的章节数K
+            token_budget: 前情提要的token上限
+        """
+        self.path = path
+        self.window = window
+        self.token_budget = token_budget
+        self.summaries: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._ordinals = ChapterOrdinalTable.shared()
+        if path and os.path.exists(path):
+            try:
+                data = JsonLoader.load_json(path)
+            except ValueError as e:
+                print(f"章节摘要文件读取失败，将重新生成: {path} ({str(e)})")
+                data = {}
+            if isinstance(data, dict):
+                self.summaries = {k: v for k, v in data.items() if isinstance(v, dict) and v.get("summary")}
+
+    def get(self, chapter_id: str, content_hash: Optional[str] = None) -> Optional[str]:
+        """
+        查询章节摘要
+
+        Args:
+            chapter_id: 章节ID
+            content_hash: 章节内容哈希，提供时只返回由相同内容生成的摘要
+
+        Returns:
+            摘要文本，不存在或内容已变化时返回None
+        """
+        entry = self.summaries.get(chapter_id)
+        if not entry or (content_hash and entry.get("hash") != content_hash):
+            return None
+        return entry["summary"]
+
+    def put(self, chapter_id: str, summary: str, title: str = "", content_hash: str = "") -> None:
+        """
+        保存章节摘要并写回文件
+
+        Args:
+            chapter_id: 章节ID
+            summary: 摘要文本
+            title: 章节标题
+            content_hash: 章节内容哈希
+        """
+        with self._lock:
+            self.summaries[chapter_id] = {"title": title, "hash": content_hash, "summary": summary}
+            if self.path:
+                JsonLoader.save_json(self.summaries, self.path)
+
+    def previous(self, chapter_id: str, k: Optional[int] = None) -> List[str]:
+        """
+        列出当前章节之前最近的K个有摘要的章节
+
+        Args:
+            chapter_id: 当前章节ID
+            k: 章节数，默认使用self.window
+
+        Returns:
+            章节ID列表，按章节序号从前到后排列；当前章节序号无法解析时为空
+        """
+        if k is None:
+            k = self.window
+        current = self._ordinals.ordinal(chapter_id)
+        if current is None or k <= 0:
+            return []
+        earlier = []
+        for other in self.summaries:
+            ordinal = self._ordinals.ordinal(other)
+            if ordinal is not None and ordinal < current:
+                earlier.append((ordinal, other))
+        earlier.sort()
+        return [other for _, other in earlier[-k:]]
+
+    def digest(self, chapter_id: str) -> str:
+        """
+        生成当前章节的前情提要：此前最近K章的摘要，超出token预算时舍弃较早的章节
+
+        Args:
+            chapter_id: 当前章节ID
+
+        Returns:
+            前情提要文本，没有可用摘要时返回空字符串
+        """
+        lines = []
+        for other in self.previous(chapter_id):
+            entry = self.summaries[other]
+            title = f"{other} {entry.get('title', '')}".strip()
+            lines.append(f"【{title}】{entry['summary']}")
+
+        while lines:
+            digest = "\n".join([self.DIGEST_HEADER] + lines)
+            if ContextRetriever.estimate_tokens(digest) <= self.token_budget:
+                return digest
+            lines.pop(0)
+        return ""
@@ -0,0 +1,281 @@
+"""
+幻觉修复上下文检索服务
+
+为每个事件只挑选与之相关的原文片段作为修复上下文，而不是发送整章文本：
+1. 事件的来源片段及其相邻片段
+2. 基于字符n-gram的BM25索引检索出的相关片段
+3. 按token预算截断，保证每次调用的上下文长度可控；单个片段超出预算时，
+   截取以事件相关内容为中心的窗口，而不是片段开头
+"""
+
+import math
+import re
+from collections import Counter
+from typing import List, Dict, Optional, Iterable, Tuple
+
+from common.models.event import EventItem
+
+
+class ContextRetriever:
+    """基于来源片段和BM25检索的事件上下文构建器"""
+
+    # 片段之间的分隔符，非相邻片段之间使用省略标记
+    SEPARATOR = "\n\n"
+    GAP_MARKER = "\n\n……\n\n"
+
+    def __init__(
+        self,
+        segments: List[Dict],
+        token_budget: int = 600,
+        neighbors: int = 1,
+        top_k: int = 2,
+        ngram: int = 2,
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        """
+        初始化上下文检索器
+
+        Args:
+            segments: 章节片段列表（含 "seg_id" 和 "text"）
+            token_budget: 每个事件上下文的token上限
+            neighbors: 来源片段前后各取的相邻片段数
+            top_k: BM25检索补充的片段数
+            ngram: 字符n-gram长度
+            k1: BM25词频饱和参数
+            b: BM25长度归一化参数
+        """
+        self.token_budget = token_budget
+        self.neighbors = neighbors
+        self.top_k = top_k
+        self.ngram = ngram
+        self.k1 = k1
+        self.b = b
+
+        self.seg_ids = [seg.get("seg_id", str(i)) for i, seg in enumerate(segments)]
+        self.texts = [seg.get("text", "") for seg in segments]
+        self.position = {seg_id: i for i, seg_id in enumerate(self.seg_ids)}
+
+        # 构建BM25索引
+        self.term_freqs: List[Counter] = [Counter(self.tokenize(text)) for text in self.texts]
+        self.doc_lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        doc_freq: Counter = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n_docs = len(self.texts)
+        self.idf = {
+            term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        将文本切分为字符n-gram（去除空白和标点）
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            n-gram列表
+        """
+        text = re.sub(r'[\s\W_]+', '', text or '')
+        if len(text) < self.ngram:
+            return [text] if text else []
+        return [text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)]
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        粗略估计文本的token数：中日韩字符按1个token计，其余字符按4个字符1个token计
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            估计的token数
+        """
+        cjk = len(re.findall(r'[\u3000-\u9fff\uf900-\ufaff\uff00-\uffef]', text))
+        return cjk + math.ceil((len(text) - cjk) / 4)
+
+    @staticmethod
+    def build_query(event: EventItem) -> str:
+        """
+        将事件的描述、人物、宝物、地点和结果拼接为检索查询
+
+        Args:
+            event: 事件
+
+        Returns:
+            查询文本
+        """
+        parts = [event.description or ""]
+        parts.extend(event.characters or [])
+        parts.extend(event.treasures or [])
+        parts.extend(value for value in (event.location, event.result) if value)
+        return " ".join(parts)
+
+    def search(self, query: str, top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        使用BM25检索与查询最相关的片段
+
+        Args:
+            query: 查询文本
+            top_k: 返回的片段数，默认使用self.top_k
+
+        Returns:
+            (片段序号, 得分) 列表，按得分降序，只包含得分大于0的片段
+        """
+        if top_k is None:
+            top_k = self.top_k
+        terms = Counter(self.tokenize(query))
+        scores = []
+        for i, tf in enumerate(self.term_freqs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / self.avg_length) if self.avg_length else self.k1
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((i, score))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores[:top_k]
+
+    def candidate_positions(self, event: EventItem, source_ids: Optional[Iterable[str]] = None) -> List[int]:
+        """
+        按优先级排列事件的候选片段：来源片段、相邻片段、BM25检索结果
+
+        Args:
+            event: 事件
+            source_ids: 事件来源片段ID，未知时为None
+
+        Returns:
+            去重后的片段序号列表（按优先级）
+        """
+        sources = [self.position[seg_id] for seg_id in (source_ids or []) if seg_id in self.position]
+        hits = [i for i, _ in self.search(self.build_query(event))]
+        # 来源未知时以最相关的检索结果作为来源
+        if not sources and hits:
+            sources = hits[:1]
+
+        ordered: List[int] = list(sources)
+        for distance in range(1, self.neighbors + 1):
+            for pos in sources:
+                ordered.extend(p for p in (pos - distance, pos + distance) if 0 <= p < len(self.texts))
+        ordered.extend(hits)
+
+        seen = set()
+        return [p for p in ordered if not (p in seen or seen.add(p))]
+
+    def retrieve(self, event: EventItem, source_ids: Optional[Iterable[str]] = None) -> str:
+        """
+        构建事件的修复上下文
+
+        Args:
+            event: 事件
+            source_ids: 事件来源片段ID，未知时为None
+
+        Returns:
+            按原文顺序拼接的相关片段，总长度不超过token预算；没有片段时返回空字符串
+        """
+        return self.assemble(self.candidate_positions(event, source_ids), query=self.build_query(event))
+
+    def retrieve_batch(
+        self,
+        events: List[EventItem],
+        event_sources: Optional[Dict[str, List[str]]] = None,
+        token_budget: Optional[int] = None
+    ) -> str:
+        """
+        为一批事件构建共享的修复上下文
+
+        按优先级轮流取各事件的候选片段（先各事件的来源片段，再相邻片段和检索结果），
+        保证预算内每个事件都能分到最相关的片段。
+
+        Args:
+            events: 事件列表
+            event_sources: 事件ID到来源片段ID列表的映射
+            token_budget: 共享上下文的token上限，默认使用self.token_budget
+
+        Returns:
+            按原文顺序拼接的相关片段；没有片段时返回空字符串
+        """
+        event_sources = event_sources or {}
+        candidates = [self.candidate_positions(event, event_sources.get(event.event_id)) for event in events]
+        ordered = []
+        for rank in range(max((len(c) for c in candidates), default=0)):
+            ordered.extend(c[rank] for c in candidates if rank < len(c))
+        seen = set()
+        positions = [p for p in ordered if not (p in seen or seen.add(p))]
+        query = " ".join(self.build_query(event) for event in events)
+        return self.assemble(positions, token_budget, query)
+
+    def focus_window(self, text: str, query: str, width: int) -> str:
+        """
+        从文本中截取以查询相关内容为中心的窗口
+
+        在原文中定位查询n-gram的命中位置，取命中最密集的区间，再以该区间中点为中心截取。
+
+        Args:
+            text: 片段文本
+            query: 查询文本（事件的描述和实体）
+            width: 窗口字符数
+
+        Returns:
+            长度不超过width的子串；没有命中时返回文本开头
+        """
+        if len(text) <= width:
+            return text
+        terms = set(self.tokenize(query))
+        hits = [i for i in range(len(text) - self.ngram + 1) if text[i:i + self.ngram] in terms]
+        if not hits:
+            return text[:width]
+
+        # 双指针找出窗口宽度内命中数最多的区间（相同时取最靠前的）
+        best_first, best_last, first = 0, 0, 0
+        for last in range(len(hits)):
+            while hits[last] + self.ngram - hits[first] > width:
+                first += 1
+            if last - first > best_last - best_first:
+                best_first, best_last = first, last
+
+        center = (hits[best_first] + hits[best_last] + self.ngram) // 2
+        start = min(max(0, center - width // 2), len(text) - width)
+        return text[start:start + width]
+
+    def assemble(self, positions: List[int], token_budget: Optional[int] = None, query: str = "") -> str:
+        """
+        按优先级在token预算内选取片段，并按原文顺序拼接
+
+        Args:
+            positions: 按优先级排列的片段序号
+            token_budget: token上限，默认使用self.token_budget
+            query: 查询文本，最优先的片段超出预算时用于定位截取窗口
+
+        Returns:
+            拼接后的上下文，非相邻片段之间插入省略标记；没有片段时返回空字符串
+        """
+        if token_budget is None:
+            token_budget = self.token_budget
+        if not positions:
+            return ""
+        # 最优先的片段放不下时截取其中与事件相关的窗口（每个字符至多计1个token，按字符数截断不会超出预算）
+        if self.estimate_tokens(self.texts[positions[0]]) > token_budget:
+            return self.focus_window(self.texts[positions[0]], query, token_budget)
+
+        selected: List[int] = []
+        used = 0
+        for pos in positions:
+            cost = self.estimate_tokens(self.texts[pos])
+            if used + cost > token_budget:
+                continue
+            selected.append(pos)
+            used += cost
+
+        selected.sort()
+        parts = [self.texts[selected[0]]]
+        for prev, pos in zip(selected, selected[1:]):
+            parts.append(self.SEPARATOR if pos == prev + 1 else self.GAP_MARKER)
+            parts.append(self.texts[pos])
+        return "".join(parts)
@@ -0,0 +1,151 @@
+"""
+章节级规范实体表
+
+每章调用一次LLM，得到该章人物、宝物、地点的规范名称及别名（如 "二愣子" → "韩立"），
+以及原文中并不存在的实体，然后在本地统一改写该章全部事件的实体字段，
+代替逐个事件的幻觉修复请求，并让下游候选生成看到一致的实体写法。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from common.models.event import EventItem
+
+
+class EntityTable:
+    """规范实体表：别名到规范名的映射，以及需要删除的实体"""
+
+    # 事件字段 -> 实体表中的类别
+    CATEGORIES = {"characters": "characters", "treasures": "treasures", "location": "locations"}
+
+    def __init__(self):
+        """初始化空的实体表"""
+        self.canonical: Dict[str, Dict[str, str]] = {category: {} for category in self.CATEGORIES.values()}
+        self.unsupported: Dict[str, Set[str]] = {category: set() for category in self.CATEGORIES.values()}
+
+    def add(self, category: str, canonical: str, aliases: Iterable[str] = ()) -> None:
+        """
+        登记一个规范实体及其别名
+
+        Args:
+            category: 类别（characters/treasures/locations）
+            canonical: 规范名称
+            aliases: 别名列表
+        """
+        if category not in self.canonical or not canonical:
+            return
+        mapping = self.canonical[category]
+        # 规范名本身曾被登记为别名时沿用已有的规范名
+        canonical = mapping.get(canonical, canonical)
+        mapping[canonical] = canonical
+        for alias in aliases or []:
+            if alias and alias != canonical:
+                mapping[alias] = canonical
+
+    @classmethod
+    def from_lexicon(cls, lexicon: Optional[Dict[str, Dict[str, List[str]]]]) -> "EntityTable":
+        """
+        用已知实体词表初始化实体表
+
+        Args:
+            lexicon: 实体词表，形如 {"characters": {"韩立": ["二愣子"]}, ...}
+
+        Returns:
+            实体表
+        """
+        table = cls()
+        for category, entries in (lexicon or {}).items():
+            for canonical, aliases in entries.items():
+                table.add(category, canonical, aliases)
+        return table
+
+    def update_from_response(self, response: Dict[str, Any]) -> "EntityTable":
+        """
+        合并LLM返回的规范实体表
+
+        Args:
+            response: 形如 {"characters": [{"canonical": "韩立", "aliases": ["二愣子"]}], ...,
+                      "unsupported": [{"field": "treasures", "name": "混沌神剑"}]}
+
+        Returns:
+            实体表本身，便于链式调用
+        """
+        if not isinstance(response, dict):
+            return self
+        for category in self.canonical:
+            for entry in response.get(category) or []:
+                if isinstance(entry, dict) and isinstance(entry.get("canonical"), str):
+                    aliases = [a for a in entry.get("aliases") or [] if isinstance(a, str)]
+                    self.add(category, entry["canonical"].strip(), [a.strip() for a in aliases])
+        for entry in response.get("unsupported") or []:
+            if not isinstance(entry, dict):
+                continue
+            category = self.CATEGORIES.get(entry.get("field"), entry.get("field"))
+            name = entry.get("name")
+            if category in self.unsupported and isinstance(name, str) and name:
+                self.unsupported[category].add(name.strip())
+        return self
+
+    def resolve(self, field: str, name: str) -> Optional[str]:
+        """
+        将实体名改写为规范名
+
+        Args:
+            field: 事件字段名
+            name: 实体名
+
+        Returns:
+            规范名；实体被判定为原文不存在时返回None
+        """
+        category = self.CATEGORIES[field]
+        if name in self.unsupported[category]:
+            return None
+        return self.canonical[category].get(name, name)
+
+    def apply(self, event: EventItem) -> EventItem:
+        """
+        按实体表改写单个事件的人物、宝物和地点
+
+        Args:
+            event: 事件
+
+        Returns:
+            改写后的新事件；没有变化时返回原事件
+        """
+        data = event.to_dict()
+        for field in ("characters", "treasures"):
+            resolved = []
+            for name in data.get(field) or []:
+                value = self.resolve(field, name)
+                if value and value not in resolved:
+                    resolved.append(value)
+            data[field] = resolved
+        # 地点只做规范化，不因判定不存在而清空
+        if data.get("location"):
+            data["location"] = self.canonical["locations"].get(data["location"], data["location"])
+
+        if data == event.to_dict():
+            return event
+        return EventItem.from_dict(data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为与LLM输出格式一致的字典
+
+        Returns:
+            各类别的规范名及别名，以及原文不存在的实体
+        """
+        result: Dict[str, Any] = {}
+        for category, mapping in self.canonical.items():
+            groups: Dict[str, List[str]] = {}
+            for alias, canonical in mapping.items():
+                groups.setdefault(canonical, [])
+                if alias != canonical:
+                    groups[canonical].append(alias)
+            result[category] = [{"canonical": c, "aliases": a} for c, a in groups.items()]
+        field_names = {category: field for field, category in self.CATEGORIES.items()}
+        result["unsupported"] = [
+            {"field": field_names[category], "name": name}
+            for category, names in self.unsupported.items()
+            for name in sorted(names)
+        ]
+        return result
@@ -0,0 +1,185 @@
+"""
+事件实体本地核验服务
+
+在调用LLM精修之前，先用确定性的方法核对事件中的人物、宝物和地点是否在原文中出现：
+1. 每章构建一次 Aho-Corasick 自动机，一次扫描原文即可核对该章全部事件的实体
+2. 已知实体词表提供别名（如 "二愣子" 与 "韩立"），原文出现任一名称即视为出现
+3. 地点去掉 "前"、"内" 等方位后缀后再核对
+
+至少核对了一个实体、且实体全部在原文中出现的事件无需LLM精修；存在未出现实体，
+或没有可核对实体（人物、宝物为空，地点为缺省值）的事件进入HAR。
+"""
+
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from common.models.event import EventItem
+from common.utils.aho_corasick import AhoCorasick
+from common.utils.json_loader import JsonLoader
+
+
+class EntityVerifier:
+    """基于原文多模式匹配和实体词表的事件实体核验器"""
+
+    # 参与核验的事件字段
+    FIELDS = ("characters", "treasures", "location")
+    # 表示缺省的占位值，不参与核验
+    PLACEHOLDERS = {"", "未知", "未指定", "不详", "无", "none", "null"}
+    # 地点常见的方位后缀，按长度从长到短尝试去除
+    LOCATION_SUFFIXES = ("附近", "之中", "之内", "之外", "之上", "前", "后", "内", "外", "中", "里", "上", "下", "旁", "边")
+
+    def __init__(self, source_text: str, lexicon: Optional[Dict[str, Dict[str, List[str]]]] = None):
+        """
+        初始化核验器
+
+        Args:
+            source_text: 章节原文
+            lexicon: 实体词表，形如 {"characters": {"韩立": ["二愣子"]}, ...}
+        """
+        self.source_text = source_text or ""
+        self.aliases: Dict[str, Set[str]] = {}
+        for entries in (lexicon or {}).values():
+            for canonical, aliases in entries.items():
+                group = {canonical, *(aliases or [])}
+                for name in group:
+                    self.aliases.setdefault(name, set()).update(group)
+        self._found: Set[str] = set()
+        self._scanned: Set[str] = set()
+
+    @staticmethod
+    def load_lexicon(path: str) -> Dict[str, Dict[str, List[str]]]:
+        """
+        加载实体词表，文件不存在时返回空词表
+
+        Args:
+            path: 词表JSON路径
+
+        Returns:
+            实体词表
+        """
+        if not path or not os.path.exists(path):
+            return {}
+        return JsonLoader.load_json(path)
+
+    @classmethod
+    def event_entities(cls, event: EventItem) -> List[Tuple[str, str]]:
+        """
+        列出事件中需要核验的实体
+
+        Args:
+            event: 事件
+
+        Returns:
+            (字段名, 实体名) 列表，已去除占位值
+        """
+        entities = []
+        for field in cls.FIELDS:
+            value = getattr(event, field, None)
+            for name in (value if isinstance(value, list) else [value]):
+                if isinstance(name, str) and name.strip().lower() not in cls.PLACEHOLDERS:
+                    entities.append((field, name.strip()))
+        return entities
+
+    def variants(self, field: str, name: str) -> Set[str]:
+        """
+        实体名可在原文中出现的写法：本名、词表别名，地点另加去除方位后缀的写法
+
+        Args:
+            field: 字段名
+            name: 实体名
+
+        Returns:
+            写法集合
+        """
+        names = {name}
+        if field == "location":
+            for suffix in self.LOCATION_SUFFIXES:
+                if name.endswith(suffix) and len(name) > len(suffix) + 1:
+                    names.add(name[:-len(suffix)])
+                    break
+        for value in list(names):
+            names.update(self.aliases.get(value, ()))
+        return names
+
+    def prepare(self, events: List[EventItem]) -> "EntityVerifier":
+        """
+        用一批事件的全部实体写法构建自动机，并扫描一次原文
+
+        Args:
+            events: 事件列表（通常为同一章节的全部事件）
+
+        Returns:
+            核验器本身，便于链式调用
+        """
+        patterns = set()
+        for event in events:
+            for field, name in self.event_entities(event):
+                patterns.update(self.variants(field, name))
+        patterns -= self._scanned
+        if patterns:
+            self._found |= AhoCorasick(patterns).find_all(self.source_text)
+            self._scanned |= patterns
+        return self
+
+    def is_attested(self, field: str, name: str) -> bool:
+        """
+        判断实体是否在原文中出现
+
+        Args:
+            field: 字段名
+            name: 实体名
+
+        Returns:
+            任一写法出现在原文中时返回True
+        """
+        for variant in self.variants(field, name):
+            if variant not in self._scanned:
+                # 未经 prepare 的实体直接在原文中查找
+                self._scanned.add(variant)
+                if variant in self.source_text:
+                    self._found.add(variant)
+            if variant in self._found:
+                return True
+        return False
+
+    def unattested(self, event: EventItem) -> List[Tuple[str, str]]:
+        """
+        列出事件中未在原文出现的实体
+
+        Args:
+            event: 事件
+
+        Returns:
+            (字段名, 实体名) 列表，为空表示全部实体均已核实
+        """
+        return [(field, name) for field, name in self.event_entities(event) if not self.is_attested(field, name)]
+
+    def is_verified(self, event: EventItem) -> bool:
+        """
+        判断事件能否跳过LLM精修
+
+        Args:
+            event: 事件
+
+        Returns:
+            至少有一个可核对的实体且全部在原文中出现时返回True；
+            没有可核对实体的事件无法核验（描述中仍可能编造内容），返回False
+        """
+        entities = self.event_entities(event)
+        return bool(entities) and all(self.is_attested(field, name) for field, name in entities)
+
+    def partition(self, events: List[EventItem]) -> Tuple[List[EventItem], List[EventItem]]:
+        """
+        将事件分为实体全部核实的事件和需要精修的事件
+
+        Args:
+            events: 事件列表
+
+        Returns:
+            (实体全部核实的事件, 存在未核实实体或没有可核对实体的事件)
+        """
+        self.prepare(events)
+        verified, suspicious = [], []
+        for event in events:
+            (verified if self.is_verified(event) else suspicious).append(event)
+        return verified, suspicious
@@ -1,17 +1,34 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
 import json
+import math
 import os
+import threading
+import unicodedata
 from concurrent.futures import ThreadPoolExecutor
 
 from common.interfaces.refiner import AbstractRefiner
 from common.models.event import EventItem
 from hallucination_refine.domain.base_refiner import BaseRefiner
+from hallucination_refine.service.context_retriever import ContextRetriever
+from hallucination_refine.service.entity_verifier import EntityVerifier
+from hallucination_refine.service.entity_table import EntityTable
+from hallucination_refine.service.chapter_summary import ChapterSummaryStore
+from hallucination_refine.service.risk_scorer import RiskScorer
+from common.utils.text_splitter import TextSplitter
+from common.utils.result_cache import ResultCache
+from common.utils.model_cascade import ModelCascade
 from event_extraction.repository.llm_client import LLMClient
 
 
 class HallucinationRefiner(BaseRefiner):
     """幻觉修复器实现类，使用HAR算法修复LLM输出中可能的幻觉"""
     
+    # 判断修正是否有实质变化时比较的字段
+    COMPARED_FIELDS = ("description", "characters", "treasures", "result", "location", "time")
+    # 事件停止迭代的原因：无幻觉、修正已收敛、置信度达到阈值、达到最大迭代次数、请求失败、实体核验通过、命中缓存、
+    # 风险较低且超出调用预算而未精修
+    STOP_REASONS = ("clean", "converged", "confident", "max_iterations", "failed", "verified", "cached", "skipped")
+    
     def __init__(
         self, 
         model: str = "gpt-4o", 
@@ -20,7 +37,28 @@ class HallucinationRefiner(BaseRefiner):
         base_url: str = "",
         max_workers: int = 3,
         max_iterations: int = 2,
-        provider: str = "openai"
+        provider: str = "openai",
+        context_token_budget: int = 600,
+        context_neighbors: int = 1,
+        batch_size: int = 1,
+        batch_context_token_budget: int = 1200,
+        verify_entities: bool = False,
+        lexicon_path: str = "",
+        entity_table_mode: bool = False,
+        confidence_threshold: float = 0.9,
+        cache_path: str = "",
+        cache_max_entries: int = 20000,
+        summary_path: str = "",
+        summary_window: int = 0,
+        summary_token_budget: int = 300,
+        summary_max_chars: int = 150,
+        max_calls_per_chapter: int = 0,
+        refine_fraction: float = 1.0,
+        risk_description_chars: int = 80,
+        escalation_model: str = "",
+        escalation_provider: str = "openai",
+        escalation_api_key: str = "",
+        escalation_base_url: str = ""
     ):
         """
         初始化幻觉修复器
@@ -32,6 +70,29 @@ class HallucinationRefiner(BaseRefiner):
             base_url: 自定义API基础URL
             max_workers: 并行处理的最大工作线程数
             max_iterations: 最大迭代次数，防止无限循环
+            provider: API提供商，"openai"或"deepseek"
+            context_token_budget: 每个事件检索上下文的token上限，0表示发送完整上下文
+            context_neighbors: 检索上下文时来源片段前后各取的相邻片段数
+            batch_size: 每次请求批量精修的事件数，1表示逐个事件请求
+            batch_context_token_budget: 批量精修时一批事件共享上下文的token上限
+            verify_entities: 是否先在原文中核验事件实体，实体全部出现的事件跳过LLM精修
+            lexicon_path: 已知实体词表路径，默认使用配置目录下的 entity_lexicon.json
+            entity_table_mode: 是否改为每章一次请求生成规范实体表，在本地改写全部事件
+            confidence_threshold: 修正的置信度达到该值时不再发起下一轮精修
+            cache_path: 精修结果缓存文件路径，为空时不使用缓存
+            cache_max_entries: 缓存的最大条目数，超出时淘汰最久未使用的条目
+            summary_path: 章节摘要文件路径，为空时摘要只保存在内存中
+            summary_window: 前情提要包含的此前章节数K，0表示不使用章节摘要
+            summary_token_budget: 前情提要的token上限
+            summary_max_chars: 每章摘要的最大字数
+            max_calls_per_chapter: 每章首轮精修请求数的上限，按幻觉风险从高到低选取事件，0表示不限制
+            refine_fraction: 每章最多精修的事件比例，按幻觉风险从高到低选取
+            risk_description_chars: 风险评分中描述超过该字数时计为长描述
+            escalation_model: 升级使用的强模型，为空时所有请求都使用 model；
+                              设置后 model 只做首轮判断，检测到幻觉或置信度低于阈值时改用该模型重新判断
+            escalation_provider: 强模型的API提供商
+            escalation_api_key: 强模型的API密钥，为空时从对应提供商的环境变量获取
+            escalation_base_url: 强模型的自定义API基础URL
         """
         if not prompt_path:
             # 导入path_utils获取配置文件路径
@@ -60,6 +121,31 @@ class HallucinationRefiner(BaseRefiner):
         self.max_workers = max_workers
         self.max_iterations = max_iterations
         self.provider = provider
+        self.context_token_budget = context_token_budget
+        self.context_neighbors = context_neighbors
+        self.batch_size = max(1, batch_size)
+        self.batch_context_token_budget = batch_context_token_budget
+        self.verify_entities = verify_entities
+        self.entity_table_mode = entity_table_mode
+        self.confidence_threshold = confidence_threshold
+        self.max_calls_per_chapter = max_calls_per_chapter
+        self.refine_fraction = refine_fraction
+        self.risk_description_chars = risk_description_chars
+        self.escalation_model = escalation_model
+        # 精修结果与事件ID无关，只取决于事件内容、上下文、模型和提示词
+        self.cache = ResultCache(cache_path, cache_max_entries, namespace="hallucination_refine") if cache_path else None
+        self._prompt_hash = ResultCache.make_key(self.prompt_template)
+        self.summary_max_chars = summary_max_chars
+        self.summary_store = ChapterSummaryStore(
+            summary_path, window=summary_window, token_budget=summary_token_budget
+        ) if summary_window > 0 else None
+        self.last_entity_table: Optional[EntityTable] = None
+        self.lexicon = {}
+        if verify_entities or entity_table_mode:
+            if not lexicon_path:
+                from common.utils.path_utils import get_config_path
+                lexicon_path = get_config_path("entity_lexicon.json")
+            self.lexicon = EntityVerifier.load_lexicon(lexicon_path)
         
         # 初始化LLM客户端
         self.llm_client = LLMClient(
@@ -68,28 +154,157 @@ class HallucinationRefiner(BaseRefiner):
             base_url=self.base_url,
             provider=self.provider
         )
+        # 首轮使用 model，检测到幻觉或置信度不足时升级到强模型
+        self.escalation_client = LLMClient(
+            api_key=escalation_api_key or None,
+            model=escalation_model,
+            base_url=escalation_base_url or None,
+            provider=escalation_provider
+        ) if escalation_model else None
+        self.cascade = ModelCascade(self.llm_client, self.escalation_client)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
     
-    def refine(self, events: List[EventItem], context: str = "") -> List[EventItem]:
+    def refine(
+        self,
+        events: List[EventItem],
+        context: str = "",
+        segments: Optional[List[Dict]] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None
+    ) -> List[EventItem]:
         """
         对事件列表进行幻觉检测和修复
         
         Args:
             events: 待精修的事件列表
-            context: 支持精修的上下文信息
+            context: 支持精修的上下文信息（通常为整章文本）
+            segments: 章节片段列表，提供时为每个事件检索相关片段作为上下文
+            event_sources: 事件ID到来源片段ID列表的映射
             
         Returns:
-            精修后的事件列表
+            精修后的事件列表，顺序与输入一致
         """
+        return list(self.iter_in_order(self.iter_refine(events, context, segments, event_sources)))
+    
+    def iter_refine(
+        self,
+        events: List[EventItem],
+        context: str = "",
+        segments: Optional[List[Dict]] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None
+    ) -> Iterator[Tuple[int, EventItem]]:
+        """
+        流式精修：每个事件精修完成后立即产出，调用方无需等待全部事件
+        
+        产出顺序取决于完成顺序；需要按输入顺序时用 iter_in_order 包装。
+        
+        Args:
+            events: 待精修的事件列表
+            context: 支持精修的上下文信息（通常为整章文本）
+            segments: 章节片段列表，提供时为每个事件检索相关片段作为上下文
+            event_sources: 事件ID到来源片段ID列表的映射
+            
+        Yields:
+            (事件在输入列表中的序号, 精修后的事件)
+        """
+        self.reset_stats()
+        try:
+            yield from self._iter_refine(events, context, segments, event_sources)
+        finally:
+            self.report_stats()
+            if self.cache is not None:
+                self.cache.save()
+    
+    @staticmethod
+    def iter_in_order(indexed_events: Iterable[Tuple[int, EventItem]]) -> Iterator[EventItem]:
+        """
+        重排缓冲：按输入序号依次产出事件，先完成的靠后事件暂存到前面的事件完成为止
+        
+        Args:
+            indexed_events: iter_refine 产出的 (序号, 事件)
+            
+        Yields:
+            按输入顺序排列的事件
+        """
+        buffer: Dict[int, EventItem] = {}
+        next_index = 0
+        for index, event in indexed_events:
+            buffer[index] = event
+            while next_index in buffer:
+                yield buffer.pop(next_index)
+                next_index += 1
+        # 序号不连续时按序号产出剩余事件
+        for index in sorted(buffer):
+            yield buffer[index]
+    
+    def _iter_refine(
+        self,
+        events: List[EventItem],
+        context: str = "",
+        segments: Optional[List[Dict]] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None
+    ) -> Iterator[Tuple[int, EventItem]]:
+        """按配置的模式精修事件列表，参数与产出同 iter_refine"""
+        if self.entity_table_mode:
+            yield from enumerate(self.refine_with_entity_table(events, context, segments))
+            return
+        
+        # 实体核验和风险排序共用同一个核验器，原文只需扫描一次
+        selective = self.max_calls_per_chapter > 0 or self.refine_fraction < 1.0
+        verifier = self.build_verifier(context, segments) if self.verify_entities or selective else None
+        
+        # 实体全部在原文中出现的事件直接产出，只有其余事件进入LLM精修
+        positions = list(range(len(events)))
+        if self.verify_entities:
+            verified, _ = self.verify_events(events, context, segments, verifier)
+            verified_ids = {id(event) for event in verified}
+            positions = []
+            for index, event in enumerate(events):
+                if id(event) in verified_ids:
+                    self._record_event(0, "verified")
+                    yield index, event
+                else:
+                    positions.append(index)
+            if not positions:
+                return
+            events = [events[index] for index in positions]
+        
+        # 按幻觉风险排序，只精修符合每章调用预算的事件，其余事件原样产出
+        if selective:
+            selected, skipped = self.select_for_refinement(events, context, segments, event_sources, verifier)
+            for position in skipped:
+                self._record_event(0, "skipped")
+                yield positions[position], events[position]
+            if not selected:
+                return
+            positions = [positions[position] for position in selected]
+            events = [events[position] for position in selected]
+        
+        contexts = self.build_event_contexts(events, context, segments, event_sources)
         if not context:
             context = "请基于您对《凡人修仙传》的了解，检测以下事件中可能存在的幻觉或错误。"
-            
-        refined_events = []
         
+        # 此前章节的摘要作为前情提要，放在本章相关原文之前
+        digest = self.chapter_digest(events)
+        
+        if self.batch_size > 1 and len(events) > 1:
+            for position, refined_event in self.iter_refine_batches(
+                events, context, contexts, segments, event_sources, digest
+            ):
+                yield positions[position], refined_event
+            return
+        
+        contexts = {event_id: self.with_digest(text, digest) for event_id, text in contexts.items()}
+        context = self.with_digest(context, digest)
+            
         # 使用线程池并行处理每个事件
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             # 优化后的实现 - 使用as_completed等待完成的任务
             # 同时提交所有事件处理任务
-            future_to_event = {executor.submit(self.refine_event, event, context): event for event in events}
+            future_to_position = {
+                executor.submit(self.refine_event, event, contexts.get(event.event_id) or context): position
+                for position, event in enumerate(events)
+            }
             
             print(f"使用 {self.max_workers} 个工作线程并行处理 {len(events)} 个事件")
             
@@ -97,27 +312,435 @@ class HallucinationRefiner(BaseRefiner):
             completed = 0
             total = len(events)
             
-            # 实时收集已完成的任务结果
+            # 实时产出已完成的任务结果
             from concurrent.futures import as_completed
-            for future in as_completed(future_to_event):
-                original_event = future_to_event[future]
+            for future in as_completed(future_to_position):
+                position = future_to_position[future]
                 completed += 1
                 
                 try:
                     refined_event = future.result()
-                    refined_events.append(refined_event)
                     
                     # 打印进度
                     if completed % max(1, total // 10) == 0 or completed == total:
                         print(f"幻觉修复进度: {completed}/{total} ({(completed/total)*100:.1f}%)")
                         
                 except Exception as e:
-                    print(f"处理事件 {original_event.event_id} 时出错: {str(e)}")
+                    print(f"处理事件 {events[position].event_id} 时出错: {str(e)}")
+                    # 如果处理失败，保留原始事件
+                    refined_event = events[position]
+                    
+                yield positions[position], refined_event
+    
+    def iter_refine_batches(
+        self,
+        events: List[EventItem],
+        context: str,
+        contexts: Dict[str, str],
+        segments: Optional[List[Dict]] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None,
+        digest: str = ""
+    ) -> Iterator[Tuple[int, EventItem]]:
+        """
+        将同一章节的事件分批，每批共用一份上下文发送一次请求，每批完成后立即产出
+        
+        Args:
+            events: 待精修的事件列表
+            context: 完整上下文
+            contexts: 事件ID到检索上下文的映射，用于逐个事件回退
+            segments: 章节片段列表
+            event_sources: 事件ID到来源片段ID列表的映射
+            digest: 前情提要，放在每份上下文之前
+            
+        Yields:
+            (事件在 events 中的序号, 精修后的事件)
+        """
+        batch_positions = self.batch_positions(events)
+        batches = [[events[position] for position in positions] for positions in batch_positions]
+        batch_contexts = self.build_batch_contexts(batches, context, segments, event_sources)
+        contexts = {event_id: self.with_digest(text, digest) for event_id, text in contexts.items()}
+        context = self.with_digest(context, digest)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_positions = {
+                executor.submit(
+                    self.refine_batch, batch, self.with_digest(batch_context, digest) if batch_context else context,
+                    contexts, context
+                ): positions
+                for batch, batch_context, positions in zip(batches, batch_contexts, batch_positions)
+            }
+            
+            print(f"使用 {self.max_workers} 个工作线程批量处理 {len(events)} 个事件（共 {len(batches)} 批）")
+            
+            completed = 0
+            total = len(events)
+            
+            from concurrent.futures import as_completed
+            for future in as_completed(future_to_positions):
+                positions = future_to_positions[future]
+                completed += len(positions)
+                
+                try:
+                    refined_batch = future.result()
+                    print(f"幻觉修复进度: {completed}/{total} ({(completed/total)*100:.1f}%)")
+                except Exception as e:
+                    print(f"处理批次 {events[positions[0]].event_id}~{events[positions[-1]].event_id} 时出错: {str(e)}")
                     # 如果处理失败，保留原始事件
-                    refined_events.append(original_event)
+                    refined_batch = [events[position] for position in positions]
                     
+                yield from zip(positions, refined_batch)
+    
+    def batch_positions(self, events: List[EventItem]) -> List[List[int]]:
+        """
+        按章节分组后切分批次，同一批次只包含同一章节的事件
+        
+        Args:
+            events: 事件列表
+            
+        Returns:
+            每个批次中事件在 events 中的序号，保持事件的原始顺序
+        """
+        by_chapter: Dict[str, List[int]] = {}
+        for position, event in enumerate(events):
+            by_chapter.setdefault(event.chapter_id or "", []).append(position)
+        
+        return [
+            chapter_positions[i:i + self.batch_size]
+            for chapter_positions in by_chapter.values()
+            for i in range(0, len(chapter_positions), self.batch_size)
+        ]
+    
+    def build_batch_contexts(
+        self,
+        batches: List[List[EventItem]],
+        context: str = "",
+        segments: Optional[List[Dict]] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None
+    ) -> List[str]:
+        """
+        为每个批次检索共享的原文片段作为上下文
+        
+        Args:
+            batches: 批次列表
+            context: 完整上下文
+            segments: 章节片段列表
+            event_sources: 事件ID到来源片段ID列表的映射
+            
+        Returns:
+            与批次一一对应的上下文；未启用检索或上下文未超出预算时为空字符串
+        """
+        retriever = self._build_retriever(context, segments, self.batch_context_token_budget)
+        if retriever is None:
+            return ["" for _ in batches]
+        
+        batch_contexts = [retriever.retrieve_batch(batch, event_sources) for batch in batches]
+        if batch_contexts:
+            avg_tokens = sum(ContextRetriever.estimate_tokens(c) for c in batch_contexts) / len(batch_contexts)
+            print(f"检索上下文: 平均每批 {avg_tokens:.0f} tokens（共 {len(batch_contexts)} 批）")
+        return batch_contexts
+    
+    def _build_retriever(
+        self,
+        context: str,
+        segments: Optional[List[Dict]],
+        token_budget: int
+    ) -> Optional[ContextRetriever]:
+        """
+        构建上下文检索器
+        
+        Args:
+            context: 完整上下文
+            segments: 章节片段列表，未提供时切分上下文
+            token_budget: 检索上下文的token上限
+            
+        Returns:
+            检索器；未启用检索或上下文未超出预算时返回None
+        """
+        if token_budget <= 0:
+            return None
+        if not segments:
+            if not context or ContextRetriever.estimate_tokens(context) <= token_budget:
+                return None
+            segments = TextSplitter.split_chapter(context, seg_size=max(100, token_budget // 3))
+        
+        return ContextRetriever(
+            segments,
+            token_budget=token_budget,
+            neighbors=self.context_neighbors
+        )
+    
+    def refine_with_entity_table(
+        self,
+        events: List[EventItem],
+        context: str = "",
+        segments: Optional[List[Dict]] = None
+    ) -> List[EventItem]:
+        """
+        每章一次请求生成规范实体表，然后在本地改写全部事件的实体字段
+        
+        Args:
+            events: 待精修的事件列表（同一章节）
+            context: 完整上下文（通常为整章文本）
+            segments: 章节片段列表，未提供上下文时拼接片段文本作为原文
+            
+        Returns:
+            改写后的事件列表，顺序与输入一致
+        """
+        if not events:
+            return []
+        source_text = context or "\n\n".join(seg.get("text", "") for seg in (segments or []))
+        table = self.build_entity_table(events, source_text)
+        self.last_entity_table = table
+        
+        refined_events = [table.apply(event) for event in events]
+        changed = sum(1 for before, after in zip(events, refined_events) if before is not after)
+        print(f"规范实体表: 改写 {changed}/{len(events)} 个事件的实体")
         return refined_events
     
+    def get_entity_table(self) -> Optional[EntityTable]:
+        """
+        获取最近一次精修生成的规范实体表
+        
+        Returns:
+            规范实体表，未启用规范实体表模式时返回None
+        """
+        return self.last_entity_table if self.entity_table_mode else None
+    
+    def build_entity_table(self, events: List[EventItem], context: str) -> EntityTable:
+        """
+        以实体词表为基础，请求LLM整理本章的规范实体表
+        
+        Args:
+            events: 本章事件列表
+            context: 章节原文
+            
+        Returns:
+            规范实体表；请求失败时只包含实体词表中的别名
+        """
+        table = EntityTable.from_lexicon(self.lexicon)
+        entities: Dict[str, List[str]] = {}
+        for field in EntityTable.CATEGORIES:
+            names = []
+            for event in events:
+                value = getattr(event, field, None)
+                for name in (value if isinstance(value, list) else [value]):
+                    if name and name not in names:
+                        names.append(name)
+            entities[field] = names
+        if not any(entities.values()):
+            return table
+        
+        if not context:
+            context = "请基于您对《凡人修仙传》的了解整理实体。"
+        prompt = self.format_entity_table_prompt(entities, context)
+        response = self.llm_client.call_with_json_response(prompt['system'], prompt['instruction'])
+        
+        if not response["success"] or "json_content" not in response:
+            print(f"规范实体表请求失败: {response.get('error', '未知错误')}，仅使用实体词表改写")
+            return table
+        return table.update_from_response(response["json_content"])
+    
+    def chapter_digest(self, events: List[EventItem]) -> str:
+        """
+        生成事件所在章节的前情提要（此前最近K章的摘要）
+        
+        Args:
+            events: 同一章节的事件列表
+            
+        Returns:
+            前情提要，未启用章节摘要或没有可用摘要时返回空字符串
+        """
+        if self.summary_store is None:
+            return ""
+        chapter_id = next((event.chapter_id for event in events if event.chapter_id), None)
+        return self.summary_store.digest(chapter_id) if chapter_id else ""
+    
+    @staticmethod
+    def with_digest(context: str, digest: str) -> str:
+        """
+        在上下文之前加上前情提要
+        
+        Args:
+            context: 本章上下文
+            digest: 前情提要
+            
+        Returns:
+            拼接后的上下文
+        """
+        if not digest:
+            return context
+        return f"{digest}\n\n本章相关原文：\n{context}" if context else digest
+    
+    def update_chapter_summary(
+        self,
+        chapter_id: str,
+        title: str,
+        content: str,
+        events: Optional[List[EventItem]] = None
+    ) -> str:
+        """
+        生成并保存章节摘要；相同内容的章节只生成一次
+        
+        Args:
+            chapter_id: 章节ID
+            title: 章节标题
+            content: 章节原文
+            events: 本章精修后的事件，请求失败时用事件描述拼接摘要
+            
+        Returns:
+            章节摘要，未启用章节摘要时返回空字符串
+        """
+        if self.summary_store is None or not chapter_id:
+            return ""
+        content_hash = TextSplitter.segment_hash(content or "")
+        summary = self.summary_store.get(chapter_id, content_hash)
+        if summary:
+            return summary
+        
+        prompt = self.format_summary_prompt(title, content, self.summary_max_chars)
+        response = self.llm_client.call_with_json_response(prompt['system'], prompt['instruction'])
+        summary = ""
+        if response["success"] and isinstance(response.get("json_content"), dict):
+            summary = str(response["json_content"].get("summary") or "").strip()
+        if not summary:
+            print(f"章节 {chapter_id} 摘要生成失败: {response.get('error', '响应中没有摘要')}，使用事件描述代替")
+            summary = "；".join(event.description for event in (events or []) if event.description)
+        summary = summary[:self.summary_max_chars]
+        
+        if summary:
+            self.summary_store.put(chapter_id, summary, title, content_hash)
+            print(f"章节 {chapter_id} 摘要已保存（{len(summary)} 字）")
+        return summary
+    
+    def build_verifier(self, context: str = "", segments: Optional[List[Dict]] = None) -> Optional[EntityVerifier]:
+        """
+        用章节原文构建实体核验器
+        
+        Args:
+            context: 完整上下文（通常为整章文本）
+            segments: 章节片段列表，未提供上下文时拼接片段文本作为原文
+            
+        Returns:
+            核验器；没有原文时返回None
+        """
+        source_text = context or "\n\n".join(seg.get("text", "") for seg in (segments or []))
+        if not source_text:
+            return None
+        return EntityVerifier(source_text, self.lexicon)
+    
+    def verify_events(
+        self,
+        events: List[EventItem],
+        context: str = "",
+        segments: Optional[List[Dict]] = None,
+        verifier: Optional[EntityVerifier] = None
+    ) -> Tuple[List[EventItem], List[EventItem]]:
+        """
+        在原文中核验事件的人物、宝物和地点，筛选出需要LLM精修的事件
+        
+        Args:
+            events: 事件列表（同一章节）
+            context: 完整上下文
+            segments: 章节片段列表
+            verifier: 已构建的核验器，为None时用上下文构建
+            
+        Returns:
+            (实体全部核实、无需精修的事件, 需要精修的事件)；没有原文时全部需要精修
+        """
+        if verifier is None:
+            verifier = self.build_verifier(context, segments)
+        if verifier is None:
+            return [], list(events)
+        
+        verified, suspicious = verifier.partition(events)
+        print(f"实体核验: {len(verified)}/{len(events)} 个事件的实体均在原文中出现，跳过LLM精修")
+        return verified, suspicious
+    
+    def select_for_refinement(
+        self,
+        events: List[EventItem],
+        context: str = "",
+        segments: Optional[List[Dict]] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None,
+        verifier: Optional[EntityVerifier] = None
+    ) -> Tuple[List[int], List[int]]:
+        """
+        按幻觉风险选出每章需要精修的事件
+        
+        每章可精修的事件数取 refine_fraction 比例与调用预算两者的较小值；调用预算按首轮请求估算，
+        逐个事件精修时每个事件一次请求，批量精修时每批一次请求。
+        
+        Args:
+            events: 事件列表
+            context: 完整上下文，用于核验实体
+            segments: 章节片段列表
+            event_sources: 事件ID到来源片段ID列表的映射
+            verifier: 已构建的核验器（与实体核验共用），为None时用上下文构建
+            
+        Returns:
+            (需要精修的事件序号, 跳过的事件序号)，均按原始顺序排列
+        """
+        if verifier is None:
+            verifier = self.build_verifier(context, segments)
+        scorer = RiskScorer(verifier, event_sources, self.risk_description_chars)
+        by_chapter: Dict[str, List[int]] = {}
+        for position, event in enumerate(events):
+            by_chapter.setdefault(event.chapter_id or "", []).append(position)
+        
+        selected = []
+        for chapter_positions in by_chapter.values():
+            limit = math.ceil(len(chapter_positions) * max(0.0, min(1.0, self.refine_fraction)))
+            if self.max_calls_per_chapter > 0:
+                limit = min(limit, self.max_calls_per_chapter * self.batch_size)
+            ranked = scorer.rank([events[position] for position in chapter_positions])
+            selected.extend(chapter_positions[rank] for rank in ranked[:limit])
+        
+        selected.sort()
+        chosen = set(selected)
+        skipped = [position for position in range(len(events)) if position not in chosen]
+        if skipped:
+            print(f"风险排序: 精修 {len(selected)}/{len(events)} 个风险较高的事件，跳过 {len(skipped)} 个")
+        return selected, skipped
+    
+    def build_event_contexts(
+        self,
+        events: List[EventItem],
+        context: str = "",
+        segments: Optional[List[Dict]] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None
+    ) -> Dict[str, str]:
+        """
+        为每个事件检索相关的原文片段作为上下文
+        
+        优先使用事件的来源片段及其相邻片段，再用BM25检索补充，总长度受token预算限制。
+        未提供片段但上下文超出预算时，先将上下文切分为片段再检索。
+        
+        Args:
+            events: 事件列表
+            context: 完整上下文
+            segments: 章节片段列表
+            event_sources: 事件ID到来源片段ID列表的映射
+            
+        Returns:
+            事件ID到检索上下文的映射；未启用检索或上下文未超出预算时为空
+        """
+        retriever = self._build_retriever(context, segments, self.context_token_budget)
+        if retriever is None:
+            return {}
+        event_sources = event_sources or {}
+        contexts = {
+            event.event_id: retriever.retrieve(event, event_sources.get(event.event_id))
+            for event in events
+        }
+        
+        if contexts:
+            full_tokens = ContextRetriever.estimate_tokens(context) if context else sum(
+                ContextRetriever.estimate_tokens(text) for text in retriever.texts
+            )
+            avg_tokens = sum(ContextRetriever.estimate_tokens(c) for c in contexts.values()) / len(contexts)
+            print(f"检索上下文: 平均每个事件 {avg_tokens:.0f} tokens（完整上下文 {full_tokens} tokens）")
+        return contexts
+    
     def refine_event(self, event: EventItem, context: str) -> EventItem:
         """
         对单个事件进行幻觉检测和修复
@@ -129,8 +752,15 @@ class HallucinationRefiner(BaseRefiner):
         Returns:
             精修后的事件
         """
+        cached = self.get_cached_result(event, context)
+        if cached is not None:
+            self._record_event(0, "cached")
+            return cached
+        
         current_event = event
         iterations = 0
+        reason = "max_iterations"
+        unreviewed = False
         
         while iterations < self.max_iterations:
             print(f"对事件 {event.event_id} 进行第 {iterations+1} 次精修...")
@@ -138,39 +768,429 @@ class HallucinationRefiner(BaseRefiner):
             # 格式化提示
             prompt = self.format_prompt(current_event, context)
             
-            # 调用LLM
-            response = self.llm_client.call_with_json_response(prompt['system'], prompt['instruction'])
+            # 调用LLM（配置了升级模型时，检测到幻觉或置信度不足的判断由强模型复核）
+            response = self.cascade.call_with_json_response(
+                prompt['system'], prompt['instruction'], self.needs_escalation
+            )
+            self._record_call(2 if response.get("escalated") else 1)
             
             if not response["success"] or "json_content" not in response:
                 print(f"事件 {event.event_id} 的精修请求失败: {response.get('error', '未知错误')}")
+                reason = "failed"
                 break
                 
-            # 解析响应
-            refined_event = self.parse_response(response["json_content"], current_event)
-            
-            # 检查是否还有幻觉
-            has_hallucination = response["json_content"].get("has_hallucination", False)
-            
-            if not has_hallucination:
-                # 如果没有检测到幻觉，返回当前版本
-                print(f"事件 {event.event_id} 精修完成，无幻觉")
-                return refined_event
-                
-            # 更新事件，进行下一次迭代
-            current_event = refined_event
+            # 解析响应；复核失败时保留的是首轮判断
+            verdict = response["json_content"]
+            unreviewed = bool(response.get("escalation_failed"))
+            refined_event = self.parse_response(verdict, current_event)
             iterations += 1
             
             # 打印修正信息
-            if "issues" in response["json_content"]:
-                for issue in response["json_content"]["issues"]:
-                    print(f"- 修正: {issue.get('field')} 从 '{issue.get('original')}' 到 '{issue.get('corrected')}'")
+            if verdict.get("has_hallucination", False):
+                for issue in verdict.get("issues") or []:
+                    if isinstance(issue, dict):
+                        print(f"- 修正: {issue.get('field')} 从 '{issue.get('original')}' 到 '{issue.get('corrected')}'")
+            
+            # 无幻觉、修正已收敛或置信度足够时，下一轮不会再改变结果
+            stop = self.stop_reason(current_event, refined_event, verdict)
+            current_event = refined_event
+            if stop is not None:
+                reason = stop
+                self._print_stop(event.event_id, stop, verdict)
+                break
         
         # 如果达到最大迭代次数，返回最终版本
-        if iterations == self.max_iterations:
+        if reason == "max_iterations":
             print(f"事件 {event.event_id} 达到最大迭代次数 {self.max_iterations}，返回当前版本")
+        self._record_event(iterations, reason)
+        # 未经复核的首轮结果不写入缓存，避免被当作复核后的结果复用
+        if reason != "failed" and not unreviewed:
+            self.store_result(event, context, current_event)
             
         return current_event
     
+    def refine_batch(
+        self,
+        events: List[EventItem],
+        context: str,
+        fallback_contexts: Optional[Dict[str, str]] = None,
+        fallback_context: str = ""
+    ) -> List[EventItem]:
+        """
+        在一次请求中对同一批事件进行幻觉检测和修复
+        
+        每轮只对上一轮仍检测到幻觉的事件再次请求；响应中缺少判断的事件
+        回退为逐个事件请求。批次内事件ID重复时整批回退为逐个事件请求。
+        
+        Args:
+            events: 待精修的事件列表（同一章节）
+            context: 批次共享的上下文信息
+            fallback_contexts: 事件ID到检索上下文的映射，用于逐个事件回退
+            fallback_context: 回退时没有检索上下文的事件使用的上下文
+        
+        Returns:
+            精修后的事件列表，顺序与输入一致
+        """
+        fallback_contexts = fallback_contexts or {}
+        if len({event.event_id for event in events}) < len(events):
+            # 批量响应按事件ID对应判断，批次内ID重复时无法区分，逐个事件精修
+            print("批次中存在重复的事件ID，回退为逐个事件精修")
+            refined = []
+            for event in events:
+                try:
+                    refined.append(self.refine_event(
+                        event, fallback_contexts.get(event.event_id) or fallback_context or context
+                    ))
+                except Exception as e:
+                    print(f"处理事件 {event.event_id} 时出错: {str(e)}")
+                    refined.append(event)
+            return refined
+        
+        current = {event.event_id: event for event in events}
+        pending = []
+        for event in events:
+            cached = self.get_cached_result(event, context)
+            if cached is None:
+                pending.append(event)
+            else:
+                current[event.event_id] = cached
+                self._record_event(0, "cached")
+        
+        if len(pending) == 1:
+            # 单个事件无需批量提示
+            event = pending[0]
+            current[event.event_id] = self.refine_event(event, fallback_contexts.get(event.event_id) or context)
+            pending = []
+        
+        originals = {event.event_id: event for event in events}
+        # 需要复核但复核失败的事件，其结果不写入缓存
+        unreviewed: Set[str] = set()
+        missing: List[EventItem] = []
+        iterations = 0
+        
+        while pending and iterations < self.max_iterations:
+            print(f"对 {len(pending)} 个事件进行第 {iterations+1} 次批量精修...")
+        
+            prompt = self.format_batch_prompt(pending, context)
+            response = self.cascade.call_with_json_response(prompt['system'], prompt['instruction'])
+            self._record_call()
+        
+            if not response["success"] or "json_content" not in response:
+                print(f"批量精修请求失败: {response.get('error', '未知错误')}，回退为逐个事件精修")
+                missing.extend(pending)
+                pending = []
+                break
+        
+            verdicts = self.parse_batch_response(response["json_content"], pending)
+            reviewed = self.escalate_batch(pending, verdicts, context)
+            for event_id, verdict in verdicts.items():
+                if self.cascade.enabled and event_id not in reviewed and self.needs_escalation(verdict):
+                    unreviewed.add(event_id)
+                else:
+                    unreviewed.discard(event_id)
+            verdicts.update(reviewed)
+            still_pending = []
+            for event in pending:
+                verdict = verdicts.get(event.event_id)
+                if verdict is None:
+                    missing.append(event)
+                    continue
+                refined_event = self.parse_response(verdict, event)
+                current[event.event_id] = refined_event
+                if verdict.get("has_hallucination", False):
+                    for issue in verdict.get("issues") or []:
+                        if isinstance(issue, dict):
+                            print(f"- 修正 {event.event_id}: {issue.get('field')} 从 '{issue.get('original')}' 到 '{issue.get('corrected')}'")
+                stop = self.stop_reason(event, refined_event, verdict)
+                if stop is None:
+                    still_pending.append(refined_event)
+                else:
+                    self._record_event(iterations + 1, stop)
+                    if event.event_id not in unreviewed:
+                        self.store_result(originals[event.event_id], context, refined_event)
+        
+            pending = still_pending
+            iterations += 1
+        
+        if pending:
+            print(f"{len(pending)} 个事件达到最大迭代次数 {self.max_iterations}，返回当前版本")
+            for event in pending:
+                self._record_event(iterations, "max_iterations")
+                if event.event_id not in unreviewed:
+                    self.store_result(originals[event.event_id], context, event)
+        
+        # 缺少判断的事件逐个请求
+        if missing:
+            print(f"批量精修缺少 {len(missing)} 个事件的判断，回退为逐个事件精修")
+        for event in missing:
+            try:
+                current[event.event_id] = self.refine_event(
+                    event, fallback_contexts.get(event.event_id) or fallback_context or context
+                )
+            except Exception as e:
+                print(f"处理事件 {event.event_id} 时出错: {str(e)}")
+        
+        return [current[event.event_id] for event in events]
+    
+    @staticmethod
+    def normalize_value(value: Any) -> Any:
+        """
+        规范化字段值：去除空白和标点，列表按元素规范化后排序
+        
+        Args:
+            value: 字段值
+            
+        Returns:
+            可直接比较的规范化值
+        """
+        if isinstance(value, list):
+            return tuple(sorted(HallucinationRefiner.normalize_value(item) for item in value if item))
+        if value is None:
+            return ""
+        return "".join(
+            ch for ch in str(value)
+            if not (ch.isspace() or unicodedata.category(ch).startswith("P"))
+        )
+    
+    @classmethod
+    def has_significant_change(cls, before: EventItem, after: EventItem) -> bool:
+        """
+        判断修正前后的事件是否有实质变化（忽略空白、标点和列表顺序的差异）
+        
+        Args:
+            before: 修正前的事件
+            after: 修正后的事件
+            
+        Returns:
+            任一比较字段有实质变化时返回True
+        """
+        return any(
+            cls.normalize_value(getattr(before, field, None)) != cls.normalize_value(getattr(after, field, None))
+            for field in cls.COMPARED_FIELDS
+        )
+    
+    @staticmethod
+    def parse_confidence(response: Dict[str, Any]) -> Optional[float]:
+        """
+        读取响应中的置信度
+        
+        Args:
+            response: 单个事件的LLM响应
+            
+        Returns:
+            0到1之间的置信度，缺失或无法解析时返回None
+        """
+        try:
+            confidence = float(response.get("confidence"))
+        except (TypeError, ValueError):
+            return None
+        return min(1.0, max(0.0, confidence))
+    
+    def stop_reason(self, before: EventItem, after: EventItem, response: Dict[str, Any]) -> Optional[str]:
+        """
+        判断一轮精修后是否可以停止迭代
+        
+        Args:
+            before: 本轮精修前的事件
+            after: 本轮精修后的事件
+            response: 单个事件的LLM响应
+            
+        Returns:
+            停止原因（"clean"、"converged"、"confident"），需要继续迭代时返回None
+        """
+        if not response.get("has_hallucination", False):
+            return "clean"
+        if not self.has_significant_change(before, after):
+            return "converged"
+        confidence = self.parse_confidence(response)
+        if confidence is not None and confidence >= self.confidence_threshold:
+            return "confident"
+        return None
+    
+    def needs_escalation(self, response: Dict[str, Any]) -> bool:
+        """
+        判断首轮判断是否需要强模型复核：检测到幻觉，或置信度缺失、低于阈值
+        
+        Args:
+            response: 单个事件的LLM响应
+            
+        Returns:
+            需要升级时返回True
+        """
+        if response.get("has_hallucination", False):
+            return True
+        confidence = self.parse_confidence(response)
+        return confidence is None or confidence < self.confidence_threshold
+    
+    def escalate_batch(
+        self,
+        events: List[EventItem],
+        verdicts: Dict[str, Dict[str, Any]],
+        context: str
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        将批量精修中需要复核的事件合并为一次强模型请求
+        
+        Args:
+            events: 本轮请求的事件
+            verdicts: 首轮模型的判断，事件ID到判断的映射
+            context: 批次共享的上下文信息
+            
+        Returns:
+            强模型的判断；未配置升级模型、没有需要复核的事件或请求失败时为空
+        """
+        if not self.cascade.enabled:
+            return {}
+        uncertain = [
+            event for event in events
+            if event.event_id in verdicts and self.needs_escalation(verdicts[event.event_id])
+        ]
+        if not uncertain:
+            return {}
+        
+        print(f"{len(uncertain)} 个事件的判断交由 {self.escalation_model} 复核")
+        prompt = self.format_batch_prompt(uncertain, context)
+        response = self.cascade.escalate(prompt['system'], prompt['instruction'])
+        self._record_call()
+        if not response["success"] or "json_content" not in response:
+            print(f"复核请求失败: {response.get('error', '未知错误')}，保留首轮判断")
+            return {}
+        return self.parse_batch_response(response["json_content"], uncertain)
+    
+    def _print_stop(self, event_id: str, reason: str, response: Dict[str, Any]) -> None:
+        """打印事件停止迭代的原因"""
+        if reason == "clean":
+            print(f"事件 {event_id} 精修完成，无幻觉")
+        elif reason == "converged":
+            print(f"事件 {event_id} 的修正没有实质变化，提前结束迭代")
+        elif reason == "confident":
+            print(f"事件 {event_id} 的修正置信度 {self.parse_confidence(response):.2f} 达到阈值，提前结束迭代")
+    
+    def cache_key(self, event: EventItem, context: str) -> str:
+        """
+        计算精修结果的缓存键：事件内容（不含事件ID）、实际发送的上下文、模型和提示词的哈希
+        
+        Args:
+            event: 待精修的事件
+            context: 发送给LLM的上下文
+            
+        Returns:
+            缓存键
+        """
+        fields = {field: getattr(event, field, None) for field in self.COMPARED_FIELDS}
+        model = f"{self.model}>{self.escalation_model}" if self.escalation_model else self.model
+        return ResultCache.make_key(
+            fields, ResultCache.make_key(context), model, self._prompt_hash, self.max_iterations
+        )
+    
+    def get_cached_result(self, event: EventItem, context: str) -> Optional[EventItem]:
+        """
+        查询事件的缓存精修结果
+        
+        Args:
+            event: 待精修的事件
+            context: 发送给LLM的上下文
+            
+        Returns:
+            沿用当前事件ID和章节ID的精修结果，未命中或未启用缓存时返回None
+        """
+        if self.cache is None:
+            return None
+        data = self.cache.get(self.cache_key(event, context))
+        if not isinstance(data, dict):
+            return None
+        refined_data = dict(data)
+        refined_data["event_id"] = event.event_id
+        refined_data["chapter_id"] = event.chapter_id
+        return EventItem.from_dict(refined_data)
+    
+    def store_result(self, event: EventItem, context: str, refined_event: EventItem) -> None:
+        """
+        缓存事件的精修结果（不保存事件ID和章节ID）
+        
+        Args:
+            event: 精修前的事件
+            context: 发送给LLM的上下文
+            refined_event: 精修后的事件
+        """
+        if self.cache is None:
+            return
+        data = refined_event.to_dict()
+        data.pop("event_id", None)
+        data.pop("chapter_id", None)
+        self.cache.put(self.cache_key(event, context), data)
+    
+    def reset_stats(self) -> None:
+        """重置迭代统计"""
+        if self.cache is not None:
+            self.cache.reset_stats()
+        self.cascade.reset_stats()
+        with self._stats_lock:
+            self.last_stats = {
+                "events": 0,
+                "llm_calls": 0,
+                "iterations": {},
+                "stop_reasons": {reason: 0 for reason in self.STOP_REASONS}
+            }
+    
+    def _record_call(self, count: int = 1) -> None:
+        """记录LLM调用次数"""
+        with self._stats_lock:
+            self.last_stats["llm_calls"] += count
+    
+    def _record_event(self, iterations: int, reason: str) -> None:
+        """记录一个事件使用的迭代轮数和停止原因"""
+        with self._stats_lock:
+            self.last_stats["events"] += 1
+            self.last_stats["iterations"][iterations] = self.last_stats["iterations"].get(iterations, 0) + 1
+            self.last_stats["stop_reasons"][reason] = self.last_stats["stop_reasons"].get(reason, 0) + 1
+    
+    def report_stats(self) -> None:
+        """打印本次精修的迭代统计"""
+        stats = self.last_stats
+        if not stats["events"]:
+            return
+        rounds = ", ".join(f"{k}轮: {v}" for k, v in sorted(stats["iterations"].items()))
+        reasons = ", ".join(f"{k}: {v}" for k, v in stats["stop_reasons"].items() if v)
+        print(f"幻觉修复统计: {stats['events']} 个事件，{stats['llm_calls']} 次LLM调用；迭代轮数 {rounds}；停止原因 {reasons}")
+        if self.cache is not None:
+            cache_stats = stats["cache"] = self.cache.stats()
+            print(
+                f"幻觉修复缓存: 命中 {cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']} "
+                f"({cache_stats['hit_rate']:.1%})，淘汰 {cache_stats['evictions']} 条，共 {cache_stats['size']} 条"
+            )
+        if self.cascade.enabled:
+            cascade_stats = stats["cascade"] = self.cascade.stats()
+            print(
+                f"模型级联: 首轮 {self.model} 调用 {cascade_stats['primary_calls']} 次，"
+                f"升级到 {self.escalation_model} {cascade_stats['escalations']} 次"
+            )
+    
+    def parse_batch_response(self, response: Dict[str, Any], events: List[EventItem]) -> Dict[str, Dict[str, Any]]:
+        """
+        解析批量精修的LLM响应，按事件ID提取每个事件的判断
+        
+        Args:
+            response: LLM响应，形如 {"results": [{"event_id": ..., "has_hallucination": ..., ...}]}
+            events: 本批次请求的事件
+        
+        Returns:
+            事件ID到单事件响应的映射；不属于本批次或缺少 has_hallucination 的项被忽略
+        """
+        results = response.get("results") if isinstance(response, dict) else None
+        if not isinstance(results, list):
+            return {}
+        
+        event_ids = {event.event_id for event in events}
+        verdicts = {}
+        for item in results:
+            if not isinstance(item, dict) or "has_hallucination" not in item:
+                continue
+            event_id = item.get("event_id")
+            if event_id in event_ids and event_id not in verdicts:
+                verdicts[event_id] = item
+        return verdicts
+    
     def parse_response(self, response: Dict[str, Any], original_event: EventItem) -> EventItem:
         """
         解析LLM响应，更新事件
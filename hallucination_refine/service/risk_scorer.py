@@ -0,0 +1,101 @@
+"""
+事件幻觉风险评分
+
+在调用LLM精修之前，按本地可判断的信号给每个事件打出幻觉风险分：
+1. 人物、宝物、地点未在原文中出现（每个未核实实体计一次）
+2. 描述明显长于原文摘录通常需要的长度，多为模型补写的内容
+3. 结果、地点、时间字段中缺省填充值（"未指定"、"未知" 等）所占的比例
+4. 事件来自回退路径：没有记录来源片段（整章回退、低优先级段落合并请求），
+   或来源跨越多个片段（批处理请求中按批次映射的事件）
+
+按风险从高到低排序后，只有排在前面、符合每章调用预算的事件进入HAR。
+"""
+
+from typing import Dict, List, Optional
+
+from common.models.event import EventItem
+from hallucination_refine.service.entity_verifier import EntityVerifier
+
+
+class RiskScorer:
+    """按实体核验、描述长度、缺省字段和来源给事件打幻觉风险分"""
+
+    # 各项风险信号的权重
+    WEIGHTS = {"unattested": 3.0, "long_description": 1.0, "default_fields": 1.5, "fallback": 2.0}
+    # 检查缺省填充值的字段
+    DEFAULT_FIELDS = ("result", "location", "time")
+
+    def __init__(
+        self,
+        verifier: Optional[EntityVerifier] = None,
+        event_sources: Optional[Dict[str, List[str]]] = None,
+        description_chars: int = 80
+    ):
+        """
+        初始化评分器
+
+        Args:
+            verifier: 实体核验器，为None时不计未核实实体
+            event_sources: 事件ID到来源片段ID列表的映射，为None时不计回退来源
+            description_chars: 描述超过该字数的部分按比例计分
+        """
+        self.verifier = verifier
+        self.event_sources = event_sources
+        self.description_chars = description_chars
+
+    def factors(self, event: EventItem) -> Dict[str, float]:
+        """
+        计算事件的各项风险信号（未加权）
+
+        Args:
+            event: 事件
+
+        Returns:
+            信号名到信号值的映射
+        """
+        factors = {name: 0.0 for name in self.WEIGHTS}
+        if self.verifier is not None:
+            factors["unattested"] = float(len(self.verifier.unattested(event)))
+        description = event.description or ""
+        if self.description_chars > 0 and len(description) > self.description_chars:
+            # 超出一倍长度时记满分
+            factors["long_description"] = min(1.0, len(description) / self.description_chars - 1.0)
+        defaults = sum(
+            1 for field in self.DEFAULT_FIELDS
+            if str(getattr(event, field, "") or "").strip() in EntityVerifier.PLACEHOLDERS
+        )
+        factors["default_fields"] = defaults / len(self.DEFAULT_FIELDS)
+        if self.event_sources is not None:
+            sources = self.event_sources.get(event.event_id)
+            if not sources:
+                factors["fallback"] = 1.0
+            elif len(sources) > 1:
+                factors["fallback"] = 0.5
+        return factors
+
+    def score(self, event: EventItem) -> float:
+        """
+        计算事件的幻觉风险分
+
+        Args:
+            event: 事件
+
+        Returns:
+            各项信号的加权和，越高越可能存在幻觉
+        """
+        return sum(self.WEIGHTS[name] * value for name, value in self.factors(event).items())
+
+    def rank(self, events: List[EventItem]) -> List[int]:
+        """
+        按风险从高到低排列事件
+
+        Args:
+            events: 事件列表
+
+        Returns:
+            事件在 events 中的序号，风险相同时保持原始顺序
+        """
+        if self.verifier is not None:
+            self.verifier.prepare(events)
+        scores = [self.score(event) for event in events]
+        return sorted(range(len(events)), key=lambda position: -scores[position])
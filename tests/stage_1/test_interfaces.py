@@ -254,6 +254,10 @@ class TestExtractorInterface(unittest.TestCase):
         self.assertTrue(all(isinstance(event, EventItem) for event in events))
         # 验证事件内容与小说有关
         self.assertIn("韩立", events[0].description)
+    
+    def test_default_event_sources(self):
+        """测试未记录来源片段的提取器返回空映射"""
+        self.assertEqual(MockExtractor().get_event_sources(), {})
 
 
 class TestRefinerInterface(unittest.TestCase):
@@ -315,6 +319,12 @@ class TestRefinerInterface(unittest.TestCase):
         # 验证事件内容仍然保留
         self.assertEqual(len(refined_events), 2)
         self.assertIn("韩立", refined_events[0].description)
+    
+    def test_default_entity_table_and_summary(self):
+        """测试未使用实体表和章节摘要的优化器返回默认值"""
+        refiner = MockRefiner()
+        self.assertIsNone(refiner.get_entity_table())
+        self.assertEqual(refiner.update_chapter_summary("第一章", self.chapter_title, self.chapter_text), "")
 
 
 class TestLinkerInterface(unittest.TestCase):
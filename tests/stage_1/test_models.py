@@ -52,7 +52,7 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.append(project_root)
 
 from common.models.event import EventItem
-from common.models.chapter import Chapter
+from common.models.chapter import Chapter, Segment
 from common.models.causal_edge import CausalEdge
 from common.models.treasure import Treasure
 from common.utils.json_loader import JsonLoader
@@ -191,6 +191,34 @@ class TestChapterModel(unittest.TestCase):
         self.assertEqual(chapter_dict["chapter_id"], "第一章")
         self.assertEqual(chapter_dict["title"], self.chapter_title)
         self.assertEqual(chapter_dict["content"], self.chapter_text)
+    
+    def test_compact_segments_offsets(self):
+        """测试偏移分段：文本按需生成，序列化时只保存偏移"""
+        segments = TextSplitter.split_chapter(self.chapter_text, seg_size=200, overlap_size=50)
+        texts = [seg["text"] for seg in segments]
+        chapter = Chapter(
+            chapter_id="第一章",
+            title=self.chapter_title,
+            content=self.chapter_text,
+            segments=segments
+        )
+        chapter.compact_segments()
+        
+        self.assertTrue(all(isinstance(seg, Segment) for seg in chapter.segments))
+        self.assertEqual([seg["text"] for seg in chapter.segments], texts)
+        self.assertEqual([seg.get("text") for seg in chapter.segments], texts)
+        self.assertTrue("text" in chapter.segments[0])
+        
+        # 磁盘格式只包含偏移，读回后文本可还原
+        chapter_dict = json.loads(json.dumps(chapter.to_dict(), ensure_ascii=False))
+        self.assertNotIn("text", chapter_dict["segments"][0])
+        self.assertIn("start", chapter_dict["segments"][0])
+        restored = Chapter.from_dict(chapter_dict)
+        self.assertEqual([seg["text"] for seg in restored.segments], texts)
+        
+        # 旧格式（带文本）保持不变
+        legacy = Chapter.from_dict({"chapter_id": "第一章", "content": "正文", "segments": [{"seg_id": "1", "text": "正文"}]})
+        self.assertEqual(legacy.segments, [{"seg_id": "1", "text": "正文"}])
 
 
 class TestCausalEdgeModel(unittest.TestCase):
@@ -33,8 +33,11 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.append(project_root)
 
 # 导入阶段二测试
-from tests.stage_2.test_text_ingestion import TestChapterLoader
-from tests.stage_2.test_event_extraction import TestEventExtractor
+from tests.stage_2.test_text_ingestion import (
+    TestChapterLoader, TestContentDefinedSplitting, TestOverlappingSegmentation, TestStreamingNovelLoader,
+    TestChapterIndex, TestEncodingAndParallelLoading
+)
+from tests.stage_2.test_event_extraction import TestEventExtractor, TestSegmentFilter
 
 
 def run_stage2_tests(verbose=False) -> bool:
@@ -54,11 +57,17 @@ def run_stage2_tests(verbose=False) -> bool:
     print("\n正在准备文本摄入模块测试...")
     text_suite = unittest.TestSuite()
     text_suite.addTest(unittest.makeSuite(TestChapterLoader))
+    text_suite.addTest(unittest.makeSuite(TestContentDefinedSplitting))
+    text_suite.addTest(unittest.makeSuite(TestOverlappingSegmentation))
+    text_suite.addTest(unittest.makeSuite(TestStreamingNovelLoader))
+    text_suite.addTest(unittest.makeSuite(TestChapterIndex))
+    text_suite.addTest(unittest.makeSuite(TestEncodingAndParallelLoading))
     
     # 添加事件抽取测试
     print("正在准备事件抽取模块测试...")
     event_suite = unittest.TestSuite()
     event_suite.addTest(unittest.makeSuite(TestEventExtractor))
+    event_suite.addTest(unittest.makeSuite(TestSegmentFilter))
     
     # 合并测试套件
     suite.addTest(text_suite)
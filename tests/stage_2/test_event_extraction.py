@@ -12,6 +12,7 @@ import sys
 import os
 import unittest
 import json
+import tempfile
 from unittest.mock import patch, MagicMock
 
 # 添加项目根目录到 Python 路径
@@ -22,6 +23,7 @@ if project_root not in sys.path:
 from common.models.chapter import Chapter
 from common.models.event import EventItem
 from event_extraction.service.extractor_service import EventExtractor
+from event_extraction.service.segment_filter import SegmentFilter
 from common.utils.json_loader import JsonLoader
 
 
@@ -224,5 +226,91 @@ class TestEventExtractor(unittest.TestCase):
         self.assertEqual(first_event.chapter_id, self.test_chapter.chapter_id)
 
 
+class TestSegmentFilter(unittest.TestCase):
+    """测试段落预过滤器"""
+    
+    def setUp(self):
+        """准备测试段落"""
+        self.segments = [
+            {"seg_id": "第一章-1", "text": "《凡人修仙传》作者：忘语\n\n第一章 山边小村"},
+            {"seg_id": "第一章-2", "text": "远处的山峦在晨雾中若隐若现，层层叠叠的树林一直延伸到天边，溪水潺潺，鸟鸣声此起彼伏。"},
+            {"seg_id": "第一章-3", "text": "韩立跟着三叔来到七玄门，三叔笑道：“这孩子老实，还请王护法多多照顾。”王护法点头答应了。"},
+        ]
+    
+    def test_partition_flags_boilerplate_and_scenery(self):
+        """测试样板行和纯景物描写被标记为低优先级"""
+        segment_filter = SegmentFilter(mode="skip", known_names=["韩立", "三叔"])
+        keep, low_priority, records = segment_filter.partition(self.segments)
+        
+        self.assertEqual([s["seg_id"] for s in keep], ["第一章-3"])
+        self.assertEqual([s["seg_id"] for s in low_priority], ["第一章-1", "第一章-2"])
+        self.assertEqual([r["seg_id"] for r in records], ["第一章-1", "第一章-2"])
+        
+        report = segment_filter.get_report()
+        self.assertAlmostEqual(report["skip_rate"], 2 / 3)
+        self.assertEqual([r["seg_id"] for r in report["audit"]], ["第一章-1", "第一章-2"])
+        self.assertEqual(report["audit"][0]["reason"], "有效内容过短")
+    
+    def test_audit_log_is_bounded(self):
+        """测试审计日志只保留最近的记录"""
+        segment_filter = SegmentFilter(mode="skip", max_audit_entries=2)
+        segment_filter.partition(self.segments)
+        segment_filter.partition([{"seg_id": "第二章-1", "text": "第二章 七玄门"}])
+        
+        report = segment_filter.get_report()
+        self.assertEqual([r["seg_id"] for r in report["audit"]], ["第一章-2", "第二章-1"])
+        self.assertEqual(report["filtered_segments"], 3)
+    
+    def test_partition_returns_only_its_own_records(self):
+        """测试审计日志裁剪后仍只返回本次调用的审计记录"""
+        segment_filter = SegmentFilter(mode="skip", max_audit_entries=1)
+        _, low_priority, records = segment_filter.partition(self.segments)
+        
+        self.assertEqual(len(low_priority), 2)
+        self.assertEqual([r["seg_id"] for r in records], ["第一章-1", "第一章-2"])
+        
+        _, _, records = segment_filter.partition([self.segments[2]])
+        self.assertEqual(records, [])
+    
+    def test_off_mode_keeps_everything(self):
+        """测试关闭过滤时保留所有段落"""
+        keep, low_priority, records = SegmentFilter(mode="off").partition(self.segments)
+        self.assertEqual(len(keep), 3)
+        self.assertEqual(low_priority, [])
+        self.assertEqual(records, [])
+    
+    def test_load_names_from_lexicon(self):
+        """测试从实体词表加载人物名及别名"""
+        lexicon = {
+            "characters": {"韩立": ["二愣子"], "三叔": []},
+            "treasures": {"掌天瓶": ["小绿瓶"]}
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "entity_lexicon.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(lexicon, f, ensure_ascii=False)
+            names = SegmentFilter.load_names(path)
+            missing = SegmentFilter.load_names(os.path.join(temp_dir, "missing.json"))
+        
+        self.assertEqual(sorted(names), sorted(["韩立", "二愣子", "三叔"]))
+        self.assertEqual(missing, [])
+        self.assertEqual(SegmentFilter(known_names=names).known_names, {"韩立", "二愣子", "三叔"})
+    
+    def test_learned_names_raise_score(self):
+        """测试加入已知人物后得分提高"""
+        segment_filter = SegmentFilter()
+        text = "青衣少年站在崖边，望着山下的云海，许久没有说话，只是默默握紧了手中的木剑。"
+        before, _ = segment_filter.score(text)
+        segment_filter.add_names(["青衣少年"])
+        after, features = segment_filter.score(text)
+        self.assertGreater(after, before)
+        self.assertIn("青衣少年", features["names"])
+    
+    def test_invalid_mode(self):
+        """测试不支持的过滤模式"""
+        with self.assertRaises(ValueError):
+            SegmentFilter(mode="drop")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -11,6 +11,8 @@
 import sys
 import os
 import unittest
+import json
+import codecs
 import tempfile
 import shutil
 
@@ -21,6 +23,7 @@ if project_root not in sys.path:
 
 from text_ingestion.chapter_loader import ChapterLoader
 from common.models.chapter import Chapter
+from common.utils.text_splitter import TextSplitter
 
 
 class TestChapterLoader(unittest.TestCase):
@@ -119,6 +122,293 @@ class TestChapterLoader(unittest.TestCase):
         
         self.assertIsNone(chapter)
 
+    def test_load_with_content_defined_mode(self):
+        """测试使用基于内容的分段模式加载章节"""
+        loader = ChapterLoader(segment_size=800, split_mode="content_defined")
+        chapter = loader.load_from_txt(self.real_test_file)
+        
+        self.assertIsNotNone(chapter)
+        if chapter is not None:
+            self.assertGreater(len(chapter.segments), 0)
+            for segment in chapter.segments:
+                self.assertTrue(segment["seg_id"].startswith("第一章-"))
+                self.assertIn("hash", segment)
+    
+    def test_invalid_split_mode(self):
+        """测试不支持的分段模式"""
+        with self.assertRaises(ValueError):
+            ChapterLoader(split_mode="unknown")
+
+
+class TestContentDefinedSplitting(unittest.TestCase):
+    """测试基于内容的分段"""
+    
+    def setUp(self):
+        """使用真实的小说数据"""
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        project_root = os.path.dirname(os.path.dirname(current_dir))
+        with open(os.path.join(project_root, "novel", "test.txt"), 'r', encoding='utf-8') as f:
+            self.text = f.read()
+    
+    def test_segments_cover_all_paragraphs(self):
+        """测试分段覆盖全部段落且长度不超过上限"""
+        segments = TextSplitter.split_chapter(self.text, 800, mode="content_defined")
+        paragraphs = TextSplitter.split_by_paragraphs(self.text)
+        
+        rejoined = []
+        for segment in segments:
+            rejoined.extend(segment["text"].split('\n\n'))
+            self.assertLessEqual(len(segment["text"].replace('\n\n', '')), 1600)
+        self.assertEqual(rejoined, paragraphs)
+    
+    def test_boundaries_stable_under_local_edit(self):
+        """测试在开头插入段落后，后续片段保持不变"""
+        original = TextSplitter.split_chapter(self.text, 800, mode="content_defined")
+        paragraphs = TextSplitter.split_by_paragraphs(self.text)
+        edited_text = '\n\n'.join(paragraphs[:5] + ["韩立在路边停了一会儿，又继续赶路。"] + paragraphs[5:])
+        edited = TextSplitter.split_chapter(edited_text, 800, mode="content_defined")
+        
+        original_hashes = {seg["hash"] for seg in original}
+        edited_hashes = {seg["hash"] for seg in edited}
+        # 只有插入位置附近的片段会改变
+        self.assertGreaterEqual(len(original_hashes & edited_hashes), len(original) - 2)
+    
+    def test_greedy_mode_unchanged(self):
+        """测试默认模式与原有贪心分段一致"""
+        self.assertEqual(
+            TextSplitter.split_chapter(self.text, 800),
+            TextSplitter.split_chapter(self.text, 800, mode="greedy")
+        )
+        with self.assertRaises(ValueError):
+            TextSplitter.split_chapter(self.text, 800, mode="unknown")
+
+
+class TestOverlappingSegmentation(unittest.TestCase):
+    """测试重叠分段"""
+    
+    def setUp(self):
+        """使用真实的小说数据"""
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        project_root = os.path.dirname(os.path.dirname(current_dir))
+        with open(os.path.join(project_root, "novel", "test.txt"), 'r', encoding='utf-8') as f:
+            self.text = f.read()
+    
+    def test_segments_repeat_previous_tail(self):
+        """测试每个片段开头重复上一片段的结尾"""
+        plain = TextSplitter.split_chapter(self.text, 800)
+        overlapped = TextSplitter.split_chapter(self.text, 800, overlap_size=100)
+        
+        self.assertEqual(len(plain), len(overlapped))
+        self.assertEqual(overlapped[0]["overlap"], 0)
+        for prev, seg, core in zip(plain, overlapped[1:], plain[1:]):
+            self.assertTrue(seg["text"].endswith(core["text"]))
+            self.assertGreater(seg["overlap"], 0)
+            self.assertLessEqual(seg["overlap"], 102)
+            self.assertTrue(prev["text"].endswith(seg["text"][:seg["overlap"] - 2]))
+    
+    def test_hash_ignores_overlap(self):
+        """测试重叠不影响片段哈希，上一片段的修改不会改变后续片段的哈希"""
+        paragraphs = TextSplitter.split_by_paragraphs(self.text)
+        plain = TextSplitter.split_chapter(self.text, 800, mode="content_defined")
+        overlapped = TextSplitter.split_chapter(self.text, 800, mode="content_defined", overlap_size=100)
+        self.assertEqual([seg["hash"] for seg in overlapped], [seg["hash"] for seg in plain])
+        
+        # 在第一个片段结尾附近插入文字（避开决定切分点的最后16个字符），
+        # 下一片段开头的重叠内容随之变化，但哈希不变
+        first_count = len(plain[0]["text"].split('\n\n'))
+        edited_paragraphs = list(paragraphs)
+        last = edited_paragraphs[first_count - 1]
+        edited_paragraphs[first_count - 1] = last[:-30] + "他叹了口气。" + last[-30:]
+        edited = TextSplitter.split_chapter('\n\n'.join(edited_paragraphs), 800, mode="content_defined", overlap_size=100)
+        self.assertNotEqual(edited[1]["text"], overlapped[1]["text"])
+        self.assertEqual(edited[1]["hash"], overlapped[1]["hash"])
+    
+    def test_loader_overlap_option(self):
+        """测试 ChapterLoader 的重叠参数"""
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        real_test_file = os.path.join(os.path.dirname(os.path.dirname(current_dir)), "novel", "test.txt")
+        chapter = ChapterLoader(segment_size=800, overlap_size=100).load_from_txt(real_test_file)
+        self.assertIsNotNone(chapter)
+        if chapter is not None:
+            self.assertTrue(all("overlap" in seg for seg in chapter.segments))
+
+
+class TestStreamingNovelLoader(unittest.TestCase):
+    """测试整本小说的流式章节切分"""
+    
+    def setUp(self):
+        """准备测试数据"""
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        project_root = os.path.dirname(os.path.dirname(current_dir))
+        self.real_test_file = os.path.join(project_root, "novel", "test.txt")
+        self.temp_dir = tempfile.mkdtemp()
+        self.loader = ChapterLoader(segment_size=800)
+    
+    def tearDown(self):
+        """清理临时目录"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_iter_chapters_splits_real_novel(self):
+        """测试真实数据按章节标题切分为多个章节"""
+        chapters = list(self.loader.iter_chapters(self.real_test_file))
+        
+        self.assertEqual([c.chapter_id for c in chapters], ["第一章", "第二章", "第三章", "第四章", "第五章"])
+        self.assertEqual(chapters[0].title, "山边小村")
+        self.assertEqual(chapters[1].title, "青牛镇")
+        # 书名和作者等前言并入第一章
+        self.assertIn("《凡人修仙传》", chapters[0].content)
+        self.assertTrue(chapters[1].content.startswith("第二章"))
+        
+        with open(self.real_test_file, 'r', encoding='utf-8') as f:
+            self.assertEqual("".join(c.content for c in chapters), f.read())
+        for chapter in chapters:
+            self.assertTrue(all(seg["seg_id"].startswith(f"{chapter.chapter_id}-") for seg in chapter.segments))
+    
+    def test_iter_chapters_is_lazy(self):
+        """测试章节是惰性生成的"""
+        iterator = self.loader.iter_chapters(self.real_test_file)
+        first = next(iterator)
+        self.assertEqual(first.chapter_id, "第一章")
+    
+    def test_duplicate_ids_and_encoding(self):
+        """测试分卷重复章节号和GBK编码"""
+        path = os.path.join(self.temp_dir, "novel.txt")
+        text = "第一章 开端\n韩立出门。\n【第二章 归来】\n韩立回家。\n第一章 新卷\n韩立再次出门。\n"
+        with open(path, 'w', encoding='gbk') as f:
+            f.write(text)
+        
+        chapters = list(self.loader.iter_chapters(path, encoding="gbk"))
+        self.assertEqual([c.chapter_id for c in chapters], ["第一章", "第二章", "第一章_2"])
+        self.assertEqual(chapters[1].title, "归来")
+        self.assertEqual(chapters[2].content, "第一章 新卷\n韩立再次出门。\n")
+    
+    def test_file_without_headings(self):
+        """测试没有章节标题的文件作为单个章节"""
+        path = os.path.join(self.temp_dir, "fragment.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("韩立在山中采药。\n")
+        
+        chapters = list(self.loader.iter_chapters(path))
+        self.assertEqual(len(chapters), 1)
+        self.assertEqual(chapters[0].chapter_id, "fragment")
+        self.assertEqual(list(self.loader.iter_chapters(os.path.join(self.temp_dir, "missing.txt"))), [])
+
+
+class TestChapterIndex(unittest.TestCase):
+    """测试章节/分段字节偏移索引与按范围加载"""
+    
+    def setUp(self):
+        """复制真实数据到临时目录，避免在仓库中写入索引文件"""
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        project_root = os.path.dirname(os.path.dirname(current_dir))
+        self.temp_dir = tempfile.mkdtemp()
+        self.novel_file = os.path.join(self.temp_dir, "test.txt")
+        shutil.copy(os.path.join(project_root, "novel", "test.txt"), self.novel_file)
+        self.loader = ChapterLoader(segment_size=300, overlap_size=50)
+    
+    def tearDown(self):
+        """清理临时目录"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_index_is_persisted_and_reused(self):
+        """测试索引被保存到小说文件旁并在文件未修改时复用"""
+        index = self.loader.load_index(self.novel_file)
+        index_path = self.novel_file + ChapterLoader.INDEX_SUFFIX
+        self.assertTrue(os.path.exists(index_path))
+        self.assertEqual([c["chapter_id"] for c in index["chapters"]],
+                         ["第一章", "第二章", "第三章", "第四章", "第五章"])
+        
+        # 篡改已保存的索引，指纹未变时应直接读取而不是重建
+        index["chapters"][0]["title"] = "已缓存"
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        self.assertEqual(self.loader.load_index(self.novel_file)["chapters"][0]["title"], "已缓存")
+        
+        # 分段参数变化时重建
+        rebuilt = ChapterLoader(segment_size=500).load_index(self.novel_file)
+        self.assertEqual(rebuilt["chapters"][0]["title"], "山边小村")
+    
+    def test_chapter_range_matches_full_scan(self):
+        """测试按范围加载的章节与完整扫描的结果相同"""
+        chapters = list(self.loader.iter_chapters(self.novel_file))
+        selected = list(self.loader.iter_chapter_range(self.novel_file, 2, 4))
+        self.assertEqual([c.to_dict() for c in selected], [c.to_dict() for c in chapters[1:4]])
+        self.assertEqual([c.chapter_id for c in self.loader.iter_chapter_range(self.novel_file, 5)], ["第五章"])
+        with self.assertRaises(ValueError):
+            list(self.loader.iter_chapter_range(self.novel_file, 3, 2))
+    
+    def test_segment_byte_ranges(self):
+        """测试分段字节范围指向原文（含CRLF换行和重叠前缀）"""
+        chapter = list(self.loader.iter_chapter_range(self.novel_file, 3, 3))[0]
+        for seg in chapter.segments:
+            text = self.loader.read_segment(self.novel_file, seg["seg_id"])
+            parts = seg["text"].split("\n\n")
+            self.assertTrue(text.startswith(parts[0]))
+            self.assertTrue(text.endswith(parts[-1]))
+        self.assertIsNone(self.loader.read_segment(self.novel_file, "第九章-1"))
+
+
+class TestEncodingAndParallelLoading(unittest.TestCase):
+    """测试编码探测、增量解码和目录并行加载"""
+    
+    CHAPTER_TEXT = "第{n}章 测试\n\n韩立走进七玄门，墨大夫看着他。\n\n结束。\n"
+    
+    def setUp(self):
+        """准备混合编码的章节目录"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.encodings = ["utf-8", "gbk", "gb18030", "utf-8-sig", "utf-16"]
+        for i in range(10):
+            with open(os.path.join(self.temp_dir, f"c{i:02d}.txt"), 'w',
+                      encoding=self.encodings[i % 5], newline='\r\n') as f:
+                f.write(self.CHAPTER_TEXT.format(n=i + 1))
+        self.loader = ChapterLoader()
+    
+    def tearDown(self):
+        """清理临时目录"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_detect_encoding(self):
+        """测试BOM和试解码探测"""
+        self.assertEqual(ChapterLoader.detect_encoding(codecs.BOM_UTF8 + "韩立".encode("utf-8")), "utf-8-sig")
+        self.assertEqual(ChapterLoader.detect_encoding("韩立".encode("utf-8")[:-1]), "utf-8")
+        self.assertEqual(ChapterLoader.detect_encoding("韩立走进七玄门".encode("gbk")), "gbk")
+        self.assertEqual(ChapterLoader.detect_encoding("韩立𠀀".encode("gb18030")), "gb18030")
+        self.assertEqual([ChapterLoader.sniff_encoding(os.path.join(self.temp_dir, f"c{i:02d}.txt")) for i in range(5)],
+                         ["utf-8", "gbk", "gbk", "utf-8-sig", "utf-16"])
+    
+    def test_read_text_across_chunks(self):
+        """测试跨块的多字节字符和CRLF被正确解码"""
+        path = os.path.join(self.temp_dir, "c00.txt")
+        original = ChapterLoader.READ_CHUNK_SIZE
+        ChapterLoader.READ_CHUNK_SIZE = 3
+        try:
+            content, encoding = ChapterLoader.read_text(path)
+        finally:
+            ChapterLoader.READ_CHUNK_SIZE = original
+        self.assertEqual(encoding, "utf-8")
+        self.assertEqual(content, self.CHAPTER_TEXT.format(n=1))
+    
+    def test_parallel_matches_sequential(self):
+        """测试进程池加载与顺序加载结果一致"""
+        self.loader.PARALLEL_MIN_FILES = 2
+        parallel = self.loader.load_multiple_txt(self.temp_dir, max_workers=2)
+        sequential = self.loader.load_multiple_txt(self.temp_dir, max_workers=1)
+        
+        self.assertEqual(len(parallel), 10)
+        self.assertEqual([c.to_dict() for c in parallel], [c.to_dict() for c in sequential])
+        for i, chapter in enumerate(parallel):
+            self.assertEqual(chapter.content, self.CHAPTER_TEXT.format(n=i + 1))
+    
+    def test_failures_are_reported(self):
+        """测试加载失败的文件被记录而不是被静默丢弃"""
+        os.mkdir(os.path.join(self.temp_dir, "broken.txt"))
+        chapters = self.loader.load_multiple_txt(self.temp_dir, max_workers=1)
+        
+        self.assertEqual(len(chapters), 10)
+        self.assertEqual([os.path.basename(path) for path, _ in self.loader.failed_files], ["broken.txt"])
+        with self.assertRaises(ValueError):
+            self.loader.load_multiple_txt(self.temp_dir, max_workers=1, raise_on_error=True)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -21,7 +21,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from tests.stage_3.test_hallucination_refine import TestHallucinationRefiner, TestHARResponseParsing
+from tests.stage_3.test_hallucination_refine import TestHallucinationRefiner, TestHARResponseParsing, TestContextRetriever, TestBatchedRefinement, TestEntityVerifier, TestEntityTable, TestRefinementConvergence, TestRefinementCache, TestStreamingRefinement, TestChapterSummaries, TestSelectiveRefinement, TestModelCascade
 # 注意：因果链接测试已移至阶段 4
 # 以前的导入内容: 
 # from tests.stage_3.test_causal_linking import (
@@ -52,6 +52,16 @@ def run_stage_3_tests():
     # 添加HAR幻觉修复测试
     suite.addTests(loader.loadTestsFromTestCase(TestHallucinationRefiner))
     suite.addTests(loader.loadTestsFromTestCase(TestHARResponseParsing))
+    suite.addTests(loader.loadTestsFromTestCase(TestContextRetriever))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatchedRefinement))
+    suite.addTests(loader.loadTestsFromTestCase(TestEntityVerifier))
+    suite.addTests(loader.loadTestsFromTestCase(TestEntityTable))
+    suite.addTests(loader.loadTestsFromTestCase(TestRefinementConvergence))
+    suite.addTests(loader.loadTestsFromTestCase(TestRefinementCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestStreamingRefinement))
+    suite.addTests(loader.loadTestsFromTestCase(TestChapterSummaries))
+    suite.addTests(loader.loadTestsFromTestCase(TestSelectiveRefinement))
+    suite.addTests(loader.loadTestsFromTestCase(TestModelCascade))
     
     # 注意：因果链构建测试已经移动到阶段4
     # 之前的代码:
@@ -12,6 +12,8 @@ import sys
 import os
 import unittest
 import json
+import tempfile
+import time
 from unittest.mock import patch, MagicMock
 
 # 添加项目根目录到 Python 路径
@@ -21,6 +23,11 @@ if project_root not in sys.path:
 
 from common.models.event import EventItem
 from hallucination_refine.service.har_service import HallucinationRefiner
+from hallucination_refine.service.context_retriever import ContextRetriever
+from hallucination_refine.service.entity_verifier import EntityVerifier
+from hallucination_refine.service.entity_table import EntityTable
+from hallucination_refine.service.chapter_summary import ChapterSummaryStore
+from hallucination_refine.service.risk_scorer import RiskScorer
 from hallucination_refine.di.provider import provide_refiner
 
 
@@ -376,5 +383,641 @@ class TestHARResponseParsing(unittest.TestCase):
         self.assertEqual(refined_event.location, self.original_event.location)
 
 
+class TestContextRetriever(unittest.TestCase):
+    """测试幻觉修复的检索上下文"""
+    
+    def setUp(self):
+        """准备章节片段"""
+        self.segments = [
+            {"seg_id": "第一章-1", "text": "韩立出生在一个偏僻的山村，家里十分贫穷。"},
+            {"seg_id": "第一章-2", "text": "三叔来到村里，说七玄门正在招收弟子。"},
+            {"seg_id": "第一章-3", "text": "韩立跟随三叔前往青牛镇，第一次见到了繁华的集市。"},
+            {"seg_id": "第一章-4", "text": "墨大夫检查了韩立的身体，决定收他为记名弟子。"},
+            {"seg_id": "第一章-5", "text": "入门测试在炼骨崖进行，众少年需要攀上山顶。"},
+        ]
+        self.event = EventItem(
+            event_id="E01-1",
+            description="墨大夫收韩立为记名弟子",
+            characters=["墨大夫", "韩立"],
+            chapter_id="第一章"
+        )
+    
+    def test_source_segment_and_neighbors(self):
+        """测试上下文包含来源片段及其相邻片段，并按原文顺序拼接"""
+        retriever = ContextRetriever(self.segments, token_budget=200, neighbors=1, top_k=0)
+        context = retriever.retrieve(self.event, ["第一章-2"])
+        
+        self.assertTrue(context.startswith(self.segments[0]["text"]))
+        self.assertIn(self.segments[2]["text"], context)
+        self.assertNotIn(self.segments[3]["text"], context)
+    
+    def test_bm25_fallback_and_budget(self):
+        """测试来源未知时使用BM25检索，且不超过token预算"""
+        retriever = ContextRetriever(self.segments, token_budget=30, neighbors=1)
+        self.assertEqual(retriever.search("墨大夫收韩立为记名弟子", top_k=1)[0][0], 3)
+        
+        context = retriever.retrieve(self.event)
+        self.assertIn("墨大夫", context)
+        self.assertLessEqual(ContextRetriever.estimate_tokens(context), 30)
+    
+    def test_oversized_segment_keeps_event_span(self):
+        """测试来源片段超出预算时截取事件所在的位置，而不是片段开头"""
+        filler = "山间云雾缭绕，" * 40
+        segments = [{"seg_id": "第一章-1", "text": filler + "墨大夫检查了韩立的身体，决定收他为记名弟子。" + filler}]
+        retriever = ContextRetriever(segments, token_budget=60, neighbors=0, top_k=0)
+        
+        context = retriever.retrieve(self.event, ["第一章-1"])
+        self.assertIn("决定收他为记名弟子", context)
+        self.assertLessEqual(ContextRetriever.estimate_tokens(context), 60)
+        self.assertFalse(segments[0]["text"].startswith(context))
+    
+    def test_refiner_builds_scoped_contexts(self):
+        """测试精修器为每个事件构建检索上下文，未超出预算时不检索"""
+        prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        refiner = HallucinationRefiner(prompt_path=prompt_path, api_key="fake-key", context_token_budget=40)
+        chapter_text = "\n\n".join(seg["text"] for seg in self.segments)
+        
+        contexts = refiner.build_event_contexts([self.event], chapter_text, self.segments, {"E01-1": ["第一章-4"]})
+        self.assertIn(self.segments[3]["text"], contexts["E01-1"])
+        self.assertLess(len(contexts["E01-1"]), len(chapter_text))
+        self.assertEqual(refiner.build_event_contexts([self.event], "简短上下文"), {})
+
+
+class TestBatchedRefinement(unittest.TestCase):
+    """测试多事件批量精修"""
+    
+    def setUp(self):
+        """准备同一章节的事件"""
+        prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        self.refiner = HallucinationRefiner(
+            prompt_path=prompt_path, api_key="fake-key", max_workers=1, max_iterations=2, batch_size=3
+        )
+        self.events = [
+            EventItem(event_id=f"E01-{i}", description=f"事件{i}", characters=["韩立"], chapter_id="第一章")
+            for i in range(1, 4)
+        ] + [EventItem(event_id="E02-1", description="事件4", chapter_id="第二章")]
+    
+    def test_batch_positions_group_by_chapter(self):
+        """测试批次按章节分组且不超过批量大小"""
+        batches = self.refiner.batch_positions(self.events)
+        self.assertEqual(batches, [[0, 1, 2], [3]])
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_batch_verdicts_and_fallback(self, mock_llm_call):
+        """测试一次请求得到多个事件的判断，缺少判断的事件回退为逐个请求"""
+        def side_effect(system_prompt, user_prompt):
+            if "事件列表" in user_prompt:
+                self.assertEqual(user_prompt.count("共享上下文"), 1)
+                return {"success": True, "json_content": {"results": [
+                    {"event_id": "E01-1", "has_hallucination": False, "issues": [], "refined_event": None},
+                    {"event_id": "E01-2", "has_hallucination": True,
+                     "issues": [{"field": "description", "original": "事件2", "corrected": "修正事件2"}]},
+                    {"event_id": "E99-9", "has_hallucination": False},
+                ]}}
+            return {"success": True, "json_content": {
+                "has_hallucination": True,
+                "issues": [{"field": "location", "original": "", "corrected": "七玄门"}]
+            }}
+        mock_llm_call.side_effect = side_effect
+        
+        refiner = self.refiner
+        refiner.max_iterations = 1
+        refined = refiner.refine_batch(self.events[:3], "共享上下文")
+        
+        self.assertEqual([e.event_id for e in refined], ["E01-1", "E01-2", "E01-3"])
+        self.assertEqual(refined[0].description, "事件1")
+        self.assertEqual(refined[1].description, "修正事件2")
+        self.assertEqual(refined[2].location, "七玄门")
+        # 一次批量请求 + E01-3 的一次回退请求
+        self.assertEqual(mock_llm_call.call_count, 2)
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_batch_request_failure_falls_back(self, mock_llm_call):
+        """测试批量请求失败时所有事件回退为逐个请求"""
+        def side_effect(system_prompt, user_prompt):
+            if "事件列表" in user_prompt:
+                return {"success": False, "error": "超时"}
+            return {"success": True, "json_content": {"has_hallucination": False}}
+        mock_llm_call.side_effect = side_effect
+        
+        refined = self.refiner.refine(self.events, "共享上下文")
+        
+        self.assertEqual(sorted(e.event_id for e in refined), sorted(e.event_id for e in self.events))
+        # 第一批一次批量请求加三次回退请求，第二批只有一个事件直接逐个请求
+        self.assertEqual(mock_llm_call.call_count, 5)
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_duplicate_ids_in_batch_fall_back(self, mock_llm_call):
+        """测试批次内事件ID重复时逐个精修，不会互相覆盖"""
+        mock_llm_call.return_value = {"success": True, "json_content": {"has_hallucination": False}}
+        events = [
+            EventItem(event_id="E1-1", description="韩立进入七玄门", characters=["韩立"], chapter_id="第一章"),
+            EventItem(event_id="E1-1", description="墨大夫收韩立为徒", characters=["墨大夫", "韩立"], chapter_id="第一章")
+        ]
+        
+        refined = self.refiner.refine(events, "共享上下文")
+        
+        self.assertEqual([e.description for e in refined], ["韩立进入七玄门", "墨大夫收韩立为徒"])
+        self.assertEqual(mock_llm_call.call_count, 2)
+        for call in mock_llm_call.call_args_list:
+            self.assertNotIn("事件列表", call[0][1])
+    
+    def test_retrieve_batch_covers_every_event(self):
+        """测试批次共享上下文包含每个事件的来源片段"""
+        segments = [{"seg_id": f"s{i}", "text": f"第{i}段内容，韩立在此。"} for i in range(8)]
+        retriever = ContextRetriever(segments, token_budget=40, neighbors=1, top_k=0)
+        events = self.events[:2]
+        context = retriever.retrieve_batch(events, {"E01-1": ["s1"], "E01-2": ["s6"]})
+        
+        self.assertIn(segments[1]["text"], context)
+        self.assertIn(segments[6]["text"], context)
+        self.assertIn(ContextRetriever.GAP_MARKER, context)
+        self.assertLessEqual(ContextRetriever.estimate_tokens(context), 40)
+
+
+class TestEntityVerifier(unittest.TestCase):
+    """测试精修前的实体本地核验"""
+    
+    def setUp(self):
+        """准备章节原文和事件"""
+        self.source = "二愣子跟随三叔来到七玄门。墨居仁在神手谷收他为记名弟子，传授长春功。"
+        self.lexicon = {"characters": {"韩立": ["二愣子"], "墨大夫": ["墨居仁"]}}
+        self.faithful = EventItem(
+            event_id="E01-1", description="墨大夫收韩立为弟子", characters=["韩立", "墨大夫"],
+            treasures=["长春功"], location="神手谷内", chapter_id="第一章"
+        )
+        self.suspicious = EventItem(
+            event_id="E01-2", description="韩立获得混沌神剑", characters=["韩立"],
+            treasures=["混沌神剑"], location="未指定", chapter_id="第一章"
+        )
+    
+    def test_partition_with_aliases_and_location_suffix(self):
+        """测试别名和去除方位后缀的地点视为出现，未出现的宝物被标出"""
+        verifier = EntityVerifier(self.source, self.lexicon)
+        verified, suspicious = verifier.partition([self.faithful, self.suspicious])
+        
+        self.assertEqual([e.event_id for e in verified], ["E01-1"])
+        self.assertEqual([e.event_id for e in suspicious], ["E01-2"])
+        self.assertEqual(verifier.unattested(self.suspicious), [("treasures", "混沌神剑")])
+        # 没有词表时别名无法对应
+        self.assertIn(("characters", "韩立"), EntityVerifier(self.source).unattested(self.faithful))
+    
+    def test_event_without_checkable_entities_is_suspicious(self):
+        """测试没有可核对实体的事件不会被当作已核实而跳过精修"""
+        entityless = EventItem(
+            event_id="E01-3", description="一柄天外飞来的诛仙剑落入谷中", characters=[],
+            treasures=[], location="未知", chapter_id="第一章"
+        )
+        verifier = EntityVerifier(self.source, self.lexicon)
+        verified, suspicious = verifier.partition([self.faithful, entityless])
+        
+        self.assertEqual(verifier.unattested(entityless), [])
+        self.assertFalse(verifier.is_verified(entityless))
+        self.assertEqual([e.event_id for e in verified], ["E01-1"])
+        self.assertEqual([e.event_id for e in suspicious], ["E01-3"])
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_refine_skips_verified_events(self, mock_llm_call):
+        """测试实体全部核实的事件不调用LLM"""
+        mock_llm_call.return_value = {"success": True, "json_content": {"has_hallucination": False}}
+        prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        lexicon_path = os.path.join(project_root, "common", "config", "entity_lexicon.json")
+        refiner = HallucinationRefiner(
+            prompt_path=prompt_path, api_key="fake-key", max_workers=1,
+            verify_entities=True, lexicon_path=lexicon_path
+        )
+        
+        refined = refiner.refine([self.faithful, self.suspicious], self.source)
+        
+        self.assertEqual(sorted(e.event_id for e in refined), ["E01-1", "E01-2"])
+        self.assertEqual(mock_llm_call.call_count, 1)
+        self.assertIn("混沌神剑", mock_llm_call.call_args[0][1])
+
+
+class TestEntityTable(unittest.TestCase):
+    """测试章节级规范实体表"""
+    
+    def setUp(self):
+        """准备同一章节的事件"""
+        self.events = [
+            EventItem(event_id="E01-1", description="二愣子随三叔进城", characters=["二愣子", "三叔"],
+                      location="七玄门", chapter_id="第一章"),
+            EventItem(event_id="E01-2", description="韩立获得混沌神剑", characters=["韩立", "韩立"],
+                      treasures=["混沌神剑", "小绿瓶"], chapter_id="第一章"),
+            EventItem(event_id="E01-3", description="三叔离开", characters=["三叔"], chapter_id="第一章"),
+        ]
+    
+    def test_apply_canonical_names(self):
+        """测试别名改写为规范名、去除重复和原文不存在的实体"""
+        table = EntityTable.from_lexicon({"treasures": {"掌天瓶": ["小绿瓶"]}})
+        table.update_from_response({
+            "characters": [{"canonical": "韩立", "aliases": ["二愣子"]}],
+            "locations": [{"canonical": "七玄门", "aliases": ["七玄门总坛"]}],
+            "unsupported": [{"field": "treasures", "name": "混沌神剑"}],
+        })
+        
+        refined = [table.apply(event) for event in self.events]
+        self.assertEqual(refined[0].characters, ["韩立", "三叔"])
+        self.assertEqual(refined[1].characters, ["韩立"])
+        self.assertEqual(refined[1].treasures, ["掌天瓶"])
+        self.assertIs(refined[2], self.events[2])
+        self.assertIn({"field": "treasures", "name": "混沌神剑"}, table.to_dict()["unsupported"])
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_one_call_per_chapter(self, mock_llm_call):
+        """测试规范实体表模式每章只请求一次"""
+        mock_llm_call.return_value = {"success": True, "json_content": {
+            "characters": [{"canonical": "韩立", "aliases": ["二愣子"]}]
+        }}
+        prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        refiner = HallucinationRefiner(
+            prompt_path=prompt_path, api_key="fake-key", entity_table_mode=True,
+            lexicon_path=os.path.join(project_root, "common", "config", "missing_lexicon.json")
+        )
+        
+        refined = refiner.refine(self.events, "二愣子随三叔进城。")
+        
+        self.assertEqual(mock_llm_call.call_count, 1)
+        self.assertIn("二愣子", mock_llm_call.call_args[0][1])
+        self.assertEqual([e.event_id for e in refined], ["E01-1", "E01-2", "E01-3"])
+        self.assertEqual(refined[0].characters, ["韩立", "三叔"])
+        self.assertIsNotNone(refiner.last_entity_table)
+        
+        # 请求失败时只按词表改写，事件保持不变
+        mock_llm_call.return_value = {"success": False, "error": "超时"}
+        self.assertEqual(refiner.refine(self.events[:1], "原文")[0].characters, ["二愣子", "三叔"])
+
+
+class TestRefinementConvergence(unittest.TestCase):
+    """测试HAR迭代的收敛检测和统计"""
+    
+    def setUp(self):
+        """准备精修器和事件"""
+        prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        self.refiner = HallucinationRefiner(
+            prompt_path=prompt_path, api_key="fake-key", max_workers=1, max_iterations=3
+        )
+        self.event = EventItem(
+            event_id="E01-1", description="韩立获得混沌神剑", characters=["韩立"],
+            treasures=["混沌神剑"], chapter_id="第一章"
+        )
+    
+    def test_cosmetic_changes_are_not_significant(self):
+        """测试只有空白、标点或列表顺序不同的修正不算实质变化"""
+        cosmetic = EventItem(
+            event_id="E01-1", description="韩立 获得混沌神剑。", characters=["韩立"],
+            treasures=["混沌神剑"], chapter_id="第一章"
+        )
+        changed = EventItem(
+            event_id="E01-1", description="韩立获得混沌神剑", characters=["韩立"],
+            treasures=["青竹蜂云剑"], chapter_id="第一章"
+        )
+        self.assertFalse(HallucinationRefiner.has_significant_change(self.event, cosmetic))
+        self.assertTrue(HallucinationRefiner.has_significant_change(self.event, changed))
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_stops_when_corrections_converge(self, mock_llm_call):
+        """测试第二轮修正与第一轮相同时不再发起第三轮"""
+        mock_llm_call.return_value = {"success": True, "json_content": {
+            "has_hallucination": True,
+            "confidence": 0.5,
+            "issues": [{"field": "treasures", "original": "混沌神剑", "corrected": ["青竹蜂云剑"]}]
+        }}
+        
+        refined = self.refiner.refine([self.event], "")
+        
+        self.assertEqual(refined[0].treasures, ["青竹蜂云剑"])
+        self.assertEqual(mock_llm_call.call_count, 2)
+        self.assertEqual(self.refiner.last_stats["stop_reasons"]["converged"], 1)
+        self.assertEqual(self.refiner.last_stats["iterations"], {2: 1})
+        self.assertEqual(self.refiner.last_stats["llm_calls"], 2)
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_confident_correction_skips_next_round(self, mock_llm_call):
+        """测试置信度达到阈值时只请求一轮"""
+        mock_llm_call.return_value = {"success": True, "json_content": {
+            "has_hallucination": True,
+            "confidence": "0.95",
+            "issues": [{"field": "treasures", "original": "混沌神剑", "corrected": ["青竹蜂云剑"]}]
+        }}
+        
+        self.refiner.refine([self.event], "")
+        
+        self.assertEqual(mock_llm_call.call_count, 1)
+        self.assertEqual(self.refiner.last_stats["stop_reasons"]["confident"], 1)
+        self.assertIn("confidence", mock_llm_call.call_args[0][1])
+
+
+class TestRefinementCache(unittest.TestCase):
+    """测试精修结果的持久化缓存"""
+    
+    def setUp(self):
+        """准备临时缓存文件"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "har_cache.json")
+        self.prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        self.event = EventItem(
+            event_id="E01-1", description="韩立获得混沌神剑", characters=["韩立"],
+            treasures=["混沌神剑"], chapter_id="第一章"
+        )
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def make_refiner(self):
+        """创建使用临时缓存的精修器"""
+        return HallucinationRefiner(
+            prompt_path=self.prompt_path, api_key="fake-key", max_workers=1,
+            max_iterations=1, cache_path=self.cache_path
+        )
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_rerun_reuses_results_independent_of_event_id(self, mock_llm_call):
+        """测试重新运行时相同内容的事件（即使事件ID不同）直接复用缓存结果"""
+        mock_llm_call.return_value = {"success": True, "json_content": {
+            "has_hallucination": True,
+            "issues": [{"field": "treasures", "original": "混沌神剑", "corrected": ["青竹蜂云剑"]}]
+        }}
+        self.make_refiner().refine([self.event], "原文")
+        self.assertEqual(mock_llm_call.call_count, 1)
+        
+        refiner = self.make_refiner()
+        renamed = EventItem.from_dict(dict(self.event.to_dict(), event_id="E01-7"))
+        refined = refiner.refine([renamed], "原文")
+        
+        self.assertEqual(mock_llm_call.call_count, 1)
+        self.assertEqual(refined[0].event_id, "E01-7")
+        self.assertEqual(refined[0].treasures, ["青竹蜂云剑"])
+        self.assertEqual(refiner.last_stats["cache"]["hits"], 1)
+        
+        # 上下文不同时不复用
+        refiner.refine([renamed], "另一段原文")
+        self.assertEqual(mock_llm_call.call_count, 2)
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_failed_requests_are_not_cached(self, mock_llm_call):
+        """测试请求失败的结果不写入缓存"""
+        mock_llm_call.return_value = {"success": False, "error": "超时"}
+        refiner = self.make_refiner()
+        refiner.refine([self.event], "原文")
+        self.assertEqual(len(refiner.cache), 0)
+
+
+class TestStreamingRefinement(unittest.TestCase):
+    """测试流式精修和按输入顺序重排"""
+    
+    def setUp(self):
+        """准备精修器和事件"""
+        prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        self.refiner = HallucinationRefiner(
+            prompt_path=prompt_path, api_key="fake-key", max_workers=2, max_iterations=1
+        )
+        self.events = [
+            EventItem(event_id="E01-1", description="慢事件", chapter_id="第一章"),
+            EventItem(event_id="E01-2", description="快事件", chapter_id="第一章"),
+        ]
+    
+    def test_iter_in_order_buffers_until_prefix_is_complete(self):
+        """测试重排缓冲按序号输出"""
+        a, b, c = self.events[0], self.events[1], EventItem(event_id="E01-3", description="事件3")
+        ordered = HallucinationRefiner.iter_in_order([(2, c), (0, a), (1, b)])
+        self.assertEqual([e.event_id for e in ordered], ["E01-1", "E01-2", "E01-3"])
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_yields_as_completed_with_original_index(self, mock_llm_call):
+        """测试先完成的事件先产出并带有原始序号，refine 的结果保持输入顺序"""
+        def side_effect(system_prompt, user_prompt):
+            if "慢事件" in user_prompt:
+                time.sleep(0.3)
+            return {"success": True, "json_content": {"has_hallucination": False}}
+        mock_llm_call.side_effect = side_effect
+        
+        streamed = list(self.refiner.iter_refine(self.events, "原文"))
+        self.assertEqual([(i, e.event_id) for i, e in streamed], [(1, "E01-2"), (0, "E01-1")])
+        
+        refined = self.refiner.refine(self.events, "原文")
+        self.assertEqual([e.event_id for e in refined], ["E01-1", "E01-2"])
+
+
+class TestChapterSummaries(unittest.TestCase):
+    """测试滚动章节摘要作为前情提要"""
+    
+    def setUp(self):
+        """准备临时摘要文件"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.summary_path = os.path.join(self.temp_dir.name, "summaries.json")
+        self.prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def test_digest_uses_last_k_earlier_chapters(self):
+        """测试前情提要只包含此前最近K章，并受token预算限制"""
+        store = ChapterSummaryStore(self.summary_path, window=2, token_budget=200)
+        for chapter_id, summary in [("第一章", "韩立入七玄门"), ("第二章", "墨大夫收徒"),
+                                    ("第三章", "韩立修炼长春功"), ("第五章", "后文")]:
+            store.put(chapter_id, summary)
+        
+        digest = ChapterSummaryStore(self.summary_path, window=2, token_budget=200).digest("第四章")
+        self.assertNotIn("韩立入七玄门", digest)
+        self.assertIn("墨大夫收徒", digest)
+        self.assertIn("韩立修炼长春功", digest)
+        self.assertNotIn("后文", digest)
+        self.assertLess(digest.index("墨大夫收徒"), digest.index("韩立修炼长春功"))
+        
+        store.token_budget = 20
+        self.assertNotIn("墨大夫收徒", store.digest("第四章"))
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_summary_generated_once_and_fed_to_refinement(self, mock_llm_call):
+        """测试每章摘要只生成一次，后续章节精修时上下文带有前情提要"""
+        def side_effect(system_prompt, user_prompt):
+            if "概括" in user_prompt:
+                return {"success": True, "json_content": {"summary": "韩立拜墨大夫为师"}}
+            return {"success": True, "json_content": {"has_hallucination": False}}
+        mock_llm_call.side_effect = side_effect
+        refiner = HallucinationRefiner(
+            prompt_path=self.prompt_path, api_key="fake-key", max_workers=1,
+            summary_path=self.summary_path, summary_window=3
+        )
+        
+        refiner.update_chapter_summary("第一章", "拜师", "第一章原文")
+        refiner.update_chapter_summary("第一章", "拜师", "第一章原文")
+        self.assertEqual(mock_llm_call.call_count, 1)
+        
+        event = EventItem(event_id="E02-1", description="韩立炼丹", chapter_id="第二章")
+        refiner.refine([event], "第二章原文")
+        prompt = mock_llm_call.call_args[0][1]
+        self.assertIn("韩立拜墨大夫为师", prompt)
+        self.assertIn("第二章原文", prompt)
+
+
+
+class TestSelectiveRefinement(unittest.TestCase):
+    """测试按幻觉风险排序的选择性精修"""
+    
+    def setUp(self):
+        """准备风险不同的事件"""
+        self.source = "韩立在神手谷向墨大夫学习长春功。"
+        self.prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        self.low = EventItem(
+            event_id="E01-1", description="韩立学习长春功", characters=["韩立"],
+            treasures=["长春功"], location="神手谷", result="入门", time="夜", chapter_id="第一章"
+        )
+        self.medium = EventItem(
+            event_id="E01-2", description="韩立修炼", characters=["韩立"],
+            location="未指定", result="未知", time="未指定", chapter_id="第一章"
+        )
+        self.high = EventItem(
+            event_id="E01-3", description="韩立获得混沌神剑", characters=["韩立"],
+            treasures=["混沌神剑"], location="神手谷", result="入门", time="夜", chapter_id="第一章"
+        )
+        self.events = [self.low, self.medium, self.high]
+    
+    def test_rank_by_risk_signals(self):
+        """测试未核实实体、缺省字段、长描述和回退来源提高风险分"""
+        scorer = RiskScorer(EntityVerifier(self.source), {"E01-1": ["第一章-1"]}, description_chars=10)
+        
+        self.assertEqual(scorer.rank(self.events), [2, 1, 0])
+        self.assertEqual(scorer.factors(self.high)["unattested"], 1.0)
+        self.assertEqual(scorer.factors(self.medium)["default_fields"], 1.0)
+        self.assertEqual(scorer.factors(self.low)["fallback"], 0.0)
+        self.assertEqual(scorer.factors(self.medium)["fallback"], 1.0)
+        long_event = EventItem(event_id="E01-4", description="韩" * 20, chapter_id="第一章")
+        self.assertEqual(RiskScorer(description_chars=10).factors(long_event)["long_description"], 1.0)
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_call_budget_limits_refined_events(self, mock_llm_call):
+        """测试每章调用预算内只精修风险最高的事件，其余事件原样返回"""
+        mock_llm_call.return_value = {"success": True, "json_content": {"has_hallucination": False}}
+        refiner = HallucinationRefiner(
+            prompt_path=self.prompt_path, api_key="fake-key", max_workers=1,
+            context_token_budget=0, max_calls_per_chapter=1
+        )
+        
+        refined = refiner.refine(self.events, self.source)
+        
+        self.assertEqual([e.event_id for e in refined], ["E01-1", "E01-2", "E01-3"])
+        self.assertIs(refined[0], self.low)
+        self.assertEqual(mock_llm_call.call_count, 1)
+        self.assertIn("混沌神剑", mock_llm_call.call_args[0][1])
+        self.assertEqual(refiner.last_stats["stop_reasons"]["skipped"], 2)
+        
+        # 比例上限与批量请求：一批两个事件，覆盖风险最高的两个
+        refiner = HallucinationRefiner(
+            prompt_path=self.prompt_path, api_key="fake-key", max_workers=1,
+            context_token_budget=0, batch_size=2, max_calls_per_chapter=1, refine_fraction=0.3
+        )
+        selected, skipped = refiner.select_for_refinement(self.events, self.source)
+        self.assertEqual((selected, skipped), ([2], [0, 1]))
+        refiner.refine_fraction = 1.0
+        self.assertEqual(refiner.select_for_refinement(self.events, self.source), ([1, 2], [0]))
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_verification_and_ranking_share_verifier(self, mock_llm_call):
+        """测试实体核验和风险排序只构建一次核验器"""
+        mock_llm_call.return_value = {"success": True, "json_content": {"has_hallucination": False}}
+        refiner = HallucinationRefiner(
+            prompt_path=self.prompt_path, api_key="fake-key", max_workers=1, context_token_budget=0,
+            verify_entities=True, max_calls_per_chapter=1
+        )
+        with patch.object(refiner, "build_verifier", wraps=refiner.build_verifier) as build_verifier:
+            refiner.refine(self.events, self.source)
+        self.assertEqual(build_verifier.call_count, 1)
+        self.assertEqual(mock_llm_call.call_count, 1)
+        self.assertEqual(HallucinationRefiner(prompt_path=self.prompt_path, api_key="fake-key").max_calls_per_chapter, 0)
+
+
+
+class TestModelCascade(unittest.TestCase):
+    """测试首轮低成本模型 + 按需升级的强模型"""
+    
+    def setUp(self):
+        """准备事件"""
+        self.prompt_path = os.path.join(project_root, "common", "config", "prompt_hallucination_refine.json")
+        self.events = [
+            EventItem(event_id="E01-1", description="韩立进入七玄门", characters=["韩立"], chapter_id="第一章"),
+            EventItem(event_id="E01-2", description="韩立获得混沌神剑", treasures=["混沌神剑"], chapter_id="第一章")
+        ]
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_only_positive_or_uncertain_verdicts_escalate(self, mock_llm_call):
+        """测试首轮判断无幻觉且有把握的事件不升级，检测到幻觉的事件由强模型复核"""
+        def primary(system_prompt, user_prompt):
+            if "E01-2" in user_prompt:
+                return {"success": True, "json_content": {"has_hallucination": True, "confidence": 0.6,
+                                                          "refined_event": {"treasures": []}}}
+            return {"success": True, "json_content": {"has_hallucination": False, "confidence": 0.95}}
+        mock_llm_call.side_effect = primary
+        refiner = HallucinationRefiner(
+            prompt_path=self.prompt_path, api_key="fake-key", max_workers=1, context_token_budget=0,
+            model="deepseek-chat", provider="deepseek", escalation_model="gpt-4o", escalation_api_key="fake-key"
+        )
+        strong = MagicMock()
+        strong.call_with_json_response.return_value = {
+            "success": True, "json_content": {"has_hallucination": False, "confidence": 0.95}
+        }
+        refiner.cascade.escalation = strong
+        
+        refined = refiner.refine(self.events, "韩立进入七玄门。")
+        
+        self.assertEqual(mock_llm_call.call_count, 2)
+        strong.call_with_json_response.assert_called_once()
+        self.assertIn("E01-2", strong.call_with_json_response.call_args[0][1])
+        # 强模型判断无幻觉，首轮的修正被丢弃
+        self.assertEqual(refined[1].treasures, ["混沌神剑"])
+        self.assertEqual(refiner.last_stats["llm_calls"], 3)
+        self.assertEqual(refiner.last_stats["cascade"]["escalations"], 1)
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_batch_escalation_is_one_request(self, mock_llm_call):
+        """测试批量精修中需要复核的事件合并为一次强模型请求"""
+        mock_llm_call.return_value = {"success": True, "json_content": {"results": [
+            {"event_id": "E01-1", "has_hallucination": False, "confidence": 0.5},
+            {"event_id": "E01-2", "has_hallucination": False}
+        ]}}
+        refiner = HallucinationRefiner(
+            prompt_path=self.prompt_path, api_key="fake-key", max_workers=1, context_token_budget=0,
+            batch_size=2, escalation_model="gpt-4o", escalation_api_key="fake-key"
+        )
+        strong = MagicMock()
+        strong.call_with_json_response.return_value = {"success": True, "json_content": {"results": [
+            {"event_id": "E01-1", "has_hallucination": False, "confidence": 0.9},
+            {"event_id": "E01-2", "has_hallucination": True, "confidence": 0.95, "refined_event": {"treasures": []}}
+        ]}}
+        refiner.cascade.escalation = strong
+        
+        refined = refiner.refine(self.events, "韩立进入七玄门。")
+        
+        self.assertEqual(mock_llm_call.call_count, 1)
+        strong.call_with_json_response.assert_called_once()
+        self.assertEqual(refined[1].treasures, [])
+        self.assertEqual(refiner.last_stats["stop_reasons"]["confident"], 1)
+    
+    @patch('hallucination_refine.service.har_service.LLMClient.call_with_json_response')
+    def test_unreviewed_results_are_not_cached(self, mock_llm_call):
+        """测试复核请求失败时使用首轮修正，但不写入缓存"""
+        mock_llm_call.return_value = {"success": True, "json_content": {
+            "has_hallucination": True, "confidence": 0.6, "refined_event": {"treasures": []}
+        }}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            refiner = HallucinationRefiner(
+                prompt_path=self.prompt_path, api_key="fake-key", max_workers=1, max_iterations=1,
+                cache_path=os.path.join(temp_dir, "har_cache.json"),
+                escalation_model="gpt-4o", escalation_api_key="fake-key"
+            )
+            strong = MagicMock()
+            strong.call_with_json_response.return_value = {"success": False, "error": "超时"}
+            refiner.cascade.escalation = strong
+            
+            refined = refiner.refine_event(self.events[1], "韩立进入七玄门。")
+            
+            self.assertEqual(refined.treasures, [])
+            strong.call_with_json_response.assert_called_once()
+            self.assertEqual(len(refiner.cache), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -18,8 +18,10 @@ import os
 import unittest
 from unittest.mock import patch, MagicMock
 import json
+import tempfile
 from collections import defaultdict
 import time
+import itertools
 
 # 添加项目根目录到 Python 路径
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -33,6 +35,8 @@ from common.models.event import EventItem
 from common.models.causal_edge import CausalEdge
 from causal_linking.service.unified_linker_service import CausalLinker, UnifiedCausalLinker
 from causal_linking.service.graph_filter import GraphFilter
+from causal_linking.service.pair_analyzer import PairAnalyzer
+from causal_linking.service.candidate_generator import CandidateGenerator
 from causal_linking.di.provider import provide_linker
 
 
@@ -956,5 +960,374 @@ class TestCPCModuleCompletion(unittest.TestCase):
         self.assertTrue(low_priority_edge_removed)
 
 
+
+class TestPairAnalyzerCascade(unittest.TestCase):
+    """测试事件对分析的模型级联"""
+    
+    def setUp(self):
+        """准备事件对"""
+        self.events = [
+            EventItem(event_id=f"E{i}", description=f"测试事件{i}", characters=["韩立"], chapter_id="第一章")
+            for i in range(1, 4)
+        ]
+    
+    @patch('event_extraction.repository.llm_client.LLMClient.call_with_json_response')
+    def test_positive_and_uncertain_pairs_escalate(self, mock_llm_call):
+        """测试首轮判断有把握的负例不升级，阳性和低置信度的事件对由强模型复核"""
+        def primary(system_prompt, user_prompt):
+            if "E2" in user_prompt and "E3" in user_prompt:
+                return {"success": True, "json_content": {"has_causal_relation": False, "confidence": 0.95}}
+            if "E1" in user_prompt and "E2" in user_prompt:
+                return {"success": True, "json_content": {
+                    "has_causal_relation": True, "direction": "event1->event2", "strength": "高", "confidence": 0.7
+                }}
+            return {"success": True, "json_content": {"has_causal_relation": False, "confidence": 0.4}}
+        mock_llm_call.side_effect = primary
+        analyzer = PairAnalyzer(
+            model="deepseek-chat", prompt_path=causal_prompt_path, api_key="fake-key", max_workers=1,
+            provider="deepseek", escalation_model="gpt-4o", escalation_api_key="fake-key"
+        )
+        strong = MagicMock()
+        strong.call_with_json_response.return_value = {"success": True, "json_content": {
+            "has_causal_relation": True, "direction": "event1->event2", "strength": "中", "confidence": 0.9
+        }}
+        analyzer.cascade.escalation = strong
+        
+        edges = analyzer.analyze_batch([
+            (self.events[0], self.events[1]), (self.events[1], self.events[2]), (self.events[0], self.events[2])
+        ])
+        
+        self.assertEqual(strong.call_with_json_response.call_count, 2)
+        self.assertEqual(sorted((e.from_id, e.to_id, e.strength) for e in edges), [("E1", "E2", "中"), ("E1", "E3", "中")])
+        self.assertEqual(analyzer.cascade.stats()["primary_calls"], 3)
+        self.assertIn("confidence", analyzer.format_prompt(self.events[0], self.events[1])["instruction"])
+
+
+
+class TestMultiPairAnalysis(unittest.TestCase):
+    """测试多对批量因果分析"""
+    
+    def setUp(self):
+        """准备跨章节的事件对"""
+        chapters = ["第一章", "第一章", "第二章", "第五章"]
+        self.events = [
+            EventItem(event_id=f"E{i}", description=f"测试事件{i}", characters=["韩立"], chapter_id=chapter)
+            for i, chapter in enumerate(chapters, 1)
+        ]
+        e1, e2, e3, e4 = self.events
+        self.pairs = [(e3, e4), (e1, e2), (e2, e3), (e1, e3)]
+        self.analyzer = PairAnalyzer(
+            prompt_path=causal_prompt_path, api_key="fake-key", max_workers=1, pairs_per_prompt=3
+        )
+    
+    def test_group_pairs_by_chapter_window(self):
+        """测试事件对按章节窗口排序分组，提示中每个事件卡片只出现一次"""
+        groups = self.analyzer.group_pairs(self.pairs)
+        
+        self.assertEqual(
+            [[(a.event_id, b.event_id) for a, b in group] for group in groups],
+            [[("E1", "E2"), ("E1", "E3"), ("E2", "E3")], [("E3", "E4")]]
+        )
+        instruction = self.analyzer.format_batch_prompt(groups[0])["instruction"]
+        self.assertEqual(instruction.count("事件ID: E1"), 1)
+        self.assertIn("P3: event1=E2, event2=E3", instruction)
+    
+    @patch('event_extraction.repository.llm_client.LLMClient.call_with_json_response')
+    def test_batch_verdicts_with_per_pair_fallback(self, mock_llm_call):
+        """测试一次请求得到多对判断，缺失或无效的判断逐对补充"""
+        def side_effect(system_prompt, user_prompt):
+            if "P1:" in user_prompt:
+                return {"success": True, "json_content": {"results": [
+                    {"pair_id": "P1", "has_causal_relation": True, "direction": "event1->event2", "strength": "高"},
+                    {"pair_id": "P2", "has_causal_relation": False},
+                    {"pair_id": "P3", "has_causal_relation": True, "direction": "不确定"}
+                ]}}
+            return {"success": True, "json_content": {
+                "has_causal_relation": True, "direction": "event2->event1", "strength": "低"
+            }}
+        mock_llm_call.side_effect = side_effect
+        
+        edges = self.analyzer.analyze_batch(self.pairs)
+        
+        # 两次批量请求（第二组只有一对，直接逐对请求）+ P3 的逐对回退
+        self.assertEqual(mock_llm_call.call_count, 3)
+        self.assertEqual(
+            sorted((e.from_id, e.to_id, e.strength) for e in edges),
+            [("E1", "E2", "高"), ("E3", "E2", "低"), ("E4", "E3", "低")]
+        )
+        self.assertEqual(PairAnalyzer.parse_batch_response({"results": [{"pair_id": "P9", "has_causal_relation": False}]}, 3), {})
+    
+    @patch('event_extraction.repository.llm_client.LLMClient.call_with_json_response')
+    def test_single_pair_group_looks_up_cache_once(self, mock_llm_call):
+        """测试只有一对的分组不再重复查询缓存，命中率统计每对只计一次"""
+        mock_llm_call.return_value = {"success": True, "json_content": {"has_causal_relation": False}}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            analyzer = PairAnalyzer(
+                prompt_path=causal_prompt_path, api_key="fake-key", max_workers=1, pairs_per_prompt=3,
+                cache_path=os.path.join(temp_dir, "causal_cache.json")
+            )
+            analyzer.analyze_batch(self.pairs)
+        
+        self.assertEqual(analyzer.last_cache_stats["hits"], 0)
+        self.assertEqual(analyzer.last_cache_stats["misses"], len(self.pairs))
+
+
+
+class TestAnchorAnalysis(unittest.TestCase):
+    """测试以锚点事件为中心的因果分析"""
+    
+    def setUp(self):
+        """准备以E1为中心的事件对"""
+        self.events = {
+            f"E{i}": EventItem(event_id=f"E{i}", description=f"测试事件{i}", characters=["韩立"], chapter_id="第一章")
+            for i in range(1, 6)
+        }
+        e = self.events
+        self.pairs = [(e["E1"], e["E2"]), (e["E3"], e["E1"]), (e["E1"], e["E4"]), (e["E4"], e["E5"])]
+        self.analyzer = PairAnalyzer(
+            prompt_path=causal_prompt_path, api_key="fake-key", max_workers=1, anchor_candidates=2
+        )
+    
+    def test_group_by_anchor_covers_each_pair_once(self):
+        """测试每个事件对只分配给一个锚点，每组最多k个候选"""
+        groups = self.analyzer.group_by_anchor(self.pairs)
+        
+        self.assertEqual([anchor.event_id for anchor, _ in groups], ["E1", "E1", "E4"])
+        self.assertEqual([len(pairs) for _, pairs in groups], [2, 1, 1])
+        self.assertEqual(sorted(id(pair) for _, pairs in groups for pair in pairs), sorted(id(pair) for pair in self.pairs))
+        
+        instruction = self.analyzer.format_anchor_prompt(self.events["E1"], self.pairs[:2])["instruction"]
+        self.assertEqual(instruction.count("事件ID: E1"), 1)
+        self.assertIn("C2:\n事件ID: E3", instruction)
+    
+    @patch('event_extraction.repository.llm_client.LLMClient.call_with_json_response')
+    def test_anchor_directions_and_fallback(self, mock_llm_call):
+        """测试锚点方向换算为事件对方向，缺失的候选逐对补充"""
+        def side_effect(system_prompt, user_prompt):
+            if "C1:" in user_prompt:
+                return {"success": True, "json_content": {"results": [
+                    {"candidate_id": "C1", "has_causal_relation": True, "direction": "anchor->candidate", "strength": "高"},
+                    {"candidate_id": "C2", "has_causal_relation": True, "direction": "candidate->anchor", "strength": "中"}
+                ]}}
+            return {"success": True, "json_content": {"has_causal_relation": False}}
+        mock_llm_call.side_effect = side_effect
+        
+        edges = self.analyzer.analyze_batch(self.pairs)
+        
+        self.assertEqual(mock_llm_call.call_count, 3)
+        self.assertEqual(sorted((e.from_id, e.to_id, e.strength) for e in edges), [("E1", "E2", "高"), ("E3", "E1", "中")])
+        
+        # 锚点位于事件对第二位时方向同样正确换算
+        verdicts = PairAnalyzer.parse_anchor_response(
+            {"results": [{"candidate_id": "C1", "has_causal_relation": True, "direction": "anchor->candidate"}]},
+            self.events["E1"], [self.pairs[1]]
+        )
+        self.assertEqual(verdicts[0]["direction"], "event2->event1")
+
+
+
+class TestCausalVerdictCache(unittest.TestCase):
+    """测试持久化的因果判断缓存"""
+    
+    def setUp(self):
+        """准备临时缓存文件和事件"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "causal_cache.json")
+        self.e1 = EventItem(event_id="E1", description="韩立服用灵乳", characters=["韩立"], chapter_id="第一章")
+        self.e2 = EventItem(event_id="E2", description="墨大夫下令追杀韩立", characters=["墨大夫"], chapter_id="第二章")
+        self.e3 = EventItem(event_id="E3", description="韩立采药", characters=["韩立"], chapter_id="第二章")
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def make_analyzer(self):
+        """创建使用临时缓存的分析器"""
+        return PairAnalyzer(prompt_path=causal_prompt_path, api_key="fake-key", max_workers=1, cache_path=self.cache_path)
+    
+    @patch('event_extraction.repository.llm_client.LLMClient.call_with_json_response')
+    def test_rerun_reuses_positive_and_negative_verdicts(self, mock_llm_call):
+        """测试重复运行时正负判断都命中缓存，事件对顺序颠倒时方向正确换算"""
+        def side_effect(system_prompt, user_prompt):
+            if "墨大夫" in user_prompt:
+                direction = "event1->event2" if user_prompt.index("E1") < user_prompt.index("E2") else "event2->event1"
+                return {"success": True, "json_content": {
+                    "has_causal_relation": True, "direction": direction, "strength": "高", "reason": "服用灵乳引来追杀"
+                }}
+            return {"success": True, "json_content": {"has_causal_relation": False}}
+        mock_llm_call.side_effect = side_effect
+        
+        first = self.make_analyzer().analyze_batch([(self.e1, self.e2), (self.e1, self.e3)])
+        self.assertEqual(mock_llm_call.call_count, 2)
+        
+        # 新的分析器从文件加载缓存；事件ID变化、事件对顺序颠倒都不影响命中
+        analyzer = self.make_analyzer()
+        renamed = EventItem.from_dict(dict(self.e1.to_dict(), event_id="E1b"))
+        second = analyzer.analyze_batch([(self.e2, renamed), (self.e3, renamed)])
+        
+        self.assertEqual(mock_llm_call.call_count, 2)
+        self.assertEqual([(e.from_id, e.to_id) for e in first], [("E1", "E2")])
+        self.assertEqual([(e.from_id, e.to_id, e.strength) for e in second], [("E1b", "E2", "高")])
+        self.assertEqual(analyzer.last_cache_stats["hits"], 2)
+        self.assertEqual(analyzer.last_cache_stats["hit_rate"], 1.0)
+    
+    @patch('event_extraction.repository.llm_client.LLMClient.call_with_json_response')
+    def test_changed_content_and_failures_are_not_reused(self, mock_llm_call):
+        """测试事件内容变化后重新判断，失败的请求不写入缓存"""
+        mock_llm_call.return_value = {"success": False, "error": "超时"}
+        analyzer = self.make_analyzer()
+        analyzer.analyze_batch([(self.e1, self.e3)])
+        self.assertEqual(len(analyzer.cache), 0)
+        
+        mock_llm_call.return_value = {"success": True, "json_content": {"has_causal_relation": False}}
+        analyzer.analyze_batch([(self.e1, self.e3)])
+        edited = EventItem.from_dict(dict(self.e3.to_dict(), description="韩立在山中采药"))
+        analyzer.analyze_batch([(self.e1, self.e3), (self.e1, edited)])
+        
+        self.assertEqual(mock_llm_call.call_count, 3)
+        self.assertEqual(analyzer.last_cache_stats["hits"], 1)
+        self.assertEqual(analyzer.last_cache_stats["misses"], 1)
+    
+    @patch('event_extraction.repository.llm_client.LLMClient.call_with_json_response')
+    def test_unreviewed_verdicts_are_not_cached(self, mock_llm_call):
+        """测试复核请求失败时使用首轮判断，但不写入缓存"""
+        mock_llm_call.return_value = {"success": True, "json_content": {
+            "has_causal_relation": True, "direction": "event1->event2", "strength": "高", "confidence": 0.6
+        }}
+        analyzer = PairAnalyzer(
+            prompt_path=causal_prompt_path, api_key="fake-key", max_workers=1, cache_path=self.cache_path,
+            escalation_model="gpt-4o", escalation_api_key="fake-key"
+        )
+        strong = MagicMock()
+        strong.call_with_json_response.return_value = {"success": False, "error": "超时"}
+        analyzer.cascade.escalation = strong
+        
+        edge = analyzer.analyze_pair(self.e1, self.e2)
+        
+        self.assertEqual((edge.from_id, edge.to_id), ("E1", "E2"))
+        strong.call_with_json_response.assert_called_once()
+        self.assertEqual(len(analyzer.cache), 0)
+
+
+
+class TestIncrementalLinking(unittest.TestCase):
+    """测试增量因果链接"""
+    
+    def setUp(self):
+        """准备已有DAG和新事件"""
+        self.existing_events = [
+            EventItem(event_id="E1", description="韩立服用灵乳", characters=["韩立"], chapter_id="第一章"),
+            EventItem(event_id="E2", description="墨大夫下令追杀韩立", characters=["墨大夫", "韩立"], chapter_id="第二章")
+        ]
+        self.existing_edges = [CausalEdge(from_id="E1", to_id="E2", strength="低", reason="服用灵乳引来追杀")]
+        self.new_events = [
+            EventItem(event_id="E3", description="韩立逃出神手谷", characters=["韩立"], chapter_id="第二章"),
+            EventItem(event_id="E4", description="韩立筑基成功", characters=["韩立"], chapter_id="第十五章")
+        ]
+    
+    @patch('event_extraction.repository.llm_client.LLMClient.call_with_json_response')
+    def test_only_pairs_with_new_events_are_analyzed(self, mock_llm_call):
+        """测试只分析包含新事件且在章节跨度内的事件对，已有的边保留"""
+        mock_llm_call.return_value = {"success": True, "json_content": {
+            "has_causal_relation": True, "direction": "event1->event2", "strength": "中", "reason": "前因后果"
+        }}
+        linker = CausalLinker(prompt_path=causal_prompt_path, api_key="fake-key", max_workers=1, max_chapter_span=10)
+        
+        events, edges = linker.link_incremental(self.existing_events, self.existing_edges, self.new_events)
+        
+        # E4 与其他事件的章节跨度都超过10章，只剩 (E1, E3) 和 (E2, E3)
+        self.assertEqual(mock_llm_call.call_count, 2)
+        self.assertEqual([event.event_id for event in events], ["E1", "E2", "E3", "E4"])
+        self.assertEqual(
+            sorted((edge.from_id, edge.to_id, edge.strength) for edge in edges),
+            [("E1", "E2", "低"), ("E1", "E3", "中"), ("E2", "E3", "中")]
+        )
+    
+    def test_node_ids_are_made_unique_once(self):
+        """测试已有边和新边一起做一次ID唯一化，引用不存在节点的已有边被丢弃"""
+        linker = CausalLinker(prompt_path=causal_prompt_path, api_key="fake-key", max_workers=1)
+        existing_events = self.existing_events + [
+            EventItem(event_id="E2", description="墨大夫闭关", characters=["墨大夫"], chapter_id="第二章")
+        ]
+        existing_edges = self.existing_edges + [CausalEdge(from_id="E1", to_id="E9", strength="高", reason="节点不存在")]
+        new_edge = CausalEdge(from_id="E2", to_id="E3", strength="中", reason="追杀导致出逃")
+        
+        with patch.object(linker.pair_analyzer, "analyze_batch", return_value=[new_edge]), \
+                patch.object(linker, "_ensure_unique_node_ids", wraps=linker._ensure_unique_node_ids) as ensure_unique:
+            events, edges = linker.link_incremental(existing_events, existing_edges, self.new_events[:1])
+        
+        self.assertEqual(ensure_unique.call_count, 1)
+        self.assertEqual([event.event_id for event in events], ["E1", "E2_1", "E2_2", "E3"])
+        self.assertEqual(
+            [(edge.from_id, edge.to_id, edge.strength) for edge in edges],
+            [("E1", "E2_1", "低"), ("E2_1", "E3", "中")]
+        )
+    
+    def test_incremental_candidates_involve_new_events(self):
+        """测试增量候选事件对都至少包含一个新事件"""
+        linker = UnifiedCausalLinker(prompt_path=causal_prompt_path, api_key="fake-key", min_entity_support=2)
+        existing = self.existing_events + [
+            EventItem(event_id="E0", description="韩立进入七玄门", characters=["韩立"], chapter_id="第一章")
+        ]
+        
+        pairs = linker.candidate_generator.generate_incremental_candidates(existing, self.new_events)
+        
+        self.assertTrue(pairs)
+        for id1, id2 in pairs:
+            self.assertTrue({id1, id2} & {"E3", "E4"})
+        self.assertNotIn(("E1", "E2"), pairs)
+    
+    def test_existing_edges_win_over_conflicting_new_edges(self):
+        """测试与已有边形成环的新边被丢弃，即使强度更高"""
+        events = self.existing_events + self.new_events
+        new_edges = [
+            CausalEdge(from_id="E2", to_id="E1", strength="高", reason="反向"),
+            CausalEdge(from_id="E2", to_id="E3", strength="中", reason="追杀导致出逃"),
+            CausalEdge(from_id="E1", to_id="E2", strength="高", reason="重复")
+        ]
+        
+        merged = GraphFilter().extend_dag(events, self.existing_edges, new_edges)
+        
+        self.assertEqual(
+            [(edge.from_id, edge.to_id, edge.strength) for edge in merged],
+            [("E1", "E2", "低"), ("E2", "E3", "中")]
+        )
+
+
+
+class TestCandidateSelection(unittest.TestCase):
+    """测试候选生成器的跨度窗口和按距离取前K个事件对"""
+    
+    def setUp(self):
+        """准备章节ID写法混杂、含无法解析章节的事件"""
+        chapters = ["第三章", "第一章", "第十二章", "番外", "第2章", "第三章", "第二十章", "第十一章", "第一章", ""]
+        self.events = [
+            EventItem(event_id=f"E{index:02d}", description="", characters=["韩立"], chapter_id=chapter)
+            for index, chapter in enumerate(chapters)
+        ]
+        self.generator = CandidateGenerator(max_chapter_span=9)
+    
+    def brute_force_pairs(self):
+        """展开全部组合，按章节距离稳定排序"""
+        pairs = [
+            (e1, e2) for e1, e2 in itertools.combinations(self.events, 2)
+            if self.generator._check_chapter_span(e1, e2)
+        ]
+        pairs.sort(key=lambda pair: abs(self.generator._get_chapter_num(pair[0]) - self.generator._get_chapter_num(pair[1])))
+        return [tuple(sorted((e1.event_id, e2.event_id))) for e1, e2 in pairs]
+    
+    def test_closest_pairs_match_stable_sort(self):
+        """测试堆选择的前K个事件对与全量稳定排序一致"""
+        expected = self.brute_force_pairs()
+        for limit in (1, 5, 12, len(expected) + 5):
+            selected = self.generator._closest_pairs(self.events, limit)
+            self.assertEqual([(e1.event_id, e2.event_id) for e1, e2 in selected], expected[:limit])
+    
+    def test_pairs_within_span_match_combinations(self):
+        """测试滑动窗口列出的事件对与逐对检查跨度的结果一致"""
+        windowed = [tuple(sorted((e1.event_id, e2.event_id))) for e1, e2 in self.generator._pairs_within_span(self.events)]
+        self.assertEqual(sorted(windowed), sorted(self.brute_force_pairs()))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -10,6 +10,7 @@
 5. 错误处理和异常情况
 """
 
+import argparse
 import unittest
 import os
 import sys
@@ -25,7 +26,7 @@ current_dir = Path(os.path.dirname(os.path.abspath(__file__)))
 project_root = current_dir.parent.parent
 sys.path.insert(0, str(project_root))
 
-from api_gateway.main import process_text, process_directory, setup_env
+from api_gateway.main import process_text, process_directory, setup_env, parse_chapter_range
 import main
 from common.models.chapter import Chapter
 from common.models.event import EventItem
@@ -102,9 +103,11 @@ class TestAPIGateway(unittest.TestCase):
             )
         ]
         mock_extractor.return_value.extract.return_value = mock_events
+        mock_extractor.return_value.get_event_sources.return_value = {"E1-1": ["第一章-1"], "E1-2": ["第一章-1"]}
         
         # 模拟精炼器
         mock_refiner.return_value.refine.return_value = mock_events
+        mock_refiner.return_value.get_entity_table.return_value = None
         
         # 模拟链接器
         mock_edges = [
@@ -137,6 +140,10 @@ graph TD
                 mock_extractor.return_value.extract.assert_called_once_with(mock_chapter)
                 # refine方法被调用时会传入额外的context参数
                 mock_refiner.return_value.refine.assert_called_once()
+                self.assertEqual(
+                    mock_refiner.return_value.refine.call_args.kwargs["event_sources"],
+                    {"E1-1": ["第一章-1"], "E1-2": ["第一章-1"]}
+                )
                 mock_linker.return_value.link_events.assert_called_once()
                 mock_linker.return_value.build_dag.assert_called_once()
                 mock_renderer.return_value.render.assert_called_once()
@@ -188,6 +195,15 @@ graph TD
             calls = [call[0][0] for call in mock_print.call_args_list]
             self.assertTrue(any("加载章节失败" in str(call) for call in calls))
 
+    def test_parse_chapter_range(self):
+        """测试章节范围参数解析"""
+        self.assertEqual(parse_chapter_range("100-200"), (100, 200))
+        self.assertEqual(parse_chapter_range("100-"), (100, None))
+        self.assertEqual(parse_chapter_range("7"), (7, 7))
+        for text in ("0-3", "5-2", "abc"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_chapter_range(text)
+
 
 class TestMainCLI(unittest.TestCase):
     """测试主程序CLI接口功能"""
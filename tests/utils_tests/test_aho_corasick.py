@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Aho-Corasick 多模式匹配测试
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, str(project_root))
+
+from common.utils.aho_corasick import AhoCorasick
+
+
+class TestAhoCorasick(unittest.TestCase):
+    """测试 AhoCorasick 自动机"""
+
+    def test_overlapping_matches(self):
+        """测试重叠和互为后缀的模式串都能匹配"""
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        self.assertEqual(
+            sorted(automaton.iter_matches("ushers")),
+            [(4, "he"), (4, "she"), (6, "hers")]
+        )
+
+    def test_find_all_chinese(self):
+        """测试在中文文本中找出出现过的实体"""
+        automaton = AhoCorasick(["韩立", "墨大夫", "七玄门", "混沌神剑", "立"])
+        text = "墨大夫在七玄门收韩立为记名弟子。"
+        self.assertEqual(automaton.find_all(text), {"韩立", "墨大夫", "七玄门", "立"})
+
+    def test_add_after_build(self):
+        """测试构建后添加模式串会在下次扫描前重新构建"""
+        automaton = AhoCorasick(["韩立"])
+        self.assertEqual(automaton.find_all("厉飞雨与韩立"), {"韩立"})
+        automaton.add("厉飞雨")
+        automaton.add("")
+        self.assertEqual(len(automaton), 2)
+        self.assertEqual(automaton.find_all("厉飞雨与韩立"), {"韩立", "厉飞雨"})
+
+
+if __name__ == "__main__":
+    unittest.main()
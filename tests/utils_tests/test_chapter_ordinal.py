@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+章节序号工具测试
+
+测试中文数字解析、章节序号表以及各组件对章节序号的统一使用
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, str(project_root))
+
+from common.models.event import EventItem
+from common.utils.chapter_ordinal import parse_chinese_number, ChapterOrdinalTable
+from common.utils.unified_id_processor import UnifiedIdProcessor
+from causal_linking.service.candidate_generator import CandidateGenerator
+
+
+class TestParseChineseNumber(unittest.TestCase):
+    """测试中文数字解析"""
+
+    def test_unit_forms(self):
+        """测试带单位的写法"""
+        cases = {
+            "十": 10, "十五": 15, "二十": 20, "一百零三": 103, "一百一十": 110,
+            "两千": 2000, "两千零五": 2005, "一万二千三百四十五": 12345,
+            "十万": 100000, "一亿二千万": 120000000,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(parse_chinese_number(text), expected, text)
+
+    def test_digit_and_mixed_forms(self):
+        """测试逐位写法、阿拉伯数字及混写"""
+        self.assertEqual(parse_chinese_number("一〇三"), 103)
+        self.assertEqual(parse_chinese_number("103"), 103)
+        self.assertEqual(parse_chinese_number("１０３"), 103)
+        self.assertEqual(parse_chinese_number("3千2百"), 3200)
+        self.assertEqual(parse_chinese_number("12万"), 120000)
+        self.assertEqual(parse_chinese_number("零"), 0)
+
+    def test_invalid(self):
+        """测试无法解析的文本"""
+        self.assertIsNone(parse_chinese_number(""))
+        self.assertIsNone(parse_chinese_number("序"))
+
+
+class TestChapterOrdinalTable(unittest.TestCase):
+    """测试章节序号表"""
+
+    def test_chapter_id_forms(self):
+        """测试各种章节ID写法"""
+        table = ChapterOrdinalTable()
+        cases = {
+            "第一章": 1, "第一百零三章": 103, "【第103章 初入七玄门】": 103,
+            "第一章_2": ChapterOrdinalTable.VOLUME_BASE + 1, "第两千章": 2000,
+            "E103-2": 103, "E01-1": 1, "E01-1_2": 1,
+        }
+        for chapter_id, expected in cases.items():
+            self.assertEqual(table.ordinal(chapter_id), expected, chapter_id)
+        self.assertIsNone(table.ordinal("序章"))
+        self.assertIsNone(table.ordinal(None))
+
+    def test_repeated_chapters_follow_previous_volume(self):
+        """测试分卷重复的章节序号排在前一卷之后，不与前一卷重叠"""
+        table = ChapterOrdinalTable()
+        ids = ["第一章", "第五百章", "第一章_2", "第二章_2", "第一章_3"]
+        ordinals = [table.ordinal(chapter_id) for chapter_id in ids]
+        self.assertEqual(ordinals, sorted(ordinals))
+        self.assertEqual(len(set(ordinals)), len(ids))
+        self.assertEqual(table.span("第一章_2", "第二章_2"), 1)
+        self.assertGreater(table.span("第一章", "第一章_2"), 500)
+
+    def test_span_and_cache(self):
+        """测试序号差与缓存"""
+        table = ChapterOrdinalTable(["第一章", "第十二章"])
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.span("第一章", "第十二章"), 11)
+        self.assertIsNone(table.span("第一章", "番外"))
+        self.assertIs(ChapterOrdinalTable.shared(), ChapterOrdinalTable.shared())
+
+
+class TestOrdinalConsumers(unittest.TestCase):
+    """测试各组件使用统一的章节序号"""
+
+    def test_candidate_generator_span_limit(self):
+        """测试中文章节ID下跨章跨度限制生效"""
+        generator = CandidateGenerator(max_chapter_span=10)
+        near = EventItem(event_id="E01-1", description="", chapter_id="第一章")
+        close = EventItem(event_id="E10-1", description="", chapter_id="第十章")
+        far = EventItem(event_id="E20-1", description="", chapter_id="第二十章")
+
+        self.assertTrue(generator._check_chapter_span(near, close))
+        self.assertFalse(generator._check_chapter_span(near, far))
+        self.assertEqual(generator._get_chapter_num(far), 20)
+
+    def test_normalize_event_id(self):
+        """测试事件ID标准化支持复合中文数字"""
+        self.assertEqual(UnifiedIdProcessor.normalize_event_id("第十五章-3", "第十五章", 3), "E15-3")
+        self.assertEqual(UnifiedIdProcessor.normalize_event_id("第一百零三章-2", "第一百零三章", 2), "E103-2")
+        self.assertEqual(UnifiedIdProcessor.normalize_event_id("", "第二十一章", 4), "E21-4")
+        self.assertEqual(UnifiedIdProcessor.normalize_event_id("E01-1", "第一章", 1), "E01-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
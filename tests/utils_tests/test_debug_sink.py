@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+异步调试记录器测试
+
+测试 DebugSink 的写入、采样和轮转功能
+"""
+
+import os
+import sys
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, str(project_root))
+
+from common.utils.debug_sink import DebugSink
+
+
+class TestDebugSink(unittest.TestCase):
+    """测试 DebugSink 类的功能"""
+
+    def setUp(self):
+        """创建临时目录"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """清理临时目录"""
+        shutil.rmtree(self.temp_dir)
+
+    def _read_lines(self, path):
+        """读取JSONL文件中的记录"""
+        opener = gzip.open if str(path).endswith(".gz") else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_records_written_as_compact_jsonl(self):
+        """测试记录以紧凑JSON行的格式追加写入"""
+        sink = DebugSink(self.temp_dir / "debug.jsonl")
+        sink.submit("prompt", "第一章-1", {"system": "系统", "instruction": "指令"})
+        sink.submit("events", "第一章-1", [{"event_id": "E1-1"}])
+        sink.close()
+
+        records = self._read_lines(self.temp_dir / "debug.jsonl")
+        self.assertEqual([r["kind"] for r in records], ["prompt", "events"])
+        self.assertEqual(records[0]["data"]["system"], "系统")
+        self.assertEqual(sink.stats["written"], 2)
+        with open(self.temp_dir / "debug.jsonl", encoding='utf-8') as f:
+            self.assertNotIn(": ", f.readline())
+
+    def test_sampling_is_consistent_per_key(self):
+        """测试按键采样，同一键的记录同进同出"""
+        sink = DebugSink(self.temp_dir / "debug.jsonl", sample_rate=0.5)
+        keys = [f"第一章-{i}" for i in range(200)]
+        for key in keys:
+            sink.submit("prompt", key, {})
+            sink.submit("events", key, [])
+        sink.close()
+
+        records = self._read_lines(self.temp_dir / "debug.jsonl")
+        kept_keys = {r["key"] for r in records}
+        self.assertEqual(len(records), 2 * len(kept_keys))
+        self.assertTrue(0 < len(kept_keys) < len(keys))
+        self.assertEqual(sink.stats["sampled_out"], 2 * (len(keys) - len(kept_keys)))
+
+    def test_rotation_with_compression(self):
+        """测试超过大小后轮转并压缩历史文件"""
+        sink = DebugSink(self.temp_dir / "debug.jsonl", max_bytes=500, backup_count=2, compress=True)
+        for i in range(30):
+            sink.submit("response", f"seg-{i}", {"content": "x" * 50})
+            sink.flush()
+        sink.close()
+
+        self.assertGreater(sink.stats["rotations"], 0)
+        self.assertTrue((self.temp_dir / "debug.jsonl.1.gz").exists())
+        self.assertFalse((self.temp_dir / "debug.jsonl.3.gz").exists())
+        self.assertGreater(len(self._read_lines(self.temp_dir / "debug.jsonl.1.gz")), 0)
+
+    def test_submit_after_close_is_ignored(self):
+        """测试关闭后提交的记录被忽略"""
+        sink = DebugSink(self.temp_dir / "debug.jsonl")
+        sink.close()
+        self.assertFalse(sink.submit("prompt", "seg", {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+近似重复事件合并测试
+
+测试 MinHashLSH 和 EventDeduplicator 的聚类与合并功能
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, str(project_root))
+
+from common.models.event import EventItem
+from common.utils.event_deduplicator import MinHashLSH, EventDeduplicator
+from common.utils.text_splitter import TextSplitter
+
+
+class TestMinHashLSH(unittest.TestCase):
+    """测试 MinHashLSH 索引"""
+
+    def test_similar_texts_become_candidates(self):
+        """测试相似文本落入同一桶，相似度估计合理"""
+        index = MinHashLSH()
+        a = index.add("韩立跟随三叔来到七玄门参加入门测试")
+        b = index.add("韩立跟随三叔来到七玄门，参加入门测试。")
+        c = index.add("墨大夫收韩立为记名弟子，传授长春功")
+
+        self.assertIn((a, b), index.candidate_pairs())
+        self.assertEqual(index.similarity(a, b), 1.0)
+        self.assertLess(index.similarity(a, c), 0.3)
+
+    def test_signature_is_deterministic(self):
+        """测试签名可复现"""
+        text = "韩立服用灵乳突破至筑基"
+        self.assertEqual(MinHashLSH().signature(text), MinHashLSH().signature(text))
+
+    def test_invalid_band_configuration(self):
+        """测试签名长度不能被分带数整除时报错"""
+        with self.assertRaises(ValueError):
+            MinHashLSH(num_perm=64, bands=10)
+
+
+class TestEventDeduplicator(unittest.TestCase):
+    """测试 EventDeduplicator 合并功能"""
+
+    def setUp(self):
+        """准备包含重复事件的事件列表"""
+        self.events = [
+            EventItem(event_id="E01-1", description="韩立跟随三叔来到七玄门参加入门测试",
+                      characters=["韩立"], result="未知", location="未指定", chapter_id="第一章"),
+            EventItem(event_id="E01-2", description="墨大夫收韩立为记名弟子",
+                      characters=["墨大夫", "韩立"], chapter_id="第一章"),
+            EventItem(event_id="E01-3", description="韩立跟随三叔来到七玄门，参加入门测试。",
+                      characters=["韩立", "三叔"], location="七玄门", chapter_id="第一章"),
+            EventItem(event_id="E02-1", description="韩立跟随三叔来到七玄门参加入门测试",
+                      characters=["韩立"], chapter_id="第二章"),
+        ]
+
+    def test_merge_within_chapter(self):
+        """测试同章节内的重复事件被合并，字段取并集"""
+        merged, kept = EventDeduplicator().merge(self.events)
+
+        self.assertEqual([e.event_id for e in merged], ["E01-1", "E01-2", "E02-1"])
+        self.assertEqual(merged[0].characters, ["韩立", "三叔"])
+        self.assertEqual(merged[0].location, "七玄门")
+        self.assertEqual(merged[0].description, "韩立跟随三叔来到七玄门，参加入门测试。")
+        self.assertEqual(kept, [0, 1, 3])
+
+    def test_merge_across_adjacent_chapters(self):
+        """测试启用跨章节合并后相邻章节的重复事件也被合并"""
+        merged, _ = EventDeduplicator(cross_chapter=True).merge(self.events)
+        self.assertEqual([e.event_id for e in merged], ["E01-1", "E01-2"])
+
+    def test_cross_chapter_window_uses_chapter_ordinals(self):
+        """测试跨章节合并按章节序号判断是否相邻，而不是按章节首次出现的顺序"""
+        events = [
+            EventItem(event_id="E01-1", description="韩立跟随三叔来到七玄门参加入门测试", chapter_id="第一章"),
+            EventItem(event_id="E03-1", description="韩立跟随三叔来到七玄门参加入门测试", chapter_id="第三章"),
+        ]
+        _, kept = EventDeduplicator(cross_chapter=True).merge(events)
+        self.assertEqual(kept, [0, 1])
+        _, kept = EventDeduplicator(cross_chapter=True, chapter_window=2).merge(events)
+        self.assertEqual(kept, [0])
+
+    def test_distinct_events_untouched(self):
+        """测试没有重复时事件列表保持不变"""
+        events = self.events[:2]
+        self.assertEqual(EventDeduplicator().merge(events), (events, [0, 1]))
+
+    @staticmethod
+    def overlapping_segments(texts):
+        """按片段正文构造带重叠的片段列表"""
+        segments = [{"seg_id": f"第一章-{i + 1}", "text": text} for i, text in enumerate(texts)]
+        return TextSplitter.apply_overlap(segments, 30)
+
+    def test_merge_boundary_duplicates_only_adjacent_segments(self):
+        """测试只合并来自相邻片段的重复事件"""
+        events = [
+            EventItem(event_id="E01-1", description="韩立跟随三叔进入七玄门参加测试", chapter_id="第一章"),
+            EventItem(event_id="E01-2", description="韩立随三叔进入七玄门，准备参加测试", chapter_id="第一章"),
+            EventItem(event_id="E01-3", description="韩立随三叔进入七玄门，准备参加测试", chapter_id="第一章"),
+        ]
+        segments = self.overlapping_segments([
+            "山村里的日子清苦，二愣子每天上山砍柴。韩立跟随三叔进入七玄门参加测试。",
+            "测试分为爬山和问话两关，众少年争先恐后。",
+            "山路崎岖，不少少年半途而废。",
+            "韩立咬牙坚持，终于爬到山顶。",
+            "问话的是一位面色和蔼的老者。",
+            "韩立随三叔进入七玄门，准备参加测试。",
+        ])
+        deduplicator = EventDeduplicator()
+        merged, kept = deduplicator.merge_boundary_duplicates(events, [(0, 0), (1, 1), (5, 5)], segments)
+
+        self.assertEqual([e.event_id for e in merged], ["E01-1", "E01-3"])
+        self.assertEqual(kept, [0, 2])
+        # 来源未知的事件不参与重叠合并
+        _, kept = deduplicator.merge_boundary_duplicates(events[:2], [None, (1, 1)], segments)
+        self.assertEqual(kept, [0, 1])
+        # 片段没有重叠时不合并
+        plain = [{"seg_id": seg["seg_id"], "text": seg["text"]} for seg in segments]
+        _, kept = deduplicator.merge_boundary_duplicates(events[:2], [(0, 0), (1, 1)], plain)
+        self.assertEqual(kept, [0, 1])
+
+    def test_merge_boundary_duplicates_without_shared_bucket(self):
+        """测试相邻片段的事件即使没有落入同一LSH桶，相似度达到重叠阈值时也会合并"""
+        descriptions = ["韩立在神手谷中随墨大夫学习医术并炼制丹药", "韩立在神手谷中随墨夫学习医术便炼制丹药"]
+        index = MinHashLSH()
+        for description in descriptions:
+            index.add(description)
+        self.assertNotIn((0, 1), index.candidate_pairs())
+        self.assertGreaterEqual(index.similarity(0, 1), 0.5)
+
+        segments = self.overlapping_segments([
+            "七玄门中弟子众多。",
+            "神手谷位于七玄门深处。",
+            "墨大夫很少见客。韩立在神手谷中随墨大夫学习医术并炼制丹药。",
+            "转眼过去了数月，张铁前来探望。",
+        ])
+        events = [EventItem(event_id=f"E01-{i + 1}", description=d, chapter_id="第一章") for i, d in enumerate(descriptions)]
+        merged, _ = EventDeduplicator().merge_boundary_duplicates(events, [(2, 2), (3, 3)], segments)
+        self.assertEqual([e.event_id for e in merged], ["E01-1"])
+        # 不同章节的片段序号相邻也不合并
+        events[1].chapter_id = "第二章"
+        merged, _ = EventDeduplicator().merge_boundary_duplicates(events, [(2, 2), (3, 3)], segments)
+        self.assertEqual(len(merged), 2)
+
+    def test_merge_boundary_keeps_similar_events_outside_overlap(self):
+        """测试相邻片段中相似但不同的事件不会因相似度达标而被合并"""
+        descriptions = ["韩立在七玄门后山修炼长春功第一层，进展缓慢", "韩立在七玄门后山修炼长春功第二层，终于突破"]
+        index = MinHashLSH()
+        for description in descriptions:
+            index.add(description)
+        self.assertGreaterEqual(index.similarity(0, 1), 0.5)
+
+        segments = self.overlapping_segments([
+            "韩立在七玄门后山修炼长春功第一层，进展缓慢。",
+            "三年过去，韩立在七玄门后山修炼长春功第二层，终于突破。",
+        ])
+        events = [EventItem(event_id=f"E01-{i + 1}", description=d, chapter_id="第一章") for i, d in enumerate(descriptions)]
+        merged, _ = EventDeduplicator().merge_boundary_duplicates(events, [(0, 0), (1, 1)], segments)
+        self.assertEqual([e.description for e in merged], descriptions)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+模型级联调用测试
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, str(project_root))
+
+from common.utils.model_cascade import ModelCascade
+
+
+def make_client(*responses):
+    """构造依次返回给定响应的LLM客户端"""
+    client = MagicMock()
+    client.call_with_json_response.side_effect = list(responses)
+    return client
+
+
+class TestModelCascade(unittest.TestCase):
+    """测试 ModelCascade 的首轮调用、升级和统计"""
+
+    def test_without_escalation_model_uses_primary(self):
+        """测试未配置升级模型时只调用首轮模型"""
+        primary = make_client({"success": True, "json_content": {"positive": True}})
+        cascade = ModelCascade(primary)
+
+        response = cascade.call_with_json_response("sys", "user", lambda verdict: True)
+
+        self.assertEqual(response["json_content"], {"positive": True})
+        self.assertFalse(cascade.enabled)
+        self.assertEqual(cascade.stats()["escalations"], 0)
+
+    def test_escalates_only_when_requested(self):
+        """测试只有需要复核的判断交由强模型，强模型结果替代首轮结果"""
+        primary = make_client(
+            {"success": True, "json_content": {"positive": False}},
+            {"success": True, "json_content": {"positive": True}}
+        )
+        escalation = make_client({"success": True, "json_content": {"positive": False, "model": "strong"}})
+        cascade = ModelCascade(primary, escalation)
+        should_escalate = lambda verdict: verdict["positive"]
+
+        first = cascade.call_with_json_response("sys", "user", should_escalate)
+        second = cascade.call_with_json_response("sys", "user", should_escalate)
+
+        self.assertNotIn("escalated", first)
+        self.assertTrue(second["escalated"])
+        self.assertEqual(second["json_content"]["model"], "strong")
+        self.assertEqual(cascade.stats(), {"primary_calls": 2, "escalations": 1, "escalation_rate": 0.5})
+
+    def test_failures(self):
+        """测试首轮失败时升级，升级失败时保留首轮结果并标记为未经复核"""
+        primary = make_client(
+            {"success": False, "error": "超时"},
+            {"success": True, "json_content": {"positive": True}}
+        )
+        escalation = make_client(
+            {"success": True, "json_content": {"positive": False}},
+            {"success": False, "error": "超时"}
+        )
+        cascade = ModelCascade(primary, escalation)
+
+        recovered = cascade.call_with_json_response("sys", "user", lambda verdict: True)
+        kept = cascade.call_with_json_response("sys", "user", lambda verdict: True)
+
+        self.assertEqual(recovered["json_content"], {"positive": False})
+        self.assertTrue(kept["success"])
+        self.assertEqual(kept["json_content"], {"positive": True})
+        self.assertTrue(kept["escalation_failed"])
+        self.assertNotIn("escalation_failed", recovered)
+
+
+if __name__ == "__main__":
+    unittest.main()
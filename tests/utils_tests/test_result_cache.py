@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+持久化结果缓存测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, str(project_root))
+
+from common.utils.result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    """测试 ResultCache 的命中、淘汰和持久化"""
+
+    def setUp(self):
+        """准备临时缓存文件"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache", "results.json")
+
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+
+    def test_make_key_is_canonical(self):
+        """测试键与字典顺序无关，内容不同则键不同"""
+        self.assertEqual(
+            ResultCache.make_key({"a": 1, "b": [1, 2]}, "上下文"),
+            ResultCache.make_key({"b": [1, 2], "a": 1}, "上下文")
+        )
+        self.assertNotEqual(ResultCache.make_key("韩立"), ResultCache.make_key("二愣子"))
+
+    def test_lru_eviction_and_stats(self):
+        """测试超出容量时淘汰最久未使用的条目，并统计命中"""
+        cache = ResultCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+
+        self.assertNotIn("b", cache)
+        self.assertIsNone(cache.get("b"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["size"]), (1, 1, 1, 2))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_persistence_and_namespace(self):
+        """测试保存后重新加载，其他用途的缓存文件不被复用"""
+        cache = ResultCache(self.path, namespace="refine")
+        cache.put("key", {"description": "韩立服用灵乳"})
+        cache.save()
+
+        self.assertEqual(ResultCache(self.path, namespace="refine").get("key"), {"description": "韩立服用灵乳"})
+        self.assertEqual(len(ResultCache(self.path, namespace="causal")), 0)
+
+    def test_corrupted_file_starts_empty(self):
+        """测试缓存文件损坏时从空缓存开始"""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("{not json")
+        self.assertEqual(len(ResultCache(self.path)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,11 +12,19 @@ def main():
     parser.add_argument("--input", "-i", required=True, help="输入TXT文件或目录")
     parser.add_argument("--output", "-o", required=True, help="输出JSON文件或目录")
     parser.add_argument("--segment_size", "-s", type=int, default=800, help="分段大小")
+    parser.add_argument("--split_mode", "-m", choices=["greedy", "content_defined"], default="greedy",
+                        help="分段模式（content_defined 在文本局部编辑后保持分段边界稳定）")
+    parser.add_argument("--overlap_size", type=int, default=0, help="相邻分段的重叠字符数")
+    parser.add_argument("--novel", "-n", action="store_true", help="整本模式：单个文件包含多章，按章节标题切分后逐章输出到目录")
     parser.add_argument("--batch", "-b", action="store_true", help="批处理模式")
     
     args = parser.parse_args()
     
-    loader = ChapterLoader(segment_size=args.segment_size)
+    loader = ChapterLoader(
+        segment_size=args.segment_size,
+        split_mode=args.split_mode,
+        overlap_size=args.overlap_size
+    )
     
     if args.batch:
         # 批处理模式
@@ -29,11 +37,29 @@ def main():
         
         chapters = loader.load_multiple_txt(args.input)
         print(f"成功加载 {len(chapters)} 个章节")
+        for file_path, error in loader.failed_files:
+            print(f"加载失败: {file_path}: {error}")
         
         for chapter in chapters:
             output_file = os.path.join(args.output, f"{chapter.chapter_id}.json")
             JsonLoader.save_json(chapter.to_dict(), output_file)
             print(f"保存章节: {output_file}")
+    elif args.novel:
+        # 整本模式：流式切分章节
+        if not os.path.isfile(args.input):
+            print(f"错误: 输入路径 {args.input} 不是一个文件")
+            return
+        
+        if not os.path.exists(args.output):
+            os.makedirs(args.output)
+        
+        count = 0
+        for chapter in loader.iter_chapters(args.input):
+            output_file = os.path.join(args.output, f"{chapter.chapter_id}.json")
+            JsonLoader.save_json(chapter.to_dict(), output_file)
+            print(f"保存章节: {output_file}")
+            count += 1
+        print(f"成功加载 {count} 个章节")
     else:
         # 单文件模式
         if not os.path.isfile(args.input):
@@ -1,8 +1,11 @@
 import os
 import re
-from typing import List, Dict, Optional
+import mmap
+import json
+import codecs
+from typing import Any, List, Dict, Optional, Iterator, Tuple
 
-from common.models.chapter import Chapter
+from common.models.chapter import Chapter, Segment
 from common.utils.text_splitter import TextSplitter
 
 
@@ -12,15 +15,50 @@ class ChapterLoader:
     # [EN] Load novel chapters from text files and process them into standard format
     """
     
-    def __init__(self, segment_size: int = 800):
+    # [CN] 整行章节标题，如"第十五章 聚灵丹"或"【第一百零三章 初入七玄门】"
+    # [EN] Whole-line chapter heading, e.g. "第十五章 聚灵丹" or "【第一百零三章 初入七玄门】"
+    HEADING_PATTERN = re.compile(r'^[【]?第([零〇一二两三四五六七八九十百千万\d]+)章\s*([^】]{0,30}?)\s*[】]?$')
+    HEADING_MAX_LENGTH = 40
+    
+    # [CN] 字节偏移索引的格式版本和默认文件后缀
+    # [EN] Format version and default file suffix of the byte-offset index
+    INDEX_VERSION = 1
+    INDEX_SUFFIX = ".index.json"
+    
+    # [CN] 编码探测：BOM优先，其次按候选编码依次试解码文件开头的样本
+    # [EN] Encoding detection: BOM first, then trial-decode a head sample with each candidate encoding
+    ENCODING_BOMS = (
+        (codecs.BOM_UTF8, "utf-8-sig"),
+        (b'\x84\x31\x95\x33', "gb18030"),
+        (codecs.BOM_UTF16_LE, "utf-16"),
+        (codecs.BOM_UTF16_BE, "utf-16"),
+    )
+    ENCODING_CANDIDATES = ("utf-8", "gbk", "gb18030")
+    SNIFF_SIZE = 64 * 1024
+    READ_CHUNK_SIZE = 1024 * 1024
+    
+    # [CN] 文件数少于此值时顺序加载，避免进程池启动开销
+    # [EN] Below this many files loading stays sequential to avoid process pool start-up cost
+    PARALLEL_MIN_FILES = 8
+    
+    def __init__(self, segment_size: int = 800, split_mode: str = "greedy", overlap_size: int = 0):
         """
         # [CN] 初始化章节加载器
         # [EN] Initialize chapter loader
         
         Args:
             segment_size: # [CN] 分段大小，每段的目标字符数 [EN] Segment size, target character count per segment
+            split_mode: # [CN] 分段模式，"greedy"或"content_defined"（编辑后分段边界保持稳定） [EN] Split mode, "greedy" or "content_defined" (segment boundaries stay stable under edits)
+            overlap_size: # [CN] 相邻分段的重叠字符数，0表示不重叠 [EN] Overlap characters between adjacent segments, 0 disables overlap
         """
+        if split_mode not in TextSplitter.SPLIT_MODES:
+            raise ValueError(f"不支持的分段模式: {split_mode}")
         self.segment_size = segment_size
+        self.split_mode = split_mode
+        self.overlap_size = overlap_size
+        # [CN] 最近一次批量加载中失败的文件及原因
+        # [EN] Files that failed in the last batch load, with the reason
+        self.failed_files: List[Tuple[str, str]] = []
     
     @staticmethod
     def extract_chapter_info(text: str) -> Optional[Dict[str, str]]:
@@ -47,17 +85,18 @@ class ChapterLoader:
         
         return None
     
-    def load_from_txt(self, file_path: str) -> Optional[Chapter]:
+    def load_from_txt(self, file_path: str, encoding: Optional[str] = None) -> Optional[Chapter]:
         """
         # [CN] 从TXT文件加载章节内容
         # [EN] Load chapter content from TXT file
         
         Args:
             file_path: # [CN] TXT文件路径 [EN] TXT file path
+            encoding: # [CN] 文件编码，None表示自动探测 [EN] File encoding, None to detect automatically
             
         Returns:
-            # [CN] 章节对象，如果加载失败则返回None
-            # [EN] Chapter object, returns None if loading fails
+            # [CN] 章节对象，如果加载失败则返回None（失败原因记录在日志中）
+            # [EN] Chapter object, returns None if loading fails (the reason is logged)
         """
         if not os.path.exists(file_path):
             import logging
@@ -65,60 +104,514 @@ class ChapterLoader:
             return None
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            return self._load_chapter_file(file_path, encoding)
+        except Exception as e:
+            import logging
+            logging.error(f"加载章节失败: {file_path}: {str(e)}")  # [CN] 加载章节失败 [EN] Failed to load chapter
+            print(f"加载章节失败: {str(e)}")  # [CN] 加载章节失败: {str(e)} [EN] Failed to load chapter: {str(e)}
+            return None
+    
+    def _load_chapter_file(self, file_path: str, encoding: Optional[str] = None) -> Chapter:
+        """
+        # [CN] 读取并分段单个章节文件，失败时抛出异常
+        # [EN] Read and segment a single chapter file, raising on failure
+        """
+        content, _ = self.read_text(file_path, encoding)
+        
+        # [CN] 提取章节信息
+        # [EN] Extract chapter information
+        chapter_info = self.extract_chapter_info(content)
+        if not chapter_info:
+            chapter_id = os.path.basename(file_path).replace('.txt', '')
+            title = f"未命名章节_{chapter_id}"  # [CN] 未命名章节_{chapter_id} [EN] Unnamed_chapter_{chapter_id}
+        else:
+            chapter_id = chapter_info["chapter_id"]
+            title = chapter_info["title"]
+        
+        # [CN] 分段并为每个segment添加chapter_id前缀
+        # [EN] Segment and add chapter_id prefix to each segment
+        return self._build_chapter(chapter_id, title, content)
+    
+    @classmethod
+    def detect_encoding(cls, sample: bytes) -> str:
+        """
+        # [CN] 根据文件开头的字节样本判断编码
+        # [EN] Detect the encoding from a sample of leading bytes
+        
+        Args:
+            sample: # [CN] 文件开头的字节 [EN] Leading bytes of the file
+            
+        Returns:
+            # [CN] 编码名称；有BOM时按BOM判断，否则返回第一个能无错解码样本的候选编码，都失败时返回"utf-8"
+            # [EN] Encoding name; decided by BOM when present, otherwise the first candidate that decodes the sample cleanly, "utf-8" if none does
+        """
+        for bom, encoding in cls.ENCODING_BOMS:
+            if sample.startswith(bom):
+                return encoding
+        
+        for encoding in cls.ENCODING_CANDIDATES:
+            # [CN] 增量解码器允许样本末尾截断半个多字节字符
+            # [EN] The incremental decoder tolerates a multi-byte character cut off at the end of the sample
+            decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+            try:
+                decoder.decode(sample, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return "utf-8"
+    
+    @classmethod
+    def sniff_encoding(cls, file_path: str) -> str:
+        """
+        # [CN] 读取文件开头一小段并探测编码
+        # [EN] Read the head of a file and detect its encoding
+        """
+        with open(file_path, 'rb') as f:
+            return cls.detect_encoding(f.read(cls.SNIFF_SIZE))
+    
+    @classmethod
+    def read_text(cls, file_path: str, encoding: Optional[str] = None) -> Tuple[str, str]:
+        """
+        # [CN] 分块增量解码读取整个文件，换行统一为\n
+        # [EN] Read a whole file with chunked incremental decoding, normalizing line endings to \n
+        
+        # [CN] 不会同时在内存中保留完整的字节串和字符串；跨块的多字节字符和\r\n由增量解码器和回车暂存处理。
+        # [EN] The full byte string and the full text are never held at the same time; multi-byte characters and \r\n
+        # [EN] split across chunks are handled by the incremental decoder and a carried-over carriage return.
+        
+        Args:
+            file_path: # [CN] 文件路径 [EN] File path
+            encoding: # [CN] 文件编码，None表示自动探测 [EN] File encoding, None to detect automatically
+            
+        Returns:
+            # [CN] (文件文本, 实际使用的编码)
+            # [EN] (file text, encoding used)
+        """
+        encoding = encoding or cls.sniff_encoding(file_path)
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        parts: List[str] = []
+        carry = ""
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(cls.READ_CHUNK_SIZE)
+                text = carry + decoder.decode(chunk, final=not chunk)
+                carry = ""
+                if chunk and text.endswith('\r'):
+                    text, carry = text[:-1], '\r'
+                parts.append(text.replace('\r\n', '\n').replace('\r', '\n'))
+                if not chunk:
+                    break
+        
+        content = ''.join(parts)
+        # [CN] gb18030的BOM解码后为U+FEFF，需要手动去除
+        # [EN] A gb18030 BOM decodes to U+FEFF and has to be stripped manually
+        if content.startswith('\ufeff'):
+            content = content[1:]
+        return content, encoding
+    
+    def _build_chapter(self, chapter_id: str, title: str, content: str) -> Chapter:
+        """
+        # [CN] 根据章节信息和内容构建分段后的章节对象
+        # [EN] Build a segmented chapter object from chapter info and content
+        """
+        segments = TextSplitter.split_chapter(
+            content, self.segment_size, mode=self.split_mode, overlap_size=self.overlap_size
+        )
+        for seg in segments:
+            seg["seg_id"] = f"{chapter_id}-{seg['seg_id']}"
+        chapter = Chapter(chapter_id=chapter_id, title=title, content=content, segments=segments)
+        # [CN] 分段只保存在章节内容中的偏移，避免每章文本在内存和临时文件中各存两份
+        # [EN] Segments keep only offsets into the chapter content so the text is not stored twice in memory and temp files
+        chapter.compact_segments()
+        return chapter
+    
+    @classmethod
+    def match_heading(cls, line: str) -> Optional[Dict[str, str]]:
+        """
+        # [CN] 判断一行文本是否为章节标题
+        # [EN] Check whether a line of text is a chapter heading
+        
+        Args:
+            line: # [CN] 单行文本 [EN] Single line of text
+            
+        Returns:
+            # [CN] 章节ID和标题，不是标题时返回None
+            # [EN] Chapter ID and title, None if the line is not a heading
+        """
+        line = line.strip()
+        if not line or len(line) > cls.HEADING_MAX_LENGTH:
+            return None
+        match = cls.HEADING_PATTERN.match(line)
+        if not match:
+            return None
+        return {"chapter_id": f"第{match.group(1)}章", "title": match.group(2).strip()}
+    
+    def scan_chapters(self, file_path: str, encoding: str = "utf-8") -> Iterator[Tuple[Dict[str, str], int, int, str]]:
+        """
+        # [CN] 以内存映射方式逐行扫描整本小说，按章节标题切分
+        # [EN] Scan a whole novel line by line via memory mapping, splitting at chapter headings
+        
+        # [CN] 每次只解码一行并只保留当前章节的文本，内存占用与单章大小相当。
+        # [CN] 第一个标题之前的内容（书名、作者等）并入第一章。
+        # [EN] Only one line is decoded at a time and only the current chapter is kept in memory.
+        # [EN] Content before the first heading (title, author, ...) is merged into the first chapter.
+        
+        Args:
+            file_path: # [CN] TXT文件路径 [EN] TXT file path
+            encoding: # [CN] 文件编码 [EN] File encoding
+            
+        Yields:
+            # [CN] (章节信息, 起始字节偏移, 结束字节偏移, 章节文本)
+            # [EN] (chapter info, start byte offset, end byte offset, chapter text)
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # [CN] 跳过BOM
+                # [EN] Skip BOM
+                if encoding.lower().replace("-", "") in ("utf8", "utf8sig") and mm[:3] == codecs.BOM_UTF8:
+                    mm.seek(3)
                 
-            # [CN] 提取章节信息
-            # [EN] Extract chapter information
-            chapter_info = self.extract_chapter_info(content)
-            if not chapter_info:
+                info: Optional[Dict[str, str]] = None
+                start = mm.tell()
+                lines: List[str] = []
+                
+                while True:
+                    line_start = mm.tell()
+                    raw = mm.readline()
+                    if not raw:
+                        break
+                    line = decoder.decode(raw).replace('\r\n', '\n').replace('\r', '\n')
+                    heading = self.match_heading(line)
+                    
+                    if heading:
+                        # [CN] 遇到新标题：输出上一章（第一个标题之前的前言并入第一章）
+                        # [EN] New heading: emit the previous chapter (preface before the first heading joins chapter one)
+                        if info is not None:
+                            yield info, start, line_start, ''.join(lines)
+                            lines = []
+                            start = line_start
+                        info = heading
+                    lines.append(line)
+                
+                lines.append(decoder.decode(b'', final=True))
+                content = ''.join(lines)
+                if info is not None or content.strip():
+                    yield info or {}, start, mm.tell(), content
+    
+    def iter_chapters(self, file_path: str, encoding: str = "utf-8") -> Iterator[Chapter]:
+        """
+        # [CN] 从一个包含多章的大文件中惰性地逐章加载
+        # [EN] Lazily load chapters one by one from a large multi-chapter file
+        
+        Args:
+            file_path: # [CN] TXT文件路径 [EN] TXT file path
+            encoding: # [CN] 文件编码 [EN] File encoding
+            
+        Yields:
+            # [CN] 章节对象；重复的章节ID（如分卷重新编号）追加序号保证唯一
+            # [EN] Chapter objects; duplicate chapter IDs (e.g. numbering restarts per volume) get a suffix
+        """
+        if not os.path.exists(file_path):
+            import logging
+            logging.error(f"文件不存在: {file_path}")  # [CN] 文件不存在: {file_path} [EN] File does not exist: {file_path}
+            return
+        
+        for chapter, _, _ in self._iter_chapter_spans(file_path, encoding):
+            yield chapter
+    
+    def _iter_chapter_spans(self, file_path: str, encoding: str = "utf-8") -> Iterator[Tuple[Chapter, int, int]]:
+        """
+        # [CN] 逐章输出章节对象及其在文件中的字节范围
+        # [EN] Yield chapter objects together with their byte range in the file
+        """
+        seen: Dict[str, int] = {}
+        for info, start, end, content in self.scan_chapters(file_path, encoding):
+            if info:
+                chapter_id, title = info["chapter_id"], info["title"]
+            else:
                 chapter_id = os.path.basename(file_path).replace('.txt', '')
                 title = f"未命名章节_{chapter_id}"  # [CN] 未命名章节_{chapter_id} [EN] Unnamed_chapter_{chapter_id}
-            else:
-                chapter_id = chapter_info["chapter_id"]
-                title = chapter_info["title"]
             
-            # [CN] 分段
-            # [EN] Segmentation
-            segments = TextSplitter.split_chapter(content, self.segment_size)
+            seen[chapter_id] = seen.get(chapter_id, 0) + 1
+            if seen[chapter_id] > 1:
+                chapter_id = f"{chapter_id}_{seen[chapter_id]}"
             
-            # [CN] 为每个segment添加chapter_id前缀
-            # [EN] Add chapter_id prefix to each segment
-            for i, seg in enumerate(segments):
-                seg["seg_id"] = f"{chapter_id}-{seg['seg_id']}"
-                
-            return Chapter(
-                chapter_id=chapter_id,
-                title=title,
-                content=content,
-                segments=segments
-            )
+            yield self._build_chapter(chapter_id, title, content), start, end
+    
+    @staticmethod
+    def _normalize_newlines(text: str) -> str:
+        """
+        # [CN] 统一换行符为\n
+        # [EN] Normalize line endings to \n
+        """
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+    
+    @staticmethod
+    def _char_to_byte_offsets(content: str, raw: bytes, positions: List[int], encoding: str) -> Dict[int, int]:
+        """
+        # [CN] 把章节文本中的字符位置换算为相对章节起点的字节偏移
+        # [EN] Convert character positions in the chapter text to byte offsets relative to the chapter start
         
-        except Exception as e:
-            print(f"加载章节失败: {str(e)}")  # [CN] 加载章节失败: {str(e)} [EN] Failed to load chapter: {str(e)}
-            return None
+        # [CN] 章节文本的换行已统一为\n，原始字节中的每个\r\n要多算一个字节。
+        # [EN] Line endings in the chapter text are normalized to \n; each \r\n in the raw bytes counts one extra byte.
+        """
+        newline_extra = [0]
+        for match in re.finditer(rb'\r\n|\r|\n', raw):
+            newline_extra.append(newline_extra[-1] + (len(match.group()) - 1))
+        
+        offsets: Dict[int, int] = {}
+        last_pos, last_bytes = 0, 0
+        for pos in sorted(set(positions)):
+            last_bytes += len(content[last_pos:pos].encode(encoding, errors="replace"))
+            last_pos = pos
+            newlines = content.count('\n', 0, pos)
+            offsets[pos] = last_bytes + newline_extra[min(newlines, len(newline_extra) - 1)]
+        return offsets
+    
+    def _index_fingerprint(self, file_path: str, encoding: str) -> Dict[str, Any]:
+        """
+        # [CN] 生成判断索引是否过期的文件指纹与分段参数
+        # [EN] Build the file fingerprint and segmentation settings used to detect stale indexes
+        """
+        stat = os.stat(file_path)
+        return {
+            "version": self.INDEX_VERSION,
+            "file_size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "encoding": encoding,
+            "segment_size": self.segment_size,
+            "split_mode": self.split_mode,
+            "overlap_size": self.overlap_size
+        }
+    
+    def build_index(self, file_path: str, encoding: str = "utf-8") -> Dict[str, Any]:
+        """
+        # [CN] 扫描一遍整本小说，建立章节和分段的字节偏移索引
+        # [EN] Scan a whole novel once and build a byte-offset index of chapters and segments
+        
+        Args:
+            file_path: # [CN] TXT文件路径 [EN] TXT file path
+            encoding: # [CN] 文件编码 [EN] File encoding
+            
+        Returns:
+            # [CN] 索引字典：文件指纹、分段参数以及按顺序排列的章节列表，
+            # [CN] 每章包含字节范围 [start, end)、内容哈希和各分段的字节范围与哈希
+            # [EN] Index dict: file fingerprint, segmentation settings and the ordered chapter list;
+            # [EN] each chapter carries its byte range [start, end), content hash and per-segment byte ranges and hashes
+        """
+        index = self._index_fingerprint(file_path, encoding)
+        chapters = []
+        with open(file_path, 'rb') as f:
+            for chapter, start, end in self._iter_chapter_spans(file_path, encoding):
+                f.seek(start)
+                raw = f.read(end - start)
+                if all(isinstance(seg, Segment) for seg in chapter.segments):
+                    char_ranges = [(seg["start"], seg["end"]) for seg in chapter.segments]
+                else:
+                    char_ranges = TextSplitter.locate_segments(chapter.content, chapter.segments)
+                offsets = self._char_to_byte_offsets(
+                    chapter.content, raw, [p for r in char_ranges for p in r], encoding
+                )
+                chapters.append({
+                    "chapter_id": chapter.chapter_id,
+                    "title": chapter.title,
+                    "start": start,
+                    "end": end,
+                    "hash": TextSplitter.segment_hash(chapter.content),
+                    "segments": [
+                        {
+                            "seg_id": seg["seg_id"],
+                            "start": start + offsets[seg_start],
+                            "end": start + offsets[seg_end],
+                            "hash": TextSplitter.segment_hash(seg["text"])
+                        }
+                        for seg, (seg_start, seg_end) in zip(chapter.segments, char_ranges)
+                    ]
+                })
+        index["chapters"] = chapters
+        return index
+    
+    def index_path_for(self, file_path: str) -> str:
+        """
+        # [CN] 索引文件的默认路径（与小说文件同目录）
+        # [EN] Default index file path (next to the novel file)
+        """
+        return file_path + self.INDEX_SUFFIX
+    
+    def load_index(self, file_path: str, encoding: str = "utf-8", index_path: Optional[str] = None,
+                   rebuild: bool = False) -> Dict[str, Any]:
+        """
+        # [CN] 读取持久化的索引；索引不存在、文件已修改或分段参数不同时重新建立并保存
+        # [EN] Load the persisted index; rebuild and save it when missing, when the file changed or settings differ
+        
+        Args:
+            file_path: # [CN] TXT文件路径 [EN] TXT file path
+            encoding: # [CN] 文件编码 [EN] File encoding
+            index_path: # [CN] 索引文件路径，默认为"<小说文件>.index.json" [EN] Index file path, defaults to "<novel file>.index.json"
+            rebuild: # [CN] 是否强制重建 [EN] Force a rebuild
+            
+        Returns:
+            # [CN] 索引字典
+            # [EN] Index dict
+        """
+        index_path = index_path or self.index_path_for(file_path)
+        fingerprint = self._index_fingerprint(file_path, encoding)
+        
+        if not rebuild and os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if all(index.get(k) == v for k, v in fingerprint.items()):
+                    return index
+            except (OSError, ValueError) as e:
+                print(f"读取章节索引失败，将重新建立: {str(e)}")  # [CN] 读取章节索引失败 [EN] Failed to read chapter index, rebuilding
+        
+        index = self.build_index(file_path, encoding)
+        try:
+            with open(index_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存章节索引失败: {str(e)}")  # [CN] 保存章节索引失败 [EN] Failed to save chapter index
+        return index
+    
+    def iter_chapter_range(self, file_path: str, first: int = 1, last: Optional[int] = None,
+                           encoding: str = "utf-8", index_path: Optional[str] = None) -> Iterator[Chapter]:
+        """
+        # [CN] 借助字节偏移索引直接定位并加载指定范围内的章节，无需重新扫描整本小说
+        # [EN] Load a range of chapters by seeking with the byte-offset index instead of rescanning the whole novel
+        
+        Args:
+            file_path: # [CN] TXT文件路径 [EN] TXT file path
+            first: # [CN] 起始章节序号（从1开始，包含） [EN] First chapter ordinal (1-based, inclusive)
+            last: # [CN] 结束章节序号（包含），None表示到最后一章 [EN] Last chapter ordinal (inclusive), None means through the end
+            encoding: # [CN] 文件编码 [EN] File encoding
+            index_path: # [CN] 索引文件路径 [EN] Index file path
+            
+        Yields:
+            # [CN] 章节对象，与iter_chapters输出的对应章节相同
+            # [EN] Chapter objects, identical to the corresponding ones from iter_chapters
+        """
+        if not os.path.exists(file_path):
+            import logging
+            logging.error(f"文件不存在: {file_path}")  # [CN] 文件不存在: {file_path} [EN] File does not exist: {file_path}
+            return
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"无效的章节范围: {first}-{last}")
+        
+        entries = self.load_index(file_path, encoding, index_path)["chapters"][first - 1:last]
+        with open(file_path, 'rb') as f:
+            for entry in entries:
+                f.seek(entry["start"])
+                content = self._normalize_newlines(
+                    f.read(entry["end"] - entry["start"]).decode(encoding, errors="replace")
+                )
+                if TextSplitter.segment_hash(content) != entry["hash"]:
+                    raise ValueError(f"章节索引已过期: {entry['chapter_id']}")
+                yield self._build_chapter(entry["chapter_id"], entry["title"], content)
     
-    def load_multiple_txt(self, directory: str, pattern: str = "*.txt") -> List[Chapter]:
+    def read_segment(self, file_path: str, seg_id: str, encoding: str = "utf-8",
+                     index_path: Optional[str] = None) -> Optional[str]:
         """
-        # [CN] 批量加载TXT文件
-        # [EN] Batch load TXT files
+        # [CN] 借助索引直接读取单个分段对应的原文
+        # [EN] Read the source text of a single segment directly via the index
+        
+        Args:
+            file_path: # [CN] TXT文件路径 [EN] TXT file path
+            seg_id: # [CN] 分段ID，如"第一章-2" [EN] Segment ID, e.g. "第一章-2"
+            encoding: # [CN] 文件编码 [EN] File encoding
+            index_path: # [CN] 索引文件路径 [EN] Index file path
+            
+        Returns:
+            # [CN] 分段原文（换行已统一），找不到分段时返回None
+            # [EN] Segment source text (line endings normalized), None if the segment is not found
+        """
+        for entry in self.load_index(file_path, encoding, index_path)["chapters"]:
+            if not seg_id.startswith(f"{entry['chapter_id']}-"):
+                continue
+            for seg in entry["segments"]:
+                if seg["seg_id"] == seg_id:
+                    with open(file_path, 'rb') as f:
+                        f.seek(seg["start"])
+                        raw = f.read(seg["end"] - seg["start"])
+                    return self._normalize_newlines(raw.decode(encoding, errors="replace"))
+        return None
+    
+    def load_multiple_txt(self, directory: str, pattern: str = "*.txt", encoding: Optional[str] = None,
+                          max_workers: Optional[int] = None, raise_on_error: bool = False) -> List[Chapter]:
+        """
+        # [CN] 批量加载TXT文件，文件较多时用进程池并行解码和分段
+        # [EN] Batch load TXT files, decoding and segmenting in a process pool when there are many files
         
         Args:
             directory: # [CN] 目录路径 [EN] Directory path
             pattern: # [CN] 文件匹配模式 [EN] File matching pattern
+            encoding: # [CN] 文件编码，None表示逐个文件自动探测（可混合UTF-8/GBK/GB18030来源） [EN] File encoding, None detects per file (mixed UTF-8/GBK/GB18030 sources)
+            max_workers: # [CN] 进程数，None时按并行配置的CPU密集型任务设置，1表示顺序加载 [EN] Worker processes, None uses the CPU-bound parallel config, 1 loads sequentially
+            raise_on_error: # [CN] 有文件加载失败时是否抛出异常 [EN] Whether to raise when any file fails to load
             
         Returns:
-            # [CN] 章节对象列表
-            # [EN] List of chapter objects
+            # [CN] 按文件名排序的章节对象列表；失败的文件记录在self.failed_files中
+            # [EN] Chapter objects sorted by file name; failed files are recorded in self.failed_files
         """
         import glob
+        import logging
         
-        chapters = []
-        file_paths = glob.glob(os.path.join(directory, pattern))
+        file_paths = sorted(glob.glob(os.path.join(directory, pattern)))
+        if max_workers is None:
+            from common.utils.parallel_config import ParallelConfig
+            max_workers = ParallelConfig.get_max_workers("cpu_bound") if ParallelConfig.is_enabled() else 1
+        
+        tasks = [
+            (file_path, self.segment_size, self.split_mode, self.overlap_size, encoding)
+            for file_path in file_paths
+        ]
+        results = None
+        if max_workers > 1 and len(tasks) >= self.PARALLEL_MIN_FILES:
+            try:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+                    results = list(executor.map(_load_chapter_worker, tasks, chunksize=max(1, len(tasks) // (max_workers * 4))))
+            except (OSError, RuntimeError) as e:
+                # [CN] 受限环境中无法创建进程池时退回顺序加载
+                # [EN] Fall back to sequential loading where a process pool cannot be created
+                logging.warning(f"进程池不可用，改为顺序加载: {str(e)}")  # [CN] 进程池不可用 [EN] Process pool unavailable, loading sequentially
+        if results is None:
+            results = [_load_chapter_worker(task) for task in tasks]
         
-        for file_path in sorted(file_paths):
-            chapter = self.load_from_txt(file_path)
-            if chapter:
+        chapters = []
+        self.failed_files = []
+        for file_path, chapter, error in results:
+            if chapter is not None:
                 chapters.append(chapter)
+            else:
+                self.failed_files.append((file_path, error))
+                logging.error(f"加载章节失败: {file_path}: {error}")  # [CN] 加载章节失败 [EN] Failed to load chapter
         
+        if self.failed_files and raise_on_error:
+            raise ValueError(f"{len(self.failed_files)} 个文件加载失败: " +
+                             ", ".join(os.path.basename(path) for path, _ in self.failed_files))
         return chapters
+
+
+def _load_chapter_worker(task: Tuple[str, int, str, int, Optional[str]]) -> Tuple[str, Optional[Chapter], Optional[str]]:
+    """
+    # [CN] 进程池工作函数：加载单个章节文件
+    # [EN] Process pool worker: load a single chapter file
+    
+    Args:
+        task: # [CN] (文件路径, 分段大小, 分段模式, 重叠大小, 编码) [EN] (file path, segment size, split mode, overlap size, encoding)
+        
+    Returns:
+        # [CN] (文件路径, 章节对象或None, 错误信息或None)
+        # [EN] (file path, chapter or None, error message or None)
+    """
+    file_path, segment_size, split_mode, overlap_size, encoding = task
+    try:
+        loader = ChapterLoader(segment_size=segment_size, split_mode=split_mode, overlap_size=overlap_size)
+        return file_path, loader._load_chapter_file(file_path, encoding), None
+    except Exception as e:
+        return file_path, None, f"{type(e).__name__}: {str(e)}"